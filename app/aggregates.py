@@ -0,0 +1,142 @@
+# app/aggregates.py
+# Utrzymywanie tabeli movie_rating_stats (liczba, suma, suma kwadratów, min, max ocen filmu).
+# Funkcje wywołujemy w tej samej sesji (transakcji), w której zmieniana jest ocena,
+# dzięki czemu statystyki nigdy nie rozjeżdżają się z tabelą ratings.
+import math
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models import MovieRatingStats, Rating
+
+# Unikalny indeks ux_ratings_user_movie: druga ocena tego samego filmu przez POST to konflikt (409)
+DUPLICATE_RATING = "Ten film ma już Twoją ocenę - zmień ją przez PUT /movies/{id}/my-rating"
+
+
+def add_ratings(db: Session, movie_id: int, values: list[float]) -> None:
+    """Dolicza do statystyk filmu kilka nowych ocen jednym UPSERT-em."""
+    stmt = sqlite_insert(MovieRatingStats).values(
+        movieId=movie_id, rating_count=len(values), rating_sum=sum(values),
+        rating_sum_sq=sum(v * v for v in values), min_rating=min(values), max_rating=max(values),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MovieRatingStats.movieId],
+        set_={
+            "rating_count": MovieRatingStats.rating_count + stmt.excluded.rating_count,
+            "rating_sum": MovieRatingStats.rating_sum + stmt.excluded.rating_sum,
+            "rating_sum_sq": MovieRatingStats.rating_sum_sq + stmt.excluded.rating_sum_sq,
+            # min()/max() z wieloma argumentami to w SQLite funkcje skalarne
+            "min_rating": func.coalesce(func.min(MovieRatingStats.min_rating, stmt.excluded.min_rating), stmt.excluded.min_rating),
+            "max_rating": func.coalesce(func.max(MovieRatingStats.max_rating, stmt.excluded.max_rating), stmt.excluded.max_rating),
+        },
+    )
+    db.execute(stmt)
+
+
+def add_rating(db: Session, movie_id: int, value: float) -> None:
+    add_ratings(db, movie_id, [value])
+
+
+def remove_rating(db: Session, movie_id: int, value: float) -> None:
+    """Odejmuje ocenę ze statystyk. Wiersz oceny musi być już usunięty/zmieniony i wysłany (flush)."""
+    stats = db.get(MovieRatingStats, movie_id)
+    if stats is None:
+        return
+    if stats.rating_count <= 1:
+        db.execute(delete(MovieRatingStats).where(MovieRatingStats.movieId == movie_id))
+        return
+    values = {
+        "rating_count": MovieRatingStats.rating_count - 1,
+        "rating_sum": MovieRatingStats.rating_sum - value,
+        "rating_sum_sq": MovieRatingStats.rating_sum_sq - value * value,
+    }
+    # Min/max nie da się "odjąć" - gdy usuwamy wartość skrajną, liczymy je na nowo z indeksu movieId
+    if value <= stats.min_rating or value >= stats.max_rating:
+        low, high = db.execute(
+            select(func.min(Rating.rating), func.max(Rating.rating)).where(Rating.movieId == movie_id)
+        ).one()
+        values.update(min_rating=low, max_rating=high)
+    db.execute(update(MovieRatingStats).where(MovieRatingStats.movieId == movie_id).values(**values))
+
+
+def change_rating(db: Session, movie_id: int, old_value: float, new_value: float) -> None:
+    if old_value == new_value:
+        return
+    remove_rating(db, movie_id, old_value)
+    add_rating(db, movie_id, new_value)
+
+
+def upsert_rating(db: Session, user_id: int, movie_id: int, value: float, timestamp=None) -> tuple[dict, bool]:
+    """Ocena użytkownika dla filmu: INSERT ... ON CONFLICT (userId, movieId) DO UPDATE ... RETURNING.
+
+    Zwraca (wiersz, czy_utworzony). Poprzednią wartość (do statystyk) czytamy pustym
+    UPDATE ... RETURNING - jako zapis bierze blokadę zapisu bazy jeszcze przed odczytem, więc równoległe
+    żądanie tego samego użytkownika czeka na nasz commit i widzi już naszą ocenę (bez tego oba widziały
+    brak oceny i oba doliczały ją do statystyk). To trzy instrukcje (odczyt, UPSERT oceny, UPSERT
+    statystyk), ale w jednej transakcji pod jedną blokadą zapisu.
+    """
+    previous = db.execute(
+        update(Rating).where(Rating.userId == user_id, Rating.movieId == movie_id)
+        .values(rating=Rating.rating).returning(Rating.rating)
+        .execution_options(synchronize_session=False)
+    ).first()
+    stmt = sqlite_insert(Rating).values(userId=user_id, movieId=movie_id, rating=value, timestamp=timestamp)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Rating.userId, Rating.movieId],
+        # Bez podanego timestamp zostaje poprzedni (jak w PUT /ratings/{id})
+        set_={"rating": stmt.excluded.rating, "timestamp": func.coalesce(stmt.excluded.timestamp, Rating.timestamp)},
+    ).returning(Rating.id, Rating.userId, Rating.movieId, Rating.rating, Rating.timestamp)
+    row = db.execute(stmt).one()._asdict()
+    if previous is None:
+        add_rating(db, movie_id, value)
+    else:
+        change_rating(db, movie_id, previous.rating, value)
+    return row, previous is None
+
+
+def _insert_stats_from_ratings(db: Session, *where) -> None:
+    db.execute(insert(MovieRatingStats).from_select(
+        ["movieId", "rating_count", "rating_sum", "rating_sum_sq", "min_rating", "max_rating"],
+        select(
+            Rating.movieId, func.count(), func.sum(Rating.rating),
+            func.sum(Rating.rating * Rating.rating), func.min(Rating.rating), func.max(Rating.rating),
+        ).where(Rating.rating.is_not(None), *where).group_by(Rating.movieId),
+    ))
+
+
+def rebuild_rating_stats(db: Session) -> None:
+    """Przelicza całą tabelę statystyk jednym zapytaniem GROUP BY (np. po imporcie)."""
+    db.execute(delete(MovieRatingStats))
+    _insert_stats_from_ratings(db)
+
+
+def recompute_rating_stats(db: Session, movie_ids) -> None:
+    """Przelicza statystyki tylko wskazanych filmów (np. po usunięciu wielu ocen naraz)."""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    db.execute(delete(MovieRatingStats).where(MovieRatingStats.movieId.in_(movie_ids)))
+    _insert_stats_from_ratings(db, Rating.movieId.in_(movie_ids))
+
+
+def backfill_rating_stats(db: Session) -> None:
+    """Wypełnia pustą tabelę statystyk, jeśli baza ma już oceny (np. baza sprzed tej zmiany)."""
+    if db.scalar(select(MovieRatingStats.movieId).limit(1)) is None and \
+            db.scalar(select(Rating.id).limit(1)) is not None:
+        rebuild_rating_stats(db)
+        db.commit()
+
+
+def stats_to_dict(movie_id: int, stats) -> dict:
+    if stats is None or not stats.rating_count:
+        return {"movieId": movie_id, "count": 0}
+    n = stats.rating_count
+    mean = stats.rating_sum / n
+    variance = max(stats.rating_sum_sq / n - mean * mean, 0.0)
+    return {
+        "movieId": movie_id,
+        "count": n,
+        "mean": mean,
+        "stddev": math.sqrt(variance),
+        "min": stats.min_rating,
+        "max": stats.max_rating,
+    }
@@ -1,38 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.models import User
-from app.schemas import UserCreate, UserOut, Token
-from app.security import hash_password, verify_password, create_access_token, get_current_user, get_current_admin_user
+from app.schemas import UserCreate, UserOut, Token, UserAdminUpdate, AuthCacheStatsOut
+from app.security import (
+    create_access_token, get_current_user, get_current_admin_user,
+    auth_cache, invalidate_user, Principal, password_pool, needs_rehash
+)
 from app.db import get_db
 
 router = APIRouter()
 
+# login i POST /users są async (bcrypt czekamy w puli procesów), ale sesja bazy jest synchroniczna -
+# każde zapytanie i commit idą do puli wątków, żeby czekanie na blokadę SQLite (busy_timeout)
+# nie zatrzymało pętli zdarzeń, a z nią wszystkich innych żądań.
+def find_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+def save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
 # Zadanie 2, 4 i 6: Endpoint POST /users dostępny tylko dla ROLE_ADMIN
 @router.post("/users", response_model=UserOut, status_code=201)
-def create_new_user(payload: UserCreate, db: Session = Depends(get_db), current_admin: User = Depends(get_current_admin_user)):
-    exists = db.query(User).filter(User.username == payload.username).first()
+async def create_new_user(payload: UserCreate, db: Session = Depends(get_db), current_admin: Principal = Depends(get_current_admin_user)):
+    exists = await run_in_threadpool(find_user, db, payload.username)
     if exists:
         raise HTTPException(status_code=409, detail="Użytkownik już istnieje")
     
     user = User(
         username=payload.username, 
-        password_hash=hash_password(payload.password),
+        password_hash=await password_pool.hash(payload.password),
         role="user"
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(save_user, db, user)
 
 # Publiczna rejestracja (pomocnicza)
 """
 @router.post("/register", response_model=UserOut, status_code=201)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
+async def register(payload: UserCreate, db: Session = Depends(get_db)):
     exists = db.query(User).filter(User.username == payload.username).first()
     if exists:
         raise HTTPException(status_code=409, detail="Użytkownik już istnieje")
-    user = User(username=payload.username, password_hash=hash_password(payload.password))
+    user = User(username=payload.username, password_hash=await password_pool.hash(payload.password))
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -42,16 +56,40 @@ def register(payload: UserCreate, db: Session = Depends(get_db)):
 # POPRAWKA: Używamy OAuth2PasswordRequestForm zamiast LoginRequest (JSON),
 # aby przycisk "Authorize" w Swaggerze działał poprawnie.
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+# Endpoint jest async: bcrypt liczy się w puli procesów (password_pool), a w tym czasie
+# nie blokujemy żadnego wątku z puli Starlette (wątek zajmują tylko krótkie zapytania do bazy).
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     # Swagger wysyła login w polu 'username' i hasło w 'password'
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(find_user, db, form_data.username)
+    if not user or not await password_pool.verify(form_data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Zły login lub hasło")
+
+    # Zmieniono BCRYPT_ROUNDS - przeliczamy hash, póki mamy hasło w jawnej postaci
+    if needs_rehash(user.password_hash):
+        user.password_hash = await password_pool.hash(form_data.password)
+        await run_in_threadpool(db.commit)
     
     access_token = create_access_token(subject=user.username, role=user.role)
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Zadanie 7: Endpoint /user_details
 @router.get("/user_details", response_model=UserOut)
-def get_user_details(user: User = Depends(get_current_user)):
-    return user
\ No newline at end of file
+def get_user_details(user: Principal = Depends(get_current_user)):
+    return user
+
+# Zmiana roli / dezaktywacja użytkownika (tylko ROLE_ADMIN) - unieważnia jego wpisy w cache tokenów
+@router.put("/users/{user_id}", response_model=UserOut)
+def update_user(user_id: int, payload: UserAdminUpdate, db: Session = Depends(get_db), current_admin: Principal = Depends(get_current_admin_user)):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Użytkownik nie znaleziony")
+    if payload.role is not None: user.role = payload.role
+    if payload.is_active is not None: user.is_active = payload.is_active
+    db.commit()
+    db.refresh(user)
+    invalidate_user(user.username)
+    return user
+
+@router.get("/cache-stats", response_model=AuthCacheStatsOut)
+def get_auth_cache_stats(current_admin: Principal = Depends(get_current_admin_user)):
+    return auth_cache.stats()
\ No newline at end of file
@@ -0,0 +1,153 @@
+# app/batch_router.py
+# Endpointy wsadowe dla klientów synchronizujących aktywność użytkownika (tysiące wierszy naraz).
+# Cała paczka to jedno żądanie i jedna transakcja: elementy sprawdzamy jednym przebiegiem
+# (po jednym zapytaniu IN o istniejące filmy/wiersze), poprawne zapisujemy operacjami zbiorczymi,
+# a odpowiedź zawiera wynik każdego elementu - błędne elementy nie blokują pozostałych.
+import os
+from collections import defaultdict
+from fastapi import APIRouter, Body, Depends
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.models import Movie, Link, Rating, Tag
+from app.schemas import RatingCreate, TagCreate, LinkBatchItem, BatchOut
+from app.security import get_current_user
+from app import aggregates
+from app.ranking import top_movies
+from app.response_cache import table_versions
+from app.catalog import catalog
+
+# Górna granica rozmiaru paczki; trzyma też zapytania IN poniżej limitu parametrów SQLite (32766).
+# Limit jest częścią schematu ciała (max_length): walidacja przerywa się na pierwszym nadmiarowym
+# elemencie (422), zamiast budować modele pydantic dla całej za dużej paczki.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+
+router = APIRouter()
+
+
+def existing_keys(db: Session, column, keys, *where) -> set:
+    keys = set(keys)
+    if not keys:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(keys), *where)))
+
+
+def batch_out(results: list[dict]) -> dict:
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {"succeeded": len(results) - failed, "failed": failed, "results": results}
+
+
+def insert_batch(db: Session, model, items: list, user_id: int) -> tuple[list[dict], list[dict]]:
+    """Wstawia oceny/tagi do istniejących filmów. Zwraca (wyniki elementów, wstawione wiersze)."""
+    movies = existing_keys(db, Movie.movieId, (item.movieId for item in items))
+    # Ocena jest unikalna na (userId, movieId): odrzucamy filmy już ocenione i powtórzone w paczce
+    rated = existing_keys(db, Rating.movieId, movies, Rating.userId == user_id) if model is Rating else set()
+    results: list = [None] * len(items)
+    rows, positions = [], []
+    for index, item in enumerate(items):
+        if item.movieId not in movies:
+            results[index] = {"index": index, "status": "error", "error": "Film o podanym ID nie istnieje"}
+            continue
+        if item.movieId in rated:
+            results[index] = {"index": index, "status": "error", "error": aggregates.DUPLICATE_RATING}
+            continue
+        if model is Rating:
+            rated.add(item.movieId)
+        rows.append({"userId": user_id, **item.model_dump()})
+        positions.append(index)
+    if rows:
+        # Wielowierszowy INSERT ... RETURNING id, w kolejności przesłanych elementów
+        ids = db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+        for index, new_id in zip(positions, ids):
+            results[index] = {"index": index, "status": "created", "id": new_id}
+    return results, rows
+
+
+@router.post("/ratings/batch", response_model=BatchOut)
+def create_ratings_batch(items: list[RatingCreate] = Body(..., max_length=BATCH_MAX_ITEMS), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    results, rows = insert_batch(db, Rating, items, current_user.id)
+    values_by_movie = defaultdict(list)
+    for row in rows:
+        values_by_movie[row["movieId"]].append(row["rating"])
+    for movie_id, values in values_by_movie.items():
+        aggregates.add_ratings(db, movie_id, values)
+    db.commit()
+    if rows:
+        table_versions.bump("ratings")
+        top_movies.mark_dirty()
+    return batch_out(results)
+
+
+@router.delete("/ratings/batch", response_model=BatchOut)
+def delete_ratings_batch(ids: list[int] = Body(..., max_length=BATCH_MAX_ITEMS), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    found = {
+        row.id: row for row in
+        db.execute(select(Rating.id, Rating.userId, Rating.movieId).where(Rating.id.in_(set(ids))))
+    } if ids else {}
+    results, to_delete, movie_ids = [], set(), set()
+    for index, rating_id in enumerate(ids):
+        row = found.get(rating_id)
+        if row is None or rating_id in to_delete:
+            results.append({"index": index, "status": "error", "id": rating_id, "error": "Ocena nie znaleziona"})
+        elif row.userId != current_user.id and current_user.role != "ROLE_ADMIN":
+            results.append({"index": index, "status": "error", "id": rating_id, "error": "Nie możesz usunąć cudzej oceny"})
+        else:
+            to_delete.add(rating_id)
+            movie_ids.add(row.movieId)
+            results.append({"index": index, "status": "deleted", "id": rating_id})
+    if to_delete:
+        db.execute(delete(Rating).where(Rating.id.in_(to_delete)))
+        # Przy wielu usunięciach taniej przeliczyć statystyki dotkniętych filmów niż odejmować po jednej
+        aggregates.recompute_rating_stats(db, movie_ids)
+        db.commit()
+        table_versions.bump("ratings")
+        top_movies.mark_dirty()
+    return batch_out(results)
+
+
+@router.post("/tags/batch", response_model=BatchOut)
+def create_tags_batch(items: list[TagCreate] = Body(..., max_length=BATCH_MAX_ITEMS), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    results, rows = insert_batch(db, Tag, items, current_user.id)
+    db.commit()
+    if rows:
+        table_versions.bump("tags")
+    return batch_out(results)
+
+
+@router.put("/links/batch", response_model=BatchOut)
+def upsert_links_batch(items: list[LinkBatchItem] = Body(..., max_length=BATCH_MAX_ITEMS), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Istniejący link jest aktualizowany (podane pola), brakujący - tworzony, o ile film istnieje
+    keys = [item.movieId for item in items]
+    movies = existing_keys(db, Movie.movieId, keys)
+    links = existing_keys(db, Link.movieId, keys)
+    results, inserts, updates, seen = [], [], [], set()
+    for index, item in enumerate(items):
+        values = item.model_dump(exclude_none=True)
+        error = None
+        if item.movieId in seen:
+            error = "Ten movieId występuje w paczce więcej niż raz"
+        elif item.movieId in links:
+            if len(values) > 1:
+                updates.append(values)
+        elif item.movieId not in movies:
+            error = "Film o podanym ID nie istnieje"
+        elif item.imdbId is None:
+            error = "imdbId jest wymagane przy tworzeniu linku"
+        else:
+            inserts.append(values)
+        seen.add(item.movieId)
+        if error:
+            results.append({"index": index, "status": "error", "id": item.movieId, "error": error})
+        else:
+            status = "updated" if item.movieId in links else "created"
+            results.append({"index": index, "status": status, "id": item.movieId})
+    if inserts:
+        db.execute(insert(Link), inserts)
+    if updates:
+        # UPDATE po kluczu głównym wykonywany jako executemany
+        db.execute(update(Link), updates)
+    db.commit()
+    if inserts or updates:
+        catalog.refresh(db, links=[values["movieId"] for values in inserts + updates])
+        table_versions.bump("links")
+    return batch_out(results)
@@ -0,0 +1,131 @@
+# app/catalog.py
+# Opcjonalny snapshot katalogu (CATALOG_SNAPSHOT=1): tabele movies i links trzymane w pamięci.
+# Oba katalogi są małe (~10k wierszy), czytane ciągle i zmieniane rzadko, więc GET /movies/{id},
+# GET /links/{id} i strony list obsługujemy bez zapytań do bazy.
+#
+# Wiersze to obiekty z __slots__, klucze leżą posortowane w array('q') (bisect dla kursora),
+# a słownik movieId -> pozycja daje odczyt po kluczu. Snapshot jest niezmienny: zapis buduje
+# nową kopię tabeli i podmienia referencję, więc czytelnicy nigdy nie widzą stanu pośredniego.
+#
+# Snapshot jest w pamięci procesu - zmiany z innego workera albo importu CLI nie są widoczne
+# do restartu (albo reload()).
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Optional
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Movie, Link
+from app.pagination import decode_cursor, finish_page
+
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "0") == "1"
+
+
+class MovieRow:
+    __slots__ = ("movieId", "title", "genres")
+
+    def __init__(self, movieId: int, title: str, genres: str):
+        self.movieId = movieId
+        self.title = title
+        self.genres = genres
+
+
+class LinkRow:
+    __slots__ = ("movieId", "imdbId", "tmdbId")
+
+    def __init__(self, movieId: int, imdbId: str, tmdbId: Optional[str]):
+        self.movieId = movieId
+        self.imdbId = imdbId
+        self.tmdbId = tmdbId
+
+
+class SnapshotTable:
+    """Niezmienna tabela: posortowane klucze, wiersze w tej samej kolejności i indeks klucz -> pozycja."""
+    __slots__ = ("keys", "rows", "index")
+
+    def __init__(self, rows: list):
+        rows.sort(key=lambda row: row.movieId)
+        self.rows = rows
+        self.keys = array("q", (row.movieId for row in rows))
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    def get(self, key: int):
+        i = self.index.get(key)
+        return None if i is None else self.rows[i]
+
+    def page(self, after: Optional[int], skip: int, count: int) -> list:
+        start = bisect_right(self.keys, after) if after is not None else skip
+        return self.rows[start:start + count]
+
+    def patched(self, changes: dict) -> "SnapshotTable":
+        """Kopia tabeli z podmienionymi wierszami; wartość None usuwa wiersz."""
+        rows = {row.movieId: row for row in self.rows}
+        for key, row in changes.items():
+            if row is None:
+                rows.pop(key, None)
+            else:
+                rows[key] = row
+        return SnapshotTable(list(rows.values()))
+
+
+def _movie_rows(db: Session, ids: Optional[Iterable[int]] = None) -> list[MovieRow]:
+    stmt = select(Movie.movieId, Movie.title, Movie.genres)
+    if ids is not None:
+        stmt = stmt.where(Movie.movieId.in_(ids))
+    return [MovieRow(*row) for row in db.execute(stmt)]
+
+
+def _link_rows(db: Session, ids: Optional[Iterable[int]] = None) -> list[LinkRow]:
+    stmt = select(Link.movieId, Link.imdbId, Link.tmdbId)
+    if ids is not None:
+        stmt = stmt.where(Link.movieId.in_(ids))
+    return [LinkRow(*row) for row in db.execute(stmt)]
+
+
+class CatalogSnapshot:
+    def __init__(self, enabled: bool = CATALOG_SNAPSHOT):
+        self.enabled = enabled
+        self.movies = SnapshotTable([])
+        self.links = SnapshotTable([])
+        self._lock = threading.Lock()
+
+    def reload(self, db: Session) -> None:
+        with self._lock:
+            movies, links = SnapshotTable(_movie_rows(db)), SnapshotTable(_link_rows(db))
+            self.movies, self.links = movies, links
+
+    def refresh(self, db: Session, movies: Iterable[int] = (), links: Iterable[int] = ()) -> None:
+        """Wczytuje z bazy aktualny stan podanych kluczy (po commit) i podmienia tabele.
+
+        Odczyt i podmiana są pod blokadą - dwa równoległe zapisy nie nadpiszą się starszym stanem.
+        """
+        if not self.enabled:
+            return
+        movies, links = set(movies), set(links)
+        with self._lock:
+            if movies:
+                changes = dict.fromkeys(movies)
+                changes.update({row.movieId: row for row in _movie_rows(db, movies)})
+                self.movies = self.movies.patched(changes)
+            if links:
+                changes = dict.fromkeys(links)
+                changes.update({row.movieId: row for row in _link_rows(db, links)})
+                self.links = self.links.patched(changes)
+
+    @staticmethod
+    def page(table: SnapshotTable, response: Response, cursor: Optional[str] = None, skip: int = 0, limit: int = 50):
+        """Strona listy z pamięci - te same wyniki i nagłówek X-Next-Cursor co keyset_page.
+
+        skip/limit przychodzą z walidacją endpointu (limit >= 1), a decode_cursor przepuszcza tylko
+        liczbę całkowitą - inny kursor to 400, zanim trafi do bisect.
+        """
+        after = decode_cursor(cursor) if cursor is not None else None
+        return finish_page(table.page(after, skip, limit + 1), Movie.movieId, response, limit)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "movies": len(self.movies.rows), "links": len(self.links.rows)}
+
+
+catalog = CatalogSnapshot()
@@ -0,0 +1,323 @@
+# app/crud_async.py
+# Asynchroniczne wersje endpointów CRUD (movies, links, ratings, tags) na AsyncSession/aiosqlite.
+# Włączane przez DB_ASYNC=1 - main.py podmienia wtedy synchroniczne trasy na te poniżej.
+# Logika jest taka sama jak w main.py; funkcje pomocnicze pisane pod zwykłą sesję
+# (agregaty ocen, indeks gatunków) wołamy przez AsyncSession.run_sync w tej samej transakcji.
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
+from app.models import Movie, Link, Rating, Tag
+from app.schemas import (
+    MovieOut, MovieCreate, MovieUpdate,
+    LinkOut, LinkCreate, LinkUpdate,
+    RatingOut, RatingCreate, RatingUpdate, RatingUpsert,
+    TagOut, TagCreate, TagUpdate
+)
+from app.security import get_current_user_async
+from app.pagination import keyset_statement, finish_page, PAGE_LIMIT_MAX
+from app.filters import RangeFilters, rating_filters, tag_filters, apply_filters
+from app import aggregates, genres, write_queue
+from app.ranking import top_movies
+from app.response_cache import cached_json_async, table_versions
+from app.catalog import catalog
+
+router = APIRouter()
+
+
+async def get_or_404(db: AsyncSession, model, key, detail: str):
+    obj = await db.get(model, key)
+    if obj is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return obj
+
+
+async def keyset_page_async(db: AsyncSession, stmt, key, response: Response, cursor, skip, limit, descending=False):
+    rows = await db.scalars(keyset_statement(stmt, key, cursor, skip, limit, descending))
+    return finish_page(rows.all(), key, response, limit)
+
+async def filtered_page_async(db: AsyncSession, model, filters: RangeFilters, response: Response, cursor, skip, limit):
+    stmt, key = apply_filters(select(model), model, filters)
+    return await keyset_page_async(db, stmt, key, response, cursor, skip, limit, filters.descending)
+
+async def submit_write_behind(kind: str, values: dict) -> dict:
+    future = write_queue.write_behind.submit(kind, values)
+    result = asyncio.wrap_future(future)
+    try:
+        try:
+            return await asyncio.wait_for(asyncio.shield(result), write_queue.WRITE_BEHIND_TIMEOUT)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                raise HTTPException(status_code=503, detail=write_queue.TIMEOUT_DETAIL, headers={"Retry-After": "1"})
+            return await result
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=aggregates.DUPLICATE_RATING)
+
+async def snapshot_or_404(table, key, detail: str):
+    row = table.get(key)
+    if row is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return row
+
+
+async def memory_page(table, response: Response, cursor, skip, limit):
+    return catalog.page(table, response, cursor, skip, limit)
+
+# MOVIES CRUD
+
+@router.get("/movies", response_model=list[MovieOut])
+async def get_movies(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+                     genre: Optional[list[str]] = Query(None), genre_mode: str = Query("and", pattern="^(and|or)$"),
+                     db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if catalog.enabled and not genre:
+        return await cached_json_async(request, ("movies",), list[MovieOut],
+                                       lambda response: memory_page(catalog.movies, response, cursor, skip, limit))
+    stmt = genres.filter_by_genres(select(Movie), genre or [], genre_mode)
+    return await cached_json_async(request, ("movies",), list[MovieOut],
+                                   lambda response: keyset_page_async(db, stmt, Movie.movieId, response, cursor, skip, limit))
+
+@router.get("/movies/{movie_id}", response_model=MovieOut)
+async def get_movie(movie_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if catalog.enabled:
+        return await cached_json_async(request, ("movies",), MovieOut,
+                                       lambda response: snapshot_or_404(catalog.movies, movie_id, "Film nie znaleziony"))
+    return await cached_json_async(request, ("movies",), MovieOut,
+                                   lambda response: get_or_404(db, Movie, movie_id, "Film nie znaleziony"))
+
+@router.put("/movies/{movie_id}/my-rating", response_model=RatingOut)
+async def upsert_my_rating(movie_id: int, rating_data: RatingUpsert, response: Response,
+                           db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    exists = catalog.movies.get(movie_id) if catalog.enabled else await db.get(Movie, movie_id)
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Film nie znaleziony")
+    row, created = await db.run_sync(aggregates.upsert_rating, current_user.id, movie_id,
+                                     rating_data.rating, rating_data.timestamp)
+    await db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
+    response.status_code = 201 if created else 200
+    return row
+
+@router.post("/movies", response_model=MovieOut, status_code=201)
+async def create_movie(movie_data: MovieCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    new_movie = Movie(title=movie_data.title, genres=movie_data.genres)
+    db.add(new_movie)
+    await db.flush()
+    await db.run_sync(genres.set_movie_genres, new_movie.movieId, new_movie.genres)
+    await db.commit()
+    await db.run_sync(catalog.refresh, movies=[new_movie.movieId])
+    table_versions.bump("movies")
+    await db.refresh(new_movie)
+    return new_movie
+
+@router.put("/movies/{movie_id}", response_model=MovieOut)
+async def update_movie(movie_update: MovieUpdate, movie_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    movie = await get_or_404(db, Movie, movie_id, "Film nie znaleziony")
+    if movie_update.title: movie.title = movie_update.title
+    if movie_update.genres:
+        movie.genres = movie_update.genres
+        await db.run_sync(genres.set_movie_genres, movie_id, movie.genres)
+    await db.commit()
+    await db.run_sync(catalog.refresh, movies=[movie_id])
+    table_versions.bump("movies")
+    await db.refresh(movie)
+    top_movies.mark_dirty()
+    return movie
+
+@router.delete("/movies/{movie_id}", status_code=204)
+async def delete_movie(movie_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    movie = await get_or_404(db, Movie, movie_id, "Film nie znaleziony")
+    await db.delete(movie)
+    await db.run_sync(genres.set_movie_genres, movie_id, None)
+    await db.commit()
+    await db.run_sync(catalog.refresh, movies=[movie_id])
+    table_versions.bump("movies")
+    top_movies.mark_dirty()
+    return None
+
+# LINKS CRUD
+
+@router.get("/links", response_model=list[LinkOut])
+async def get_links(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+                    db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if catalog.enabled:
+        return await cached_json_async(request, ("links",), list[LinkOut],
+                                       lambda response: memory_page(catalog.links, response, cursor, skip, limit))
+    return await cached_json_async(request, ("links",), list[LinkOut],
+                                   lambda response: keyset_page_async(db, select(Link), Link.movieId, response, cursor, skip, limit))
+
+@router.get("/links/{movie_id}", response_model=LinkOut)
+async def get_link(movie_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if catalog.enabled:
+        return await cached_json_async(request, ("links",), LinkOut,
+                                       lambda response: snapshot_or_404(catalog.links, movie_id, "Link nie znaleziony"))
+    return await cached_json_async(request, ("links",), LinkOut,
+                                   lambda response: get_or_404(db, Link, movie_id, "Link nie znaleziony"))
+
+@router.post("/links", response_model=LinkOut, status_code=201)
+async def create_link(link_data: LinkCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    await get_or_404(db, Movie, link_data.movieId, "Film o podanym ID nie istnieje")
+    if await db.get(Link, link_data.movieId) is not None:
+        raise HTTPException(status_code=409, detail="Link dla tego filmu już istnieje")
+
+    new_link = Link(**link_data.model_dump())
+    db.add(new_link)
+    await db.commit()
+    await db.run_sync(catalog.refresh, links=[new_link.movieId])
+    table_versions.bump("links")
+    await db.refresh(new_link)
+    return new_link
+
+@router.put("/links/{movie_id}", response_model=LinkOut)
+async def update_link(link_update: LinkUpdate, movie_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    link = await get_or_404(db, Link, movie_id, "Link nie znaleziony")
+    if link_update.imdbId: link.imdbId = link_update.imdbId
+    if link_update.tmdbId: link.tmdbId = link_update.tmdbId
+    await db.commit()
+    await db.run_sync(catalog.refresh, links=[movie_id])
+    table_versions.bump("links")
+    await db.refresh(link)
+    return link
+
+@router.delete("/links/{movie_id}", status_code=204)
+async def delete_link(movie_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    link = await get_or_404(db, Link, movie_id, "Link nie znaleziony")
+    await db.delete(link)
+    await db.commit()
+    await db.run_sync(catalog.refresh, links=[movie_id])
+    table_versions.bump("links")
+    return None
+
+# RATINGS CRUD
+
+@router.get("/ratings", response_model=list[RatingOut])
+async def get_ratings(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+                      filters: RangeFilters = Depends(rating_filters), db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    return await cached_json_async(request, ("ratings",), list[RatingOut],
+                                   lambda response: filtered_page_async(db, Rating, filters, response, cursor, skip, limit))
+
+@router.get("/ratings/{rating_id}", response_model=RatingOut)
+async def get_rating(rating_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    return await cached_json_async(request, ("ratings",), RatingOut,
+                                   lambda response: get_or_404(db, Rating, rating_id, "Ocena nie znaleziona"))
+
+@router.post("/ratings", response_model=RatingOut, status_code=201)
+async def create_rating(rating_data: RatingCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if write_queue.write_behind is not None:
+        result = await submit_write_behind("rating", {"userId": current_user.id, **rating_data.model_dump()})
+        table_versions.bump("ratings")
+        top_movies.mark_dirty()
+        return result
+
+    new_rating = Rating(
+        userId=current_user.id,
+        movieId=rating_data.movieId,
+        rating=rating_data.rating,
+        timestamp=rating_data.timestamp
+    )
+    db.add(new_rating)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=aggregates.DUPLICATE_RATING)
+    await db.run_sync(aggregates.add_rating, new_rating.movieId, new_rating.rating)
+    await db.commit()
+    table_versions.bump("ratings")
+    await db.refresh(new_rating)
+    top_movies.mark_dirty()
+    return new_rating
+
+@router.put("/ratings/{rating_id}", response_model=RatingOut)
+async def update_rating(rating_update: RatingUpdate, rating_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    rating = await get_or_404(db, Rating, rating_id, "Ocena nie znaleziona")
+    if rating.userId != current_user.id and current_user.role != "ROLE_ADMIN":
+        raise HTTPException(status_code=403, detail="Nie możesz edytować cudzej oceny")
+
+    old_value = rating.rating
+    if rating_update.rating is not None: rating.rating = rating_update.rating
+    if rating_update.timestamp is not None: rating.timestamp = rating_update.timestamp
+    await db.flush()
+    await db.run_sync(aggregates.change_rating, rating.movieId, old_value, rating.rating)
+    await db.commit()
+    table_versions.bump("ratings")
+    await db.refresh(rating)
+    top_movies.mark_dirty()
+    return rating
+
+@router.delete("/ratings/{rating_id}", status_code=204)
+async def delete_rating(rating_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    rating = await get_or_404(db, Rating, rating_id, "Ocena nie znaleziona")
+    await db.delete(rating)
+    await db.flush()
+    await db.run_sync(aggregates.remove_rating, rating.movieId, rating.rating)
+    await db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
+    return None
+
+# TAGS CRUD
+
+@router.get("/tags", response_model=list[TagOut])
+async def get_tags(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+                   filters: RangeFilters = Depends(tag_filters), db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    return await cached_json_async(request, ("tags",), list[TagOut],
+                                   lambda response: filtered_page_async(db, Tag, filters, response, cursor, skip, limit))
+
+@router.get("/tags/{tag_id}", response_model=TagOut)
+async def get_tag(tag_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    return await cached_json_async(request, ("tags",), TagOut,
+                                   lambda response: get_or_404(db, Tag, tag_id, "Tag nie znaleziony"))
+
+@router.post("/tags", response_model=TagOut, status_code=201)
+async def create_tag(tag_data: TagCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    if write_queue.write_behind is not None:
+        result = await submit_write_behind("tag", {"userId": current_user.id, **tag_data.model_dump()})
+        table_versions.bump("tags")
+        return result
+
+    new_tag = Tag(
+        userId=current_user.id,
+        movieId=tag_data.movieId,
+        tag=tag_data.tag,
+        timestamp=tag_data.timestamp
+    )
+    db.add(new_tag)
+    await db.commit()
+    table_versions.bump("tags")
+    await db.refresh(new_tag)
+    return new_tag
+
+@router.put("/tags/{tag_id}", response_model=TagOut)
+async def update_tag(tag_update: TagUpdate, tag_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    tag = await get_or_404(db, Tag, tag_id, "Tag nie znaleziony")
+    if tag_update.tag is not None: tag.tag = tag_update.tag
+    await db.commit()
+    table_versions.bump("tags")
+    await db.refresh(tag)
+    return tag
+
+@router.delete("/tags/{tag_id}", status_code=204)
+async def delete_tag(tag_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_user_async)):
+    tag = await get_or_404(db, Tag, tag_id, "Tag nie znaleziony")
+    await db.delete(tag)
+    await db.commit()
+    table_versions.bump("tags")
+    return None
+
+
+def replace_routes(app, router: APIRouter) -> None:
+    """Podmienia trasy aplikacji o tej samej ścieżce i metodach na trasy z `router`.
+
+    Trasy zostają na swoich miejscach na liście, więc kolejność dopasowania
+    (np. /movies/top przed /movies/{movie_id}) się nie zmienia.
+    """
+    replacements = {(route.path, frozenset(route.methods)): route for route in router.routes}
+    app.router.routes[:] = [
+        replacements.get((getattr(route, "path", None), frozenset(getattr(route, "methods", None) or ())), route)
+        for route in app.router.routes
+    ]
+    app.openapi_schema = None
@@ -1,16 +1,83 @@
 # app/db.py
-from sqlalchemy import create_engine
+import os
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from .models import Base
 from pathlib import Path
 
 # Konfiguracja bazy danych
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "database.db"
+DB_PATH = Path(os.getenv("DATABASE_PATH", BASE_DIR / "database.db"))
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+
+# DB_ASYNC=1: endpointy CRUD działają jako `async def` na silniku aiosqlite (zob. app/crud_async.py)
+USE_ASYNC_DB = os.getenv("DB_ASYNC", "0") == "1"
+
+# Pula połączeń. Razem (pool_size + max_overflow) jest jej więcej niż wątków w puli Starlette (40),
+# więc synchroniczne żądanie nie czeka na połączenie, a zapas zostaje dla zadań w tle (write-behind,
+# indeks podobnych filmów, konserwacja). Limit jest skończony: w trybie DB_ASYNC=1 liczby żądań nie
+# ogranicza pula wątków i bez niego każde równoległe żądanie otwierałoby własne połączenie -
+# po wyczerpaniu puli żądanie czeka (najwyżej DB_POOL_TIMEOUT sekund) na zwolnione połączenie.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Profil SQLite ustawiany na każdym nowym połączeniu z puli (zmienne środowiskowe SQLITE_*).
+# WAL: czytelnicy nie blokują pisarza i odwrotnie; synchronous=NORMAL w trybie WAL jest bezpieczne
+# przy awarii aplikacji (fsync tylko przy checkpoincie); mmap i większy cache zmniejszają liczbę odczytów.
+SQLITE_PROFILE = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # ujemne = KiB, tu 64 MB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+# Co ile sekund uruchamiać PRAGMA optimize i checkpoint WAL (0 = wyłączone)
+SQLITE_MAINTENANCE_INTERVAL = float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", "600"))
+
+
+def apply_sqlite_profile(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PROFILE.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def read_sqlite_settings(connection) -> dict:
+    """Aktualne wartości PRAGMA na danym połączeniu (do diagnostyki)."""
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in SQLITE_PROFILE}
+
+
+# Ostatnie uruchomienie konserwacji (do diagnostyki)
+maintenance_status = {"last_run": None, "last_checkpoint": None}
+
+
+def run_sqlite_maintenance() -> None:
+    """PRAGMA optimize (aktualizacja statystyk planera) + pasywny checkpoint WAL."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        if str(SQLITE_PROFILE["journal_mode"]).upper() == "WAL":
+            busy, log_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").one()
+            maintenance_status["last_checkpoint"] = {
+                "busy": busy, "log_frames": log_frames, "checkpointed": checkpointed
+            }
+    maintenance_status["last_run"] = time.time()
+
 
 # Ustawienie silnika bazy danych
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+event.listen(engine, "connect", apply_sqlite_profile)
 
 # Tworzenie sesji
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,3 +89,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Silnik i sesje asynchroniczne - tworzone tylko w trybie DB_ASYNC=1
+# (wymagają pakietów aiosqlite i greenlet, zob. requirements.txt)
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                                       pool_timeout=DB_POOL_TIMEOUT)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_profile)
+    # expire_on_commit=False: po commit nie ma leniwego doczytywania atrybutów (niedostępne w async)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Asynchroniczna baza jest wyłączona - ustaw DB_ASYNC=1")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,31 @@
+import sqlite3
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.db import (
+    get_db, engine, read_sqlite_settings, SQLITE_PROFILE, SQLITE_MAINTENANCE_INTERVAL,
+    maintenance_status, USE_ASYNC_DB
+)
+from app.security import get_current_admin_user, Principal
+from app.response_cache import response_cache
+from app.catalog import catalog
+from app.similarity import similar_movies
+from app.recommendations import recommender
+
+router = APIRouter()
+
+# Diagnostyka bazy: skonfigurowany profil SQLite vs wartości faktycznie aktywne na połączeniu,
+# stan puli połączeń i ostatnia konserwacja (PRAGMA optimize / checkpoint WAL). Tylko dla ROLE_ADMIN.
+@router.get("/db")
+def get_db_diagnostics(db: Session = Depends(get_db), current_admin: Principal = Depends(get_current_admin_user)):
+    return {
+        "sqlite_version": sqlite3.sqlite_version,
+        "configured": SQLITE_PROFILE,
+        "active": read_sqlite_settings(db.connection()),
+        "pool": engine.pool.status(),
+        "async_mode": USE_ASYNC_DB,
+        "maintenance": {"interval_seconds": SQLITE_MAINTENANCE_INTERVAL, **maintenance_status},
+        "response_cache": response_cache.stats(),
+        "catalog": catalog.stats(),
+        "similarity": similar_movies.stats(),
+        "recommender": recommender.stats(),
+    }
@@ -0,0 +1,89 @@
+# app/export_router.py
+# Eksport całych tabel: GET /export/{table}?format=ndjson|csv.
+# Wiersze idą prosto z kursora bazy (yield_per) do StreamingResponse - bez obiektów ORM
+# i walidacji pydantic, a zużycie pamięci nie zależy od rozmiaru tabeli.
+import csv
+import io
+import json
+from typing import Iterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.models import Movie, Link, Rating, Tag
+from app.security import get_current_user
+
+# Ile wierszy pobieramy z kursora i wysyłamy w jednym kawałku odpowiedzi
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_TABLES = {"movies": Movie, "links": Link, "ratings": Rating, "tags": Tag}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+router = APIRouter()
+
+
+def export_statement(model, movie_id: Optional[int], user_id: Optional[int],
+                     ts_from: Optional[int], ts_to: Optional[int]):
+    table = model.__table__
+    stmt = select(*table.columns)
+    filters = {"movieId": movie_id, "userId": user_id}
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if column not in table.columns:
+            raise HTTPException(status_code=400, detail=f"Tabela {table.name} nie ma kolumny {column}")
+        stmt = stmt.where(table.columns[column] == value)
+    if ts_from is not None or ts_to is not None:
+        if "timestamp" not in table.columns:
+            raise HTTPException(status_code=400, detail=f"Tabela {table.name} nie ma kolumny timestamp")
+        if ts_from is not None:
+            stmt = stmt.where(table.c.timestamp >= ts_from)
+        if ts_to is not None:
+            stmt = stmt.where(table.c.timestamp < ts_to)
+    return stmt.order_by(*table.primary_key.columns)
+
+
+def iter_ndjson(rows, columns: list[str]) -> Iterator[str]:
+    for chunk in rows.partitions():
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in chunk)
+
+
+def iter_csv(rows, columns: list[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for chunk in rows.partitions():
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_rows(bind, stmt, render, columns: list[str]) -> Iterator[str]:
+    # Własna sesja, otwierana i zamykana w generatorze: sesja z get_db może zostać zamknięta
+    # przed wysłaniem ciała odpowiedzi (zależnie od wersji FastAPI), a ta żyje dokładnie tyle co strumień
+    with Session(bind=bind) as db:
+        rows = db.execute(stmt, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+        yield from render(rows, columns)
+
+
+@router.get("/{table}")
+def export_table(table: str, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                 movieId: Optional[int] = None, userId: Optional[int] = None,
+                 ts_from: Optional[int] = None, ts_to: Optional[int] = None,
+                 db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # ts_from/ts_to: zakres timestamp [ts_from, ts_to) dla ratings i tags
+    model = EXPORT_TABLES.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Nieznana tabela")
+    stmt = export_statement(model, movieId, userId, ts_from, ts_to)
+    columns = [column.name for column in model.__table__.columns]
+
+    body = stream_rows(db.get_bind(), stmt, iter_csv if format == "csv" else iter_ndjson, columns)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="{table}.{format}"',
+    })
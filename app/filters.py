@@ -0,0 +1,102 @@
+# app/filters.py
+# Filtry zakresowe list GET /ratings i GET /tags: movieId, userId, since/until (timestamp w [since, until)),
+# min_rating/max_rating (tylko oceny) i sortowanie: id albo timestamp, "-" na początku to kolejność malejąca.
+# Każda dozwolona kombinacja trafia w prefiks jednego z indeksów z models.py:
+#   userId + movieId            -> ux_ratings_user_movie (najwyżej jedna ocena)
+#   userId, sort=id             -> ix_ratings_user_by_id / ix_tags_user_by_id
+#   movieId, sort=id            -> ix_ratings_movie_by_id / ix_tags_movie_by_id
+#   userId [+ czas], timestamp  -> ix_ratings_user_time / ix_tags_user_time
+#   movieId [+ czas], timestamp -> ix_ratings_movie_time / ix_tags_movie_time
+#   sam czas, sort=timestamp    -> ix_ratings_time / ix_tags_time
+# Ocena ma tylko kilka różnych wartości i nie ma własnego indeksu, dlatego min_rating/max_rating
+# zawężają jedną z powyższych kombinacji - bez movieId, userId ani since/until dostajemy 400.
+# Zakres czasu (since/until) nie ma indeksu w kolejności id - strona wg id czytałaby i sortowała
+# wszystkie wiersze z zakresu - więc jest zwracany wg czasu (domyślne sortowanie zmienia się wtedy
+# na timestamp, a jawne sort=id daje 400).
+#
+# Sortowanie po czasie idzie po kluczu (timestamp, id), czyli w kolejności indeksu - bez sortowania
+# w pamięci, a kursor to para [timestamp, id]. Wiersze bez timestamp nie mają miejsca na osi czasu
+# i przy sort=timestamp są pomijane.
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from app.pagination import keyset_page
+
+SORT_PATTERN = "^-?(id|timestamp)$"
+
+
+@dataclass(frozen=True)
+class RangeFilters:
+    movie_id: Optional[int] = None
+    user_id: Optional[int] = None
+    since: Optional[int] = None
+    until: Optional[int] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    sort: str = "id"
+
+    @property
+    def descending(self) -> bool:
+        return self.sort.startswith("-")
+
+    @property
+    def by_time(self) -> bool:
+        return self.sort.lstrip("-") == "timestamp"
+
+
+def resolve_sort(sort: Optional[str], movie_id, user_id, since, until) -> str:
+    timed = since is not None or until is not None
+    if sort is None:
+        return "timestamp" if timed else "id"
+    if timed and sort.lstrip("-") == "id":
+        raise HTTPException(status_code=400, detail="Zakres czasu (since/until) można sortować tylko po timestamp")
+    return sort
+
+
+def tag_filters(movieId: Optional[int] = None, userId: Optional[int] = None,
+                since: Optional[int] = None, until: Optional[int] = None,
+                sort: Optional[str] = Query(None, pattern=SORT_PATTERN)) -> RangeFilters:
+    return RangeFilters(movieId, userId, since, until, sort=resolve_sort(sort, movieId, userId, since, until))
+
+
+def rating_filters(movieId: Optional[int] = None, userId: Optional[int] = None,
+                   since: Optional[int] = None, until: Optional[int] = None,
+                   min_rating: Optional[float] = None, max_rating: Optional[float] = None,
+                   sort: Optional[str] = Query(None, pattern=SORT_PATTERN)) -> RangeFilters:
+    if (min_rating is not None or max_rating is not None) and \
+            movieId is None and userId is None and since is None and until is None:
+        raise HTTPException(status_code=400,
+                            detail="min_rating/max_rating wymagają filtra movieId, userId albo since/until")
+    return RangeFilters(movieId, userId, since, until, min_rating, max_rating,
+                        resolve_sort(sort, movieId, userId, since, until))
+
+
+def apply_filters(query, model, filters: RangeFilters):
+    """Dokłada warunki filtrów do zapytania (Query albo select()).
+
+    Zwraca (zapytanie, klucz sortowania) - klucz przekazujemy dalej do keyset_statement.
+    """
+    if filters.movie_id is not None:
+        query = query.filter(model.movieId == filters.movie_id)
+    if filters.user_id is not None:
+        query = query.filter(model.userId == filters.user_id)
+    if filters.since is not None:
+        query = query.filter(model.timestamp >= filters.since)
+    if filters.until is not None:
+        query = query.filter(model.timestamp < filters.until)
+    if filters.min_rating is not None:
+        query = query.filter(model.rating >= filters.min_rating)
+    if filters.max_rating is not None:
+        query = query.filter(model.rating <= filters.max_rating)
+    if not filters.by_time:
+        return query, model.id
+    if filters.since is None and filters.until is None:
+        query = query.filter(model.timestamp.is_not(None))
+    return query, (model.timestamp, model.id)
+
+
+def filtered_page(query, model, filters: RangeFilters, response: Response,
+                  cursor: Optional[str] = None, skip: int = 0, limit: int = 50):
+    """Jedna strona przefiltrowanych wierszy (wersja dla synchronicznego Query)."""
+    query, key = apply_filters(query, model, filters)
+    return keyset_page(query, key, response, cursor, skip, limit, filters.descending)
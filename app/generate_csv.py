@@ -0,0 +1,258 @@
+# app/generate_csv.py
+# Generator syntetycznego zbioru w formacie MovieLens (movies.csv, links.csv, ratings.csv, tags.csv)
+# w dowolnej skali - do testów importu i zapytań na danych wielkości produkcyjnej.
+#
+# Rozkłady:
+#  - popularność filmów: prawo potęgowe (Zipf) po losowej permutacji filmów,
+#  - aktywność użytkowników: log-normalna (mediana wyraźnie poniżej średniej, długi ogon),
+#    co najmniej MIN_USER_RATINGS ocen na użytkownika, jak w MovieLens,
+#  - ocena = średnia + jakość filmu + łagodność użytkownika + szum, zaokrąglona do 0.5,
+#  - czas: każdy użytkownik jest aktywny w swoim okresie (start jednostajny w zakresie dat,
+#    długość wykładnicza), tagi mają długi ogon zarówno autorów, jak i słów.
+#
+# Pliki są zapisywane strumieniowo, użytkownik po użytkowniku (posortowane po userId, movieId
+# jak w MovieLens). Pamięć zależy od liczby filmów i użytkowników, a nie od liczby ocen.
+# Ten sam --seed daje identyczne pliki; każda tabela ma własny strumień losowy, więc np. zmiana
+# liczby tagów nie zmienia ocen.
+#
+# Użycie:
+#   python app/generate_csv.py --out data/ml-25m-synth --ratings 25000000
+#   python app/import_csv.py --db app/database.db --csv-dir data/ml-25m-synth --workers 4
+import argparse
+import csv
+import os
+import time
+import numpy as np
+
+# Domyślne proporcje jak w MovieLens 25M (25M ocen, 162k użytkowników, 62k filmów, 1.1M tagów)
+RATINGS_PER_USER = 150
+RATINGS_PER_TAG = 23
+MOVIES_SCALE = 12  # filmy = MOVIES_SCALE * sqrt(oceny)
+MIN_USER_RATINGS = 20
+
+POPULARITY_EXPONENT = 0.9
+ACTIVITY_SIGMA = 1.2
+TAG_USER_EXPONENT = 1.3
+TAG_WORD_EXPONENT = 1.1
+
+# Zakres dat ocen: 1996-01-01 .. 2020-01-01 (jak MovieLens 25M)
+START_TIMESTAMP = 820454400
+END_TIMESTAMP = 1577836800
+# Średnia długość okresu aktywności użytkownika (s)
+MEAN_ACTIVITY_SPAN = 180 * 24 * 3600
+
+# Ile wierszy zbieramy przed zapisem do pliku
+WRITE_CHUNK = 100_000
+
+GENRES = (
+    "Drama", "Comedy", "Thriller", "Romance", "Action", "Horror", "Documentary", "Crime", "Adventure",
+    "Sci-Fi", "Children", "Animation", "Mystery", "Fantasy", "War", "Western", "Musical", "Film-Noir",
+    "IMAX",
+)
+NO_GENRES = "(no genres listed)"
+TITLE_WORDS = (
+    "Love", "Night", "Day", "Man", "Woman", "Story", "Life", "Last", "Dead", "Girl", "Time", "World",
+    "House", "King", "Blood", "Dark", "Star", "City", "Black", "Red", "War", "Summer", "Secret", "Wild",
+    "Road", "Home", "Heart", "Dream", "Ghost", "Little", "American", "Big", "Lost", "Return", "Island",
+    "River", "Fire", "Moon", "Game", "Friends", "Family", "Shadow", "Angel", "Devil", "Journey",
+)
+TAG_WORDS = (
+    "atmospheric", "funny", "visually appealing", "sci-fi", "twist ending", "dark comedy", "thought-provoking",
+    "classic", "based on a book", "surreal", "psychology", "action", "quirky", "comedy", "great soundtrack",
+    "dystopia", "cinematography", "romance", "philosophical", "violence", "stylized", "bad ending",
+    "predictable", "slow", "overrated", "underrated", "Oscar (Best Picture)", "animation", "space", "time travel",
+)
+
+
+def default_scale(ratings, users=None, movies=None, tags=None):
+    """Uzupełnia brakujące rozmiary proporcjami z MovieLens."""
+    users = users or max(1, ratings // RATINGS_PER_USER)
+    movies = movies or max(10, int(MOVIES_SCALE * ratings ** 0.5))
+    tags = ratings // RATINGS_PER_TAG if tags is None else tags
+    return users, movies, tags
+
+
+def zipf_cdf(n, exponent, rng=None):
+    """Dystrybuanta rozkładu potęgowego; z `rng` po losowej permutacji pozycji (popularne nie są "na początku")."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    if rng is not None:
+        rng.shuffle(weights)
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def draw(cdf, size, rng):
+    # np.searchsorted na własnej dystrybuancie - rng.choice(p=...) liczyłoby ją przy każdym wywołaniu
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), len(cdf) - 1)
+
+
+def user_rating_counts(ratings, users, movies, rng, sigma=ACTIVITY_SIGMA):
+    """Liczby ocen użytkowników: log-normalne wagi, minimum MIN_USER_RATINGS, suma dokładnie `ratings`."""
+    ratings = min(ratings, users * movies)
+    floor = min(MIN_USER_RATINGS, ratings // users)
+    weights = rng.lognormal(0.0, sigma, users)
+    extra = (ratings - floor * users) * weights / weights.sum()
+    counts = floor + np.floor(extra).astype(np.int64)
+    # Reszta z zaokrągleń do największych części ułamkowych
+    missing = ratings - int(counts.sum())
+    counts[np.argsort(extra - np.floor(extra))[::-1][:missing]] += 1
+    # Użytkownik nie oceni więcej filmów, niż istnieje - nadmiar rozdzielamy na pozostałych
+    overflow = int(np.maximum(counts - movies, 0).sum())
+    counts = np.minimum(counts, movies)
+    while overflow:
+        room = np.flatnonzero(counts < movies)
+        take = rng.choice(room, min(overflow, len(room)), replace=False)
+        counts[take] += 1
+        overflow -= len(take)
+    return counts
+
+
+def sample_distinct(cdf, count, rng):
+    """`count` różnych pozycji filmów według popularności (losowanie z dolosowaniem duplikatów)."""
+    n = len(cdf)
+    if count * 4 >= n:
+        # Prawie wszystkie filmy - prościej wylosować bez zwracania z pełnym rozkładem
+        p = np.diff(cdf, prepend=0.0)
+        return np.sort(rng.choice(n, count, replace=False, p=p))
+    picked = np.unique(draw(cdf, count, rng))
+    while len(picked) < count:
+        picked = np.unique(np.concatenate([picked, draw(cdf, count - len(picked), rng)]))
+    return picked
+
+
+def movie_rows(movie_ids, rng):
+    years = rng.integers(1920, 2020, len(movie_ids))
+    genre_cdf = zipf_cdf(len(GENRES), 1.0)  # kolejność GENRES = od najczęstszego
+    for movie_id, year in zip(movie_ids.tolist(), years.tolist()):
+        words = rng.choice(len(TITLE_WORDS), rng.integers(1, 4), replace=False)
+        title = " ".join(TITLE_WORDS[i] for i in words)
+        if rng.random() < 0.05:
+            title += ", The"  # część tytułów ma przecinek - sprawdza cytowanie pól w CSV
+        if rng.random() < 0.01:
+            genres = NO_GENRES
+        else:
+            genres = "|".join(sorted({GENRES[i] for i in draw(genre_cdf, rng.integers(1, 4), rng)}))
+        yield movie_id, f"{title} ({year})", genres
+
+
+def link_rows(movie_ids, rng):
+    imdb = rng.choice(9_000_000, len(movie_ids), replace=False) + 100_000
+    tmdb = rng.choice(900_000, len(movie_ids), replace=False) + 1
+    missing = rng.random(len(movie_ids)) < 0.001  # w MovieLens część filmów nie ma tmdbId
+    for movie_id, imdb_id, tmdb_id, skip in zip(movie_ids.tolist(), imdb.tolist(), tmdb.tolist(), missing.tolist()):
+        yield movie_id, f"{imdb_id:07d}", "" if skip else tmdb_id
+
+
+def rating_rows(movie_ids, counts, rng, popularity_exponent=POPULARITY_EXPONENT,
+                start=START_TIMESTAMP, end=END_TIMESTAMP):
+    """Oceny użytkownik po użytkowniku; zwraca paczki wierszy (userId, movieId, rating, timestamp)."""
+    n_movies = len(movie_ids)
+    cdf = zipf_cdf(n_movies, popularity_exponent, rng)
+    quality = rng.normal(0.0, 0.5, n_movies)
+    chunk = []
+    for user_index, count in enumerate(counts.tolist()):
+        user_id = user_index + 1
+        positions = sample_distinct(cdf, count, rng)
+        values = 3.5 + quality[positions] + rng.normal(0.0, 0.4) + rng.normal(0.0, 0.9, count)
+        values = np.clip(np.round(values * 2) / 2, 0.5, 5.0)
+        first = rng.integers(start, end)
+        last = min(end, first + int(rng.exponential(MEAN_ACTIVITY_SPAN)) + 1)
+        timestamps = rng.integers(first, last, count)
+        chunk.extend(zip([user_id] * count, movie_ids[positions].tolist(), values.tolist(), timestamps.tolist()))
+        if len(chunk) >= WRITE_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def tag_rows(movie_ids, users, tags, rng, start=START_TIMESTAMP, end=END_TIMESTAMP):
+    """Tagi: niewielu użytkowników taguje dużo, popularne słowa powtarzają się najczęściej."""
+    if tags <= 0:
+        return
+    user_weights = 1.0 / np.arange(1, users + 1) ** TAG_USER_EXPONENT
+    rng.shuffle(user_weights)
+    per_user = rng.multinomial(tags, user_weights / user_weights.sum())
+    movie_cdf = zipf_cdf(len(movie_ids), POPULARITY_EXPONENT, rng)
+    word_cdf = zipf_cdf(len(TAG_WORDS), TAG_WORD_EXPONENT, rng)
+    chunk = []
+    for user_index in np.flatnonzero(per_user).tolist():
+        count = int(per_user[user_index])
+        movies = np.sort(movie_ids[draw(movie_cdf, count, rng)])
+        words = draw(word_cdf, count, rng)
+        timestamps = rng.integers(start, end, count)
+        chunk.extend(zip([user_index + 1] * count, movies.tolist(), (TAG_WORDS[w] for w in words.tolist()),
+                         timestamps.tolist()))
+        if len(chunk) >= WRITE_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(path, header, chunks):
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        for rows in chunks:
+            writer.writerows(rows)
+            written += len(rows)
+    return written
+
+
+def generate(out_dir, ratings, users=None, movies=None, tags=None, seed=0,
+             popularity_exponent=POPULARITY_EXPONENT, activity_sigma=ACTIVITY_SIGMA):
+    """Zapisuje cztery pliki CSV do `out_dir` i zwraca podsumowanie (liczby wierszy, czas)."""
+    users, movies, tags = default_scale(ratings, users, movies, tags)
+    os.makedirs(out_dir, exist_ok=True)
+    movie_rng, link_rng, rating_rng, tag_rng, id_rng = (
+        np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(5)
+    )
+    started = time.perf_counter()
+    # movieId rosnące z przerwami, jak w MovieLens
+    movie_ids = np.cumsum(id_rng.integers(1, 4, movies)).astype(np.int64)
+    counts = user_rating_counts(ratings, users, movies, rating_rng, activity_sigma)
+
+    summary = {
+        "movies": write_csv(os.path.join(out_dir, "movies.csv"), ("movieId", "title", "genres"),
+                            [list(movie_rows(movie_ids, movie_rng))]),
+        "links": write_csv(os.path.join(out_dir, "links.csv"), ("movieId", "imdbId", "tmdbId"),
+                           [list(link_rows(movie_ids, link_rng))]),
+        "ratings": write_csv(os.path.join(out_dir, "ratings.csv"), ("userId", "movieId", "rating", "timestamp"),
+                             rating_rows(movie_ids, counts, rating_rng, popularity_exponent)),
+        "tags": write_csv(os.path.join(out_dir, "tags.csv"), ("userId", "movieId", "tag", "timestamp"),
+                          tag_rows(movie_ids, users, tags, tag_rng)),
+        "users": users,
+        "seed": seed,
+    }
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generator syntetycznych danych MovieLens (CSV).")
+    parser.add_argument('--out', required=True, help="katalog na pliki CSV")
+    parser.add_argument('--ratings', type=int, default=1_000_000, help="liczba ocen")
+    parser.add_argument('--users', type=int, help=f"liczba użytkowników (domyślnie oceny / {RATINGS_PER_USER})")
+    parser.add_argument('--movies', type=int, help=f"liczba filmów (domyślnie {MOVIES_SCALE} * sqrt(oceny))")
+    parser.add_argument('--tags', type=int, help=f"liczba tagów (domyślnie oceny / {RATINGS_PER_TAG})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--popularity-exponent', type=float, default=POPULARITY_EXPONENT,
+                        help="wykładnik rozkładu potęgowego popularności filmów")
+    parser.add_argument('--activity-sigma', type=float, default=ACTIVITY_SIGMA,
+                        help="sigma rozkładu log-normalnego aktywności użytkowników")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    summary = generate(args.out, args.ratings, args.users, args.movies, args.tags, args.seed,
+                       args.popularity_exponent, args.activity_sigma)
+    for key, value in summary.items():
+        print(f"{key:>8}: {value}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# app/genres.py
+# Indeks gatunków: tabela movie_genres (genre, movieId) utrzymywana razem z tabelą movies.
+# Filtrowanie po gatunku korzysta z klucza tabeli zamiast LIKE '%...%' po Movie.genres.
+from typing import Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models import Movie, MovieGenre
+
+NO_GENRES = "(no genres listed)"
+
+
+def split_genres(genres: Optional[str]) -> list[str]:
+    if not genres or genres == NO_GENRES:
+        return []
+    return sorted({g.strip() for g in genres.split("|") if g.strip()})
+
+
+def set_movie_genres(db: Session, movie_id: int, genres: Optional[str]) -> None:
+    """Zastępuje wpisy indeksu dla filmu (wołane w tej samej transakcji co zapis filmu)."""
+    db.execute(delete(MovieGenre).where(MovieGenre.movieId == movie_id))
+    names = split_genres(genres)
+    if names:
+        db.execute(insert(MovieGenre), [{"genre": g, "movieId": movie_id} for g in names])
+
+
+def rebuild_movie_genres(db: Session) -> None:
+    db.execute(delete(MovieGenre))
+    rows = [
+        {"genre": g, "movieId": movie_id}
+        for movie_id, genres in db.execute(select(Movie.movieId, Movie.genres))
+        for g in split_genres(genres)
+    ]
+    if rows:
+        db.execute(insert(MovieGenre), rows)
+
+
+def backfill_movie_genres(db: Session) -> None:
+    """Wypełnia pusty indeks gatunków dla baz utworzonych przed jego dodaniem."""
+    if db.scalar(select(MovieGenre.movieId).limit(1)) is None and \
+            db.scalar(select(Movie.movieId).limit(1)) is not None:
+        rebuild_movie_genres(db)
+        db.commit()
+
+
+def filter_by_genres(query, genres: list[str], mode: str = "and"):
+    """Zawęża zapytanie o filmy do tych z podanymi gatunkami (mode="and" - wszystkie, "or" - dowolny)."""
+    if not genres:
+        return query
+    if mode == "or":
+        return query.filter(Movie.movieId.in_(select(MovieGenre.movieId).where(MovieGenre.genre.in_(genres))))
+    for genre in genres:
+        query = query.filter(Movie.movieId.in_(select(MovieGenre.movieId).where(MovieGenre.genre == genre)))
+    return query
+
+
+def genre_facets(db: Session, genres: Optional[list[str]] = None, mode: str = "and") -> list[dict]:
+    """Liczba filmów w każdym gatunku - dla całej bazy albo tylko dla filmów spełniających filtr."""
+    stmt = select(MovieGenre.genre, func.count().label("count")).group_by(MovieGenre.genre)
+    if genres:
+        matching = filter_by_genres(select(Movie.movieId), genres, mode)
+        stmt = stmt.where(MovieGenre.movieId.in_(matching))
+    stmt = stmt.order_by(func.count().desc(), MovieGenre.genre)
+    return [{"genre": genre, "count": count} for genre, count in db.execute(stmt)]
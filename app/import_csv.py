@@ -1,145 +1,658 @@
+import argparse
 import csv
+import hashlib
+import json
 import sqlite3
 import os
+import io
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 
 # Konfiguracja ścieżek
 DB_PATH = 'app/database.db'
 CSV_FOLDER = 'database'  # Zakładam, że folder z CSV nazywa się 'database' i jest w głównym katalogu
 
-def import_movies(cursor):
-    path = os.path.join(CSV_FOLDER, 'movies.csv')
+# Ile wierszy wstawiamy w jednej transakcji. Pamięć importu jest ograniczona do jednej paczki,
+# więc nawet plik ratings.csv z 25M wierszy nie jest wczytywany w całości do RAM.
+BATCH_SIZE = 50000
+
+# PRAGMA ustawiane tylko na czas importu (dotyczą tego jednego połączenia).
+# synchronous=OFF: nie czekamy na fsync po każdej paczce - import można po prostu powtórzyć.
+IMPORT_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MB cache stron
+)
+
+
+def read_header(path):
+    """Zwraca listę nazw kolumn z pierwszej linii pliku CSV."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f))
+
+
+def convert_rows(reader, fields, convert, stats=None):
+    """Zamienia surowe wiersze CSV na krotki do INSERT; wiersze z błędnymi typami są pomijane."""
+    col = {name: i for i, name in enumerate(fields)}
+    for values in reader:
+        try:
+            yield convert(values, col)
+        except (ValueError, IndexError):
+            if stats is not None:
+                stats['skipped'] = stats.get('skipped', 0) + 1
+
+
+def read_csv(path, convert, stats=None):
+    """Generator: czyta plik CSV wiersz po wierszu i zwraca krotki gotowe do INSERT."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        fields = next(reader)
+        yield from convert_rows(reader, fields, convert, stats)
+
+
+def batched(rows, size):
+    """Dzieli dowolny iterator na listy o długości co najwyżej `size`."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_batches(conn, sql, rows, batch_size, label):
+    """Wstawia wiersze paczkami - każda paczka to osobna transakcja. Zwraca liczbę wierszy."""
+    total = 0
+    start = time.perf_counter()
+    for batch in batched(rows, batch_size):
+        with conn:  # BEGIN ... COMMIT (albo ROLLBACK przy wyjątku)
+            conn.executemany(sql, batch)
+        total += len(batch)
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0.0
+        print(f"  {label}: {total:,} wierszy ({rate:,.0f} w/s)", end='\r', flush=True)
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Zaimportowano {total:,} {label} w {elapsed:.2f}s ({rate:,.0f} w/s).")
+    return total
+
+
+def movie_row(values, col):
+    # movieId, title, genres
+    return (int(values[col['movieId']]), values[col['title']], values[col['genres']])
+
+
+def link_row(values, col):
+    # movieId, imdbId, tmdbId
+    return (int(values[col['movieId']]), values[col['imdbId']], values[col['tmdbId']])
+
+
+def tag_row(values, col):
+    # userId, movieId, tag, timestamp
+    # Uwaga: Tagi w CSV zazwyczaj mają 'userId'.
+    # Ponieważ nasza baza jest nowa, możemy nie mieć użytkowników o takich ID.
+    # Dla uproszczenia przypisujemy wszystkie tagi do admina (ID=1).
+    return (1, int(values[col['movieId']]), values[col['tag']], int(values[col['timestamp']]))
+
+
+def rating_row(values, col):
+    # userId, movieId, rating, timestamp - ocenę przypisujemy do Admina (ID=1) dla uproszczenia
+    return (1, int(values[col['movieId']]), float(values[col['rating']]), int(values[col['timestamp']]))
+
+
+def tag_row_keep_user(values, col):
+    return (int(values[col['userId']]), int(values[col['movieId']]), values[col['tag']], int(values[col['timestamp']]))
+
+
+def rating_row_keep_user(values, col):
+    return (int(values[col['userId']]), int(values[col['movieId']]), float(values[col['rating']]), int(values[col['timestamp']]))
+
+
+# Konwertery zachowujące userId z CSV (domyślne; potrzebne np. rekomendacjom "podobne filmy",
+# które liczą podobieństwo z ocen różnych użytkowników). Przy --single-user wszystkie oceny trafiają
+# do użytkownika 1, a unikalny indeks (userId, movieId) zostawia tylko pierwszą ocenę każdego filmu.
+KEEP_USER_CONVERTERS = {'tags': tag_row_keep_user, 'ratings': rating_row_keep_user}
+
+
+# Opis importowanych tabel: plik CSV, zapytanie INSERT, konwerter wiersza i etykieta do logów.
+TABLES = {
+    'movies': (
+        'movies.csv',
+        'INSERT OR IGNORE INTO movies (movieId, title, genres) VALUES (?, ?, ?)',
+        movie_row, 'filmów',
+    ),
+    'links': (
+        'links.csv',
+        'INSERT OR IGNORE INTO links (movieId, imdbId, tmdbId) VALUES (?, ?, ?)',
+        link_row, 'linków',
+    ),
+    'tags': (
+        'tags.csv',
+        'INSERT OR IGNORE INTO tags (userId, movieId, tag, timestamp) VALUES (?, ?, ?, ?)',
+        tag_row, 'tagów',
+    ),
+    'ratings': (
+        'ratings.csv',
+        'INSERT OR IGNORE INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)',
+        rating_row, 'ocen',
+    ),
+}
+
+# Kolejność importu: filmy muszą być w bazie przed linkami, tagami i ocenami, które się do nich odwołują.
+IMPORT_ORDER = (('movies',), ('links', 'tags', 'ratings'))
+
+
+def row_converter(table, keep_user_ids=True):
+    if keep_user_ids and table in KEEP_USER_CONVERTERS:
+        return KEEP_USER_CONVERTERS[table]
+    return TABLES[table][2]
+
+
+def import_table(conn, table, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER, keep_user_ids=True):
+    filename, sql, _, label = TABLES[table]
+    convert = row_converter(table, keep_user_ids)
+    path = os.path.join(csv_folder, filename)
     if not os.path.exists(path):
         print(f"Brak pliku: {path}")
-        return
+        return 0
 
-    print("Importowanie filmów...")
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        movies_to_insert = []
-        for row in reader:
-            # movieId, title, genres
-            movies_to_insert.append((
-                row['movieId'],
-                row['title'],
-                row['genres']
-            ))
-        
-        # Używamy executemany dla szybkości
-        cursor.executemany(
-            'INSERT OR IGNORE INTO movies (movieId, title, genres) VALUES (?, ?, ?)',
-            movies_to_insert
-        )
-        print(f"Zaimportowano {len(movies_to_insert)} filmów.")
+    print(f"Importowanie: {filename}...")
+    stats = {}
+    total = insert_batches(conn, sql, read_csv(path, convert, stats), batch_size, label)
+    if stats.get('skipped'):
+        print(f"  Pominięto {stats['skipped']:,} błędnych wierszy.")
+    return total
+
+
+def import_movies(conn, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER):
+    return import_table(conn, 'movies', batch_size, csv_folder)
+
+
+def import_links(conn, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER):
+    return import_table(conn, 'links', batch_size, csv_folder)
+
+
+def import_tags(conn, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER, keep_user_ids=True):
+    return import_table(conn, 'tags', batch_size, csv_folder, keep_user_ids)
+
+
+def import_ratings(conn, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER, keep_user_ids=True):
+    return import_table(conn, 'ratings', batch_size, csv_folder, keep_user_ids)
+
+
+# --- TRYB RÓWNOLEGŁY (pipeline) ---
+# Procesy robocze parsują i walidują fragmenty plików, a jedno połączenie (proces główny)
+# zapisuje gotowe paczki. Liczba fragmentów "w locie" jest ograniczona (kolejka o stałym rozmiarze),
+# więc pamięć nie rośnie, gdy parsowanie jest szybsze niż zapis.
+
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def chunk_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """Dzieli plik (bez nagłówka) na zakresy bajtów [start, end) kończące się na granicy linii.
+
+    Zakładamy, że pola CSV nie zawierają znaków nowej linii (tak jest w plikach MovieLens).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()  # nagłówek
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # dociągamy do końca bieżącej linii
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def parse_chunk(table, path, start, end, fields, keep_user_ids=True):
+    """Uruchamiane w procesie roboczym: parsuje fragment pliku i zwraca (wiersze, liczba_pominiętych)."""
+    convert = row_converter(table, keep_user_ids)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8')
+    stats = {}
+    rows = list(convert_rows(csv.reader(io.StringIO(data, newline='')), fields, convert, stats))
+    return rows, stats.get('skipped', 0)
+
+
+def import_parallel(conn, workers, chunk_bytes=CHUNK_BYTES, csv_folder=CSV_FOLDER, queue_size=None,
+                    keep_user_ids=True):
+    """Import wszystkich plików: parsowanie w puli procesów, zapis w jednym połączeniu."""
+    queue_size = queue_size or workers * 2
+    totals = {}
+    start_time = time.perf_counter()
+
+    def write(table, future):
+        rows, skipped = future.result()
+        with conn:
+            conn.executemany(TABLES[table][1], rows)
+        totals[table] = totals.get(table, 0) + len(rows)
+        if skipped:
+            totals['skipped'] = totals.get('skipped', 0) + skipped
+        done = sum(v for k, v in totals.items() if k != 'skipped')
+        elapsed = time.perf_counter() - start_time
+        print(f"  {done:,} wierszy ({done / elapsed:,.0f} w/s)", end='\r', flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for stage in IMPORT_ORDER:
+            pending = deque()
+            for table in stage:
+                path = os.path.join(csv_folder, TABLES[table][0])
+                if not os.path.exists(path):
+                    print(f"Brak pliku: {path}")
+                    continue
+                fields = read_header(path)
+                for start, end in chunk_ranges(path, chunk_bytes):
+                    if len(pending) >= queue_size:
+                        write(*pending.popleft())
+                    pending.append((table, pool.submit(parse_chunk, table, path, start, end, fields, keep_user_ids)))
+            # Etap musi się zakończyć (np. wszystkie filmy zapisane), zanim zaczniemy następny
+            while pending:
+                write(*pending.popleft())
+
+    elapsed = time.perf_counter() - start_time
+    for table in TABLES:
+        if table in totals:
+            print(f"Zaimportowano {totals[table]:,} {TABLES[table][3]}.")
+    if totals.get('skipped'):
+        print(f"Pominięto {totals['skipped']:,} błędnych wierszy.")
+    done = sum(v for k, v in totals.items() if k != 'skipped')
+    print(f"Razem {done:,} wierszy w {elapsed:.2f}s ({done / elapsed:,.0f} w/s, procesy: {workers}).")
+    return totals
+
+
+# --- TRYB PRZYROSTOWY (--incremental) ---
+# Plik jest dzielony na fragmenty po `batch_size` linii. Dla każdego fragmentu zapisujemy w bazie
+# offset w pliku i hash zawartości. Kolejne uruchomienia przetwarzają tylko fragmenty nowe
+# lub zmienione, a dane fragmentu i jego checkpoint są zatwierdzane w jednej transakcji,
+# więc po awarii import rusza od ostatniego zatwierdzonego fragmentu.
+
+CHECKPOINTS_DDL = """
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    filename TEXT NOT NULL,
+    chunk_no INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    id_ranges TEXT,
+    PRIMARY KEY (filename, chunk_no)
+)
+"""
+
+# Filmy i linki mają naturalny klucz (movieId) - zmienione wiersze nadpisujemy przez UPSERT.
+UPSERTS = {
+    'movies': 'INSERT INTO movies (movieId, title, genres) VALUES (?, ?, ?) '
+              'ON CONFLICT(movieId) DO UPDATE SET title = excluded.title, genres = excluded.genres',
+    'links': 'INSERT INTO links (movieId, imdbId, tmdbId) VALUES (?, ?, ?) '
+             'ON CONFLICT(movieId) DO UPDATE SET imdbId = excluded.imdbId, tmdbId = excluded.tmdbId',
+}
+
+# Oceny i tagi nie mają klucza w CSV - wiersz identyfikujemy pozycją we fragmencie,
+# a checkpoint pamięta, jakie id dostały wiersze danego fragmentu.
+POSITIONAL_COLUMNS = {
+    'ratings': ('userId', 'movieId', 'rating', 'timestamp'),
+    'tags': ('userId', 'movieId', 'tag', 'timestamp'),
+}
 
-def import_links(cursor):
-    path = os.path.join(CSV_FOLDER, 'links.csv')
+# Unikalny klucz wierszy poza id: ocena jest jedna na parę (userId, movieId), tagi go nie mają
+UNIQUE_COLUMNS = {'ratings': ('userId', 'movieId'), 'tags': None}
+
+
+def read_line_chunks(path, lines_per_chunk):
+    """Generator: zwraca (start, end, bajty) kolejnych fragmentów po `lines_per_chunk` linii danych."""
+    with open(path, 'rb') as f:
+        start = len(f.readline())  # nagłówek
+        while True:
+            data = b''.join(islice(f, lines_per_chunk))
+            if not data:
+                return
+            yield start, start + len(data), data
+            start += len(data)
+
+
+def expand_ranges(id_ranges):
+    return [first + i for first, count in id_ranges for i in range(count)]
+
+
+def compress_ids(ids):
+    """Zamienia listę id na listę przedziałów [pierwsze_id, liczba]."""
+    ranges = []
+    for id_ in ids:
+        if ranges and ranges[-1][0] + ranges[-1][1] == id_:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([id_, 1])
+    return ranges
+
+
+def write_positional_chunk(conn, table, rows, old_ids):
+    """Zastępuje wiersze fragmentu nowymi (z tymi samymi id, nadmiarowe dopisuje, zbędne usuwa).
+
+    Zwraca (nowe id, id wypartych wierszy). Stare wiersze fragmentu usuwamy przed wstawieniem,
+    więc zamiana par (userId, movieId) w obrębie fragmentu nie daje konfliktu. Wiersz spoza fragmentu
+    (inny fragment pliku albo zapis przez API) z tą samą parą jest zastępowany wierszem z CSV -
+    jego id zwracamy, żeby fragment, do którego należał, został zaimportowany ponownie.
+    """
+    columns = POSITIONAL_COLUMNS[table]
+    ids = old_ids[:len(rows)]
+    if len(rows) > len(ids):
+        # Przed usunięciem starych wierszy - inaczej nowe id mogłyby się pokryć z ponownie użytymi
+        next_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+        ids += range(next_id, next_id + len(rows) - len(ids))
+    conn.executemany(f'DELETE FROM {table} WHERE id = ?', [(id_,) for id_ in old_ids])
+
+    displaced = []
+    key = UNIQUE_COLUMNS[table]
+    if key:
+        positions = [columns.index(c) for c in key]
+        where = ' AND '.join(f'{c} = ?' for c in key)
+        for row in rows:
+            displaced += [id_ for (id_,) in conn.execute(
+                f'SELECT id FROM {table} WHERE {where}', [row[p] for p in positions]
+            )]
+    placeholders = ', '.join('?' for _ in range(len(columns) + 1))
+    conn.executemany(
+        f'INSERT{" OR REPLACE" if key else ""} INTO {table} (id, {", ".join(columns)}) VALUES ({placeholders})',
+        [(id_,) + row for id_, row in zip(ids, rows)]
+    )
+    return ids, displaced
+
+
+def invalidate_checkpoints(conn, filename, ids, known):
+    """Usuwa checkpointy fragmentów zawierających wiersze o podanych id - zostaną zaimportowane ponownie.
+
+    Fragmenty jeszcze nieprzetworzone w tym uruchomieniu (`known`) są oznaczane jako zmienione od razu.
+    """
+    checkpoints = conn.execute(
+        'SELECT chunk_no, id_ranges FROM import_checkpoints WHERE filename = ? AND id_ranges IS NOT NULL', (filename,)
+    ).fetchall()
+    for chunk_no, id_ranges in checkpoints:
+        ranges = json.loads(id_ranges)
+        if any(first <= id_ < first + count for first, count in ranges for id_ in ids):
+            conn.execute('DELETE FROM import_checkpoints WHERE filename = ? AND chunk_no = ?', (filename, chunk_no))
+            if chunk_no in known:
+                known[chunk_no] = (None, ranges)
+
+
+def movie_ids_in_ranges(conn, table, id_ranges):
+    """movieId wierszy o id z przedziałów [pierwsze_id, liczba] (stan sprzed nadpisania fragmentu)."""
+    movie_ids = set()
+    for first, count in id_ranges:
+        movie_ids.update(movie_id for (movie_id,) in conn.execute(
+            f'SELECT movieId FROM {table} WHERE id BETWEEN ? AND ?', (first, first + count - 1)
+        ))
+    return movie_ids
+
+
+def import_incremental(conn, table, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER, keep_user_ids=True, changed=None):
+    """Importuje tylko nowe i zmienione fragmenty pliku. Zwraca (przetworzone, pominięte) fragmenty.
+
+    Do zbioru `changed` (jeśli podany) trafiają movieId filmów, których wiersze zmieniły się
+    w zatwierdzonych fragmentach - tylko dla nich trzeba potem przeliczyć agregaty i indeksy.
+    """
+    changed = set() if changed is None else changed
+    filename, _, _, label = TABLES[table]
+    convert = row_converter(table, keep_user_ids)
+    path = os.path.join(csv_folder, filename)
     if not os.path.exists(path):
         print(f"Brak pliku: {path}")
-        return
+        return 0, 0
 
-    print("Importowanie linków...")
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        links_to_insert = []
-        for row in reader:
-            # movieId, imdbId, tmdbId
-            links_to_insert.append((
-                row['movieId'],
-                row['imdbId'],
-                row['tmdbId']
-            ))
-        
-        cursor.executemany(
-            'INSERT OR IGNORE INTO links (movieId, imdbId, tmdbId) VALUES (?, ?, ?)',
-            links_to_insert
+    print(f"Importowanie przyrostowe: {filename}...")
+    conn.execute(CHECKPOINTS_DDL)
+    known = {
+        chunk_no: (content_hash, json.loads(id_ranges) if id_ranges else [])
+        for chunk_no, content_hash, id_ranges in conn.execute(
+            'SELECT chunk_no, content_hash, id_ranges FROM import_checkpoints WHERE filename = ?', (filename,)
         )
-        print(f"Zaimportowano {len(links_to_insert)} linków.")
+    }
+    fields = read_header(path)
+    processed = unchanged = rows_written = 0
+    start_time = time.perf_counter()
 
-def import_tags(cursor):
-    path = os.path.join(CSV_FOLDER, 'tags.csv')
-    if not os.path.exists(path):
-        print(f"Brak pliku: {path}")
+    for chunk_no, (start, end, data) in enumerate(read_line_chunks(path, batch_size)):
+        content_hash = hashlib.sha256(data).hexdigest()
+        old_hash, old_ranges = known.pop(chunk_no, (None, []))
+        if old_hash == content_hash:
+            unchanged += 1
+            continue
+
+        rows = list(convert_rows(csv.reader(io.StringIO(data.decode('utf-8'), newline='')), fields, convert))
+        with conn:
+            if table in UPSERTS:
+                conn.executemany(UPSERTS[table], rows)
+                id_ranges = None
+                touched = {row[0] for row in rows}
+            else:
+                movie_column = POSITIONAL_COLUMNS[table].index('movieId')
+                touched = movie_ids_in_ranges(conn, table, old_ranges) | {row[movie_column] for row in rows}
+                ids, displaced = write_positional_chunk(conn, table, rows, expand_ranges(old_ranges))
+                if displaced:
+                    invalidate_checkpoints(conn, filename, displaced, known)
+                id_ranges = json.dumps(compress_ids(ids))
+            conn.execute(
+                'INSERT OR REPLACE INTO import_checkpoints '
+                '(filename, chunk_no, start_offset, end_offset, content_hash, row_count, id_ranges) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (filename, chunk_no, start, end, content_hash, len(rows), id_ranges)
+            )
+        changed |= touched
+        processed += 1
+        rows_written += len(rows)
+        elapsed = time.perf_counter() - start_time
+        print(f"  {label}: {rows_written:,} wierszy ({rows_written / elapsed:,.0f} w/s)", end='\r', flush=True)
+
+    # Fragmenty, których już nie ma w pliku (plik został skrócony)
+    for chunk_no, (_, old_ranges) in known.items():
+        with conn:
+            touched = set()
+            if table in POSITIONAL_COLUMNS:
+                touched = movie_ids_in_ranges(conn, table, old_ranges)
+                conn.executemany(f'DELETE FROM {table} WHERE id = ?', [(id_,) for id_ in expand_ranges(old_ranges)])
+            conn.execute('DELETE FROM import_checkpoints WHERE filename = ? AND chunk_no = ?', (filename, chunk_no))
+        changed |= touched
+
+    print(f"Zapisano {rows_written:,} {label} z {processed} zmienionych fragmentów "
+          f"({unchanged} bez zmian, {len(known)} usuniętych).")
+    return processed, unchanged
+
+
+# --- AGREGATY PO IMPORCIE ---
+# Pełny import przelicza tabele pochodne (statystyki ocen, indeks gatunków, indeks wyszukiwarki)
+# w całości. Import przyrostowy przelicza je tylko dla filmów ze zmienionych fragmentów: ich movieId
+# trafiają do tymczasowej tabeli changed_movies, a zapytania przeliczające - warunek movieId IN (...).
+
+CHANGED_MOVIES_DDL = 'CREATE TEMP TABLE IF NOT EXISTS changed_movies (movieId INTEGER PRIMARY KEY)'
+CHANGED_MOVIES = 'IN (SELECT movieId FROM temp.changed_movies)'
+
+REBUILD_RATING_STATS = (
+    'DELETE FROM movie_rating_stats WHERE 1 {scope}',
+    'INSERT INTO movie_rating_stats '
+    '(movieId, rating_count, rating_sum, rating_sum_sq, min_rating, max_rating) '
+    'SELECT movieId, COUNT(*), SUM(rating), SUM(rating * rating), MIN(rating), MAX(rating) '
+    'FROM ratings WHERE rating IS NOT NULL {scope} GROUP BY movieId',
+)
+
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def movie_scope(conn, movie_ids, *columns):
+    """Warunki SQL zawężające przeliczenie do `movie_ids` - po jednym dla każdej kolumny z `columns`.
+
+    movie_ids=None to przeliczenie wszystkich filmów (puste warunki).
+    """
+    if movie_ids is None:
+        return ('',) * len(columns)
+    conn.execute(CHANGED_MOVIES_DDL)
+    conn.execute('DELETE FROM temp.changed_movies')
+    conn.executemany('INSERT INTO temp.changed_movies (movieId) VALUES (?)', ((m,) for m in movie_ids))
+    return tuple(f'AND {column} {CHANGED_MOVIES}' for column in columns)
+
+
+def rebuild_rating_stats(conn, movie_ids=None):
+    """Przelicza statystyki ocen filmów jednym GROUP BY zamiast aktualizować je wiersz po wierszu."""
+    if not table_exists(conn, 'movie_rating_stats'):
+        print("Brak tabeli movie_rating_stats - uruchom serwer, aby ją utworzył.")
         return
+    with conn:
+        scope, = movie_scope(conn, movie_ids, 'movieId')
+        for sql in REBUILD_RATING_STATS:
+            conn.execute(sql.format(scope=scope))
+    print("Przeliczono statystyki ocen filmów" + (f" ({len(movie_ids):,} filmów)." if movie_ids is not None else "."))
 
-    print("Importowanie tagów...")
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        tags_to_insert = []
-        # Uwaga: Tagi w CSV zazwyczaj mają 'userId'. 
-        # Ponieważ nasza baza jest nowa, możemy nie mieć użytkowników o takich ID.
-        # Dla uproszczenia przypiszemy wszystkie tagi do admina (ID=1) lub zachowamy oryginalne ID,
-        # ale wtedy tabela users musi być pusta lub pozwalać na brak klucza obcego (SQLite domyślnie pozwala).
-        
-        for row in reader:
-            # userId, movieId, tag, timestamp
-            tags_to_insert.append((
-                # row['userId'], # Możemy użyć oryginalnego userId
-                1, # LUB przypisać wszystko do Admina (bezpieczniej, jeśli nie importujemy users)
-                row['movieId'],
-                row['tag'],
-                row['timestamp']
-            ))
-        
-        cursor.executemany(
-            'INSERT OR IGNORE INTO tags (userId, movieId, tag, timestamp) VALUES (?, ?, ?, ?)',
-            tags_to_insert
-        )
-        print(f"Zaimportowano {len(tags_to_insert)} tagów.")
 
-def import_ratings(cursor):
-    path = os.path.join(CSV_FOLDER, 'ratings.csv')
-    if not os.path.exists(path):
-        print(f"Brak pliku: {path}")
+def rebuild_movie_genres(conn, movie_ids=None):
+    """Odbudowuje indeks gatunków (movie_genres) na podstawie kolumny movies.genres."""
+    if not table_exists(conn, 'movie_genres'):
+        print("Brak tabeli movie_genres - uruchom serwer, aby ją utworzył.")
         return
 
-    print("Importowanie ocen (może to chwilę potrwać)...")
-    with open(path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        ratings_to_insert = []
-        
-        # Ogranicznik: jeśli plik ratings.csv jest gigantyczny (miliony rekordów),
-        # warto wczytać tylko np. pierwsze 10 000, żeby nie "zabić" bazy SQLite.
-        LIMIT = 50000 
-        count = 0
-        
-        for row in reader:
-            if count >= LIMIT:
-                break
-            ratings_to_insert.append((
-                # row['userId'], 
-                1, # Przypisujemy do Admina (ID=1) dla uproszczenia
-                row['movieId'],
-                row['rating'],
-                row['timestamp']
-            ))
-            count += 1
-        
-        cursor.executemany(
-            'INSERT OR IGNORE INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)',
-            ratings_to_insert
-        )
-        print(f"Zaimportowano {len(ratings_to_insert)} ocen.")
+    def genre_rows(scope):
+        for movie_id, genres in conn.execute(f'SELECT movieId, genres FROM movies WHERE 1 {scope}'):
+            if genres and genres != '(no genres listed)':
+                for genre in {g.strip() for g in genres.split('|') if g.strip()}:
+                    yield genre, movie_id
+
+    with conn:
+        scope, = movie_scope(conn, movie_ids, 'movieId')
+        conn.execute(f'DELETE FROM movie_genres WHERE 1 {scope}')
+        rows = list(genre_rows(scope))
+        conn.executemany('INSERT INTO movie_genres (genre, movieId) VALUES (?, ?)', rows)
+    print(f"Odbudowano indeks gatunków ({len(rows):,} wpisów).")
+
+
+REBUILD_SEARCH_INDEX = (
+    'DELETE FROM movies_fts WHERE 1 {rowid_scope}',
+    'INSERT INTO movies_fts (rowid, title, tags, year) '
+    'SELECT m.movieId, m.title, t.tags, '
+    "CASE WHEN rtrim(m.title) GLOB '*([0-9][0-9][0-9][0-9])' THEN CAST(substr(rtrim(m.title), -5, 4) AS INTEGER) END "
+    "FROM movies m LEFT JOIN (SELECT movieId, group_concat(tag, ' ') AS tags FROM tags WHERE 1 {tag_scope} GROUP BY movieId) t "
+    'ON t.movieId = m.movieId WHERE 1 {movie_scope}',
+)
+
+# Triggery utrzymujące movies_fts przy zapisach przez API (app/models.py). Przy pełnym imporcie
+# byłyby czystą stratą (każdy wiersz tags/movies aktualizowałby indeks, który i tak odbudowujemy
+# na końcu), więc na jego czas je usuwamy i odtwarzamy z zapisanej w sqlite_master treści.
+# Import przyrostowy ich nie wyłącza - działa na żywej bazie, równolegle z API.
+SEARCH_TRIGGERS = ('movies_fts_ai', 'movies_fts_au', 'movies_fts_ad', 'tags_fts_ai', 'tags_fts_au', 'tags_fts_ad')
+
+
+@contextmanager
+def search_triggers_suspended(conn):
+    placeholders = ', '.join('?' for _ in SEARCH_TRIGGERS)
+    saved = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})", SEARCH_TRIGGERS
+    ).fetchall()
+    with conn:
+        for name, _ in saved:
+            conn.execute(f'DROP TRIGGER "{name}"')
+    try:
+        yield
+    finally:
+        with conn:
+            for _, sql in saved:
+                conn.execute(sql)
+
+
+def rebuild_search_index(conn, movie_ids=None):
+    """Wypełnia indeks pełnotekstowy movies_fts hurtowo, jednym INSERT ... SELECT."""
+    if not table_exists(conn, 'movies_fts'):
+        print("Brak tabeli movies_fts - uruchom serwer, aby ją utworzył.")
+        return
+    with conn:
+        rowid_scope, tag_scope, scope = movie_scope(conn, movie_ids, 'rowid', 'movieId', 'm.movieId')
+        for sql in REBUILD_SEARCH_INDEX:
+            conn.execute(sql.format(rowid_scope=rowid_scope, tag_scope=tag_scope, movie_scope=scope))
+    print("Odbudowano indeks wyszukiwarki.")
+
+
+def refresh_changed_movies(conn, changed):
+    """Po imporcie przyrostowym przelicza tabele pochodne tylko dla filmów ze zmienionych fragmentów."""
+    if not (changed['movies'] or changed['tags'] or changed['ratings']):
+        print("Brak zmian w filmach, tagach i ocenach - bez przeliczania indeksów i statystyk.")
+        return
+    if changed['movies']:
+        rebuild_movie_genres(conn, changed['movies'])
+    if changed['movies'] or changed['tags']:
+        rebuild_search_index(conn, changed['movies'] | changed['tags'])
+    if changed['ratings']:
+        rebuild_rating_stats(conn, changed['ratings'])
+
+
+def import_all_incremental(conn, batch_size=BATCH_SIZE, csv_folder=CSV_FOLDER, keep_user_ids=True):
+    """Import przyrostowy wszystkich plików. Zwraca {tabela: movieId zmienionych filmów}."""
+    changed = {table: set() for table in TABLES}
+    try:
+        for stage in IMPORT_ORDER:
+            for table in stage:
+                import_incremental(conn, table, batch_size, csv_folder, keep_user_ids, changed[table])
+    finally:
+        # Także po błędzie: zatwierdzone fragmenty przy wznowieniu będą już "bez zmian"
+        refresh_changed_movies(conn, changed)
+    return changed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import danych MovieLens (CSV) do bazy SQLite.")
+    parser.add_argument('--db', default=DB_PATH, help="ścieżka do pliku bazy SQLite")
+    parser.add_argument('--csv-dir', default=CSV_FOLDER, help="folder z plikami CSV")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="liczba wierszy w jednej transakcji")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="liczba procesów parsujących (0 = import sekwencyjny w jednym procesie)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_BYTES,
+                        help="rozmiar fragmentu pliku (w bajtach) przekazywanego do procesu roboczego")
+    parser.add_argument('--incremental', action='store_true',
+                        help="importuj tylko nowe/zmienione fragmenty plików (checkpointy w bazie, wznawianie po awarii)")
+    parser.add_argument('--keep-user-ids', action='store_true', default=True,
+                        help="zachowaj userId z CSV dla ocen i tagów (domyślne, flaga zostaje dla zgodności)")
+    parser.add_argument('--single-user', dest='keep_user_ids', action='store_false',
+                        help="przypisz wszystkie oceny i tagi użytkownikowi 1 (zostaje jedna ocena na film)")
+    args = parser.parse_args(argv)
+    if args.incremental and args.workers:
+        parser.error("--incremental nie działa razem z --workers")
+    return args
+
 
-def main():
-    if not os.path.exists(DB_PATH):
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.db):
         print("Błąd: Nie znaleziono bazy danych. Uruchom najpierw serwer uvicorn, aby utworzył pustą bazę.")
         return
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = sqlite3.connect(args.db)
+    for pragma in IMPORT_PRAGMAS:
+        conn.execute(pragma)
 
     try:
-        import_movies(cursor)
-        import_links(cursor)
-        import_tags(cursor)
-        import_ratings(cursor)
-        conn.commit()
+        if args.incremental:
+            # Import przyrostowy idzie na żywej bazie - triggery wyszukiwarki zostają włączone,
+            # żeby zapisy przez API w trakcie importu też trafiały do movies_fts
+            import_all_incremental(conn, args.batch_size, args.csv_dir, args.keep_user_ids)
+        else:
+            with search_triggers_suspended(conn):
+                if args.workers > 0:
+                    import_parallel(conn, args.workers, args.chunk_size, args.csv_dir, keep_user_ids=args.keep_user_ids)
+                else:
+                    import_movies(conn, args.batch_size, args.csv_dir)
+                    import_links(conn, args.batch_size, args.csv_dir)
+                    import_tags(conn, args.batch_size, args.csv_dir, args.keep_user_ids)
+                    import_ratings(conn, args.batch_size, args.csv_dir, args.keep_user_ids)
+                rebuild_movie_genres(conn)
+                rebuild_search_index(conn)
+                rebuild_rating_stats(conn)
         print("\nSUKCES! Dane zostały zaimportowane.")
     except Exception as e:
+        # Zatwierdzone paczki zostają w bazie, wycofywana jest tylko bieżąca
         print(f"\nWystąpił błąd: {e}")
-        conn.rollback()
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,21 +1,130 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Path
-from sqlalchemy.orm import Session
-from app.db import get_db, engine
+import asyncio
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status, Path
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from app.db import (
+    get_db, engine, SessionLocal, USE_ASYNC_DB, async_engine, DB_PATH,
+    run_sqlite_maintenance, SQLITE_MAINTENANCE_INTERVAL
+)
 from app.auth_router import router as auth_router
-from app.models import Movie, Link, Rating, Tag, Base
+from app.diagnostics_router import router as diagnostics_router
+from app.batch_router import router as batch_router
+from app.export_router import router as export_router
+from app.users_router import router as users_router
+from app.metrics_router import router as metrics_router
+from app.models import Movie, Link, Rating, Tag, Base, MovieRatingStats
 from app.schemas import (
     MovieOut, MovieCreate, MovieUpdate,
     LinkOut, LinkCreate, LinkUpdate,
-    RatingOut, RatingCreate, RatingUpdate,
-    TagOut, TagCreate, TagUpdate
+    RatingOut, RatingCreate, RatingUpdate, RatingUpsert,
+    TagOut, TagCreate, TagUpdate,
+    MovieStatsOut, TopMovieOut, GenreCountOut, MovieSearchOut, SimilarMovieOut, MovieFullOut
 )
-from app.security import get_current_user
+from app.security import get_current_user, password_pool
+from app.pagination import keyset_page, PAGE_LIMIT_MAX
+from app.filters import RangeFilters, rating_filters, tag_filters, filtered_page
+from app import aggregates, genres, migrations, movie_details, search, write_queue
+from app.ranking import top_movies
+from app.response_cache import cached_json, table_versions
+from app.catalog import catalog
+from app.similarity import similar_movies, SIMILARITY_K, SIMILARITY_REBUILD_INTERVAL, SIMILARITY_ON_STARTUP
+from app.recommendations import recommender, RECOMMENDER_CHECK_INTERVAL
+from app.metrics import MetricsMiddleware, instrument_engine, METRICS_ENABLED
 
 # Tworzenie tabel
 Base.metadata.create_all(bind=engine)
+# Statystyki ocen dla baz utworzonych przed dodaniem tabeli movie_rating_stats
+with SessionLocal() as _db:
+    # Unikalne (userId, movieId) i złożone indeksy ocen i tagów dla baz sprzed tej zmiany
+    migrations.migrate_rating_keys(_db)
+    migrations.migrate_tag_indexes(_db)
+    migrations.migrate_search_triggers(_db)
+    aggregates.backfill_rating_stats(_db)
+    genres.backfill_movie_genres(_db)
+    search.backfill_search_index(_db)
+    # Snapshot katalogu (CATALOG_SNAPSHOT=1) - movies i links w pamięci
+    if catalog.enabled:
+        catalog.reload(_db)
+
+logger = logging.getLogger(__name__)
+
+async def sqlite_maintenance_loop():
+    # Okresowo: PRAGMA optimize + checkpoint WAL (w wątku, żeby nie blokować pętli zdarzeń)
+    while True:
+        await asyncio.sleep(SQLITE_MAINTENANCE_INTERVAL)
+        try:
+            await asyncio.to_thread(run_sqlite_maintenance)
+        except Exception:
+            logger.exception("Konserwacja SQLite nie powiodła się")
+
+def build_similarity_index():
+    with SessionLocal() as db:
+        report = similar_movies.build(db)
+    logger.info("Indeks podobnych filmów: %s", report)
+
+async def similarity_loop():
+    # Indeks "podobnych filmów": zapisany na dysku (memory-map); budowany w tle przy starcie
+    # tylko z SIMILARITY_ON_STARTUP=1 - inaczej dopiero przy pierwszym zapytaniu o podobne filmy
+    if not similar_movies.load() and SIMILARITY_ON_STARTUP:
+        similar_movies.build_in_background(SessionLocal)
+    while SIMILARITY_REBUILD_INTERVAL > 0:
+        await asyncio.sleep(SIMILARITY_REBUILD_INTERVAL)
+        try:
+            await asyncio.to_thread(build_similarity_index)
+        except Exception:
+            logger.exception("Przeliczenie indeksu podobnych filmów nie powiodło się")
 
-app = FastAPI()
+def check_recommender():
+    with SessionLocal() as db:
+        if recommender.needs_training(db):
+            recommender.train_in_background(str(DB_PATH))
+
+async def recommender_loop():
+    # Trening ALS w osobnym procesie przy starcie, potem douczanie, gdy przybyło ocen
+    while True:
+        try:
+            await asyncio.to_thread(check_recommender)
+        except Exception:
+            logger.exception("Sprawdzenie modelu rekomendacji nie powiodło się")
+        await asyncio.sleep(RECOMMENDER_CHECK_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    maintenance = asyncio.create_task(sqlite_maintenance_loop()) if SQLITE_MAINTENANCE_INTERVAL > 0 else None
+    similarity = asyncio.create_task(similarity_loop())
+    recommendations = asyncio.create_task(recommender_loop()) if RECOMMENDER_CHECK_INTERVAL > 0 else None
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+    if similarity is not None:
+        similarity.cancel()
+    if recommendations is not None:
+        recommendations.cancel()
+    recommender.shutdown()
+    password_pool.shutdown()
+    if write_queue.write_behind is not None:
+        write_queue.write_behind.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+if METRICS_ENABLED:
+    # Czas, rozmiar i liczba zapytań SQL dla każdej trasy - GET /metrics
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.include_router(metrics_router)
 app.include_router(auth_router, prefix='/auth')
+app.include_router(diagnostics_router, prefix='/diagnostics')
+app.include_router(export_router, prefix='/export')
+app.include_router(users_router, prefix='/users')
+# Trasy wsadowe (/ratings/batch itd.) muszą być zarejestrowane przed /ratings/{rating_id}
+app.include_router(batch_router)
 
 @app.get("/")
 def root():
@@ -23,22 +132,130 @@ def root():
 
 # MOVIES CRUD
 
+# Odczyty GET idą przez cached_json: odpowiedź (JSON + ETag) jest zapamiętywana do następnego
+# zapisu w podanych tabelach - endpointy zapisujące wołają table_versions.bump() po commit.
+
 @app.get("/movies", response_model=list[MovieOut])
-def get_movies(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return db.query(Movie).offset(skip).limit(limit).all()
+def get_movies(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+               genre: Optional[list[str]] = Query(None), genre_mode: str = Query("and", pattern="^(and|or)$"),
+               db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # ?genre=Comedy&genre=Drama - filtr po indeksie movie_genres (genre_mode=and: wszystkie, or: dowolny)
+    if catalog.enabled and not genre:
+        return cached_json(request, ("movies",), list[MovieOut],
+                           lambda response: catalog.page(catalog.movies, response, cursor, skip, limit))
+    query = genres.filter_by_genres(db.query(Movie), genre or [], genre_mode)
+    return cached_json(request, ("movies",), list[MovieOut],
+                       lambda response: keyset_page(query, Movie.movieId, response, cursor, skip, limit))
+
+@app.get("/movies/facets", response_model=list[GenreCountOut])
+def get_movie_facets(request: Request, genre: Optional[list[str]] = Query(None), genre_mode: str = Query("and", pattern="^(and|or)$"),
+                     db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Podsumowanie: ile filmów (spełniających ten sam filtr co /movies) jest w każdym gatunku
+    return cached_json(request, ("movies",), list[GenreCountOut],
+                       lambda response: genres.genre_facets(db, genre, genre_mode))
+
+# Musi być zdefiniowane przed /movies/{movie_id}, inaczej "top" zostałoby potraktowane jak ID
+@app.get("/movies/top", response_model=list[TopMovieOut])
+def get_top_movies(limit: int = Query(10, ge=1, le=100), genre: Optional[str] = None, min_votes: int = Query(0, ge=0),
+                   db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    return [movie._asdict() for movie in top_movies.top(db, limit, genre, min_votes)]
+
+@app.get("/movies/search", response_model=list[MovieSearchOut])
+def search_movies(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), year: Optional[int] = None,
+                  db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Wyszukiwanie pełnotekstowe (FTS5) po tytule i tagach, ranking BM25, ostatnie słowo jako prefiks
+    return search.search_movies(db, q, limit, year)
+
+# Tabele, z których składane są szczegóły filmu - zmiana którejkolwiek unieważnia wpis w cache
+MOVIE_DETAILS_TABLES = ("movies", "links", "ratings", "tags")
+
+@app.get("/movies/full", response_model=list[MovieFullOut])
+def get_movies_full(request: Request, ids: str = Query(..., description="id filmów oddzielone przecinkami, np. 1,2,3"),
+                    recent_limit: int = Query(10, ge=0, le=100), tags_limit: int = Query(10, ge=0, le=100),
+                    db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Wiele filmów naraz (np. do widoku listy) tą samą stałą liczbą zapytań; brakujące id są pomijane
+    movie_ids = movie_details.parse_ids(ids)
+    return cached_json(request, MOVIE_DETAILS_TABLES, list[MovieFullOut],
+                       lambda response: movie_details.load_details(db, movie_ids, recent_limit, tags_limit))
 
 @app.get("/movies/{movie_id}", response_model=MovieOut)
-def get_movie(movie_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    movie = db.query(Movie).filter(Movie.movieId == movie_id).first()
-    if not movie:
+def get_movie(movie_id: int, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def load(response):
+        if catalog.enabled:
+            movie = catalog.movies.get(movie_id)
+        else:
+            movie = db.query(Movie).filter(Movie.movieId == movie_id).first()
+        if not movie:
+            raise HTTPException(status_code=404, detail="Film nie znaleziony")
+        return movie
+    return cached_json(request, ("movies",), MovieOut, load)
+
+@app.get("/movies/{movie_id}/stats", response_model=MovieStatsOut)
+def get_movie_stats(movie_id: int, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Odczyt jednego wiersza po kluczu głównym zamiast liczenia AVG/COUNT po tabeli ratings
+    def load(response):
+        stats = db.get(MovieRatingStats, movie_id)
+        if stats is None and db.get(Movie, movie_id) is None:
+            raise HTTPException(status_code=404, detail="Film nie znaleziony")
+        return aggregates.stats_to_dict(movie_id, stats)
+    return cached_json(request, ("movies", "ratings"), MovieStatsOut, load)
+
+@app.get("/movies/{movie_id}/full", response_model=MovieFullOut)
+def get_movie_full(movie_id: int, request: Request, recent_limit: int = Query(10, ge=0, le=100),
+                   tags_limit: int = Query(10, ge=0, le=100),
+                   db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Film, link, statystyki, ostatnie oceny i najczęstsze tagi w jednym żądaniu (app/movie_details.py)
+    def load(response):
+        details = movie_details.load_details(db, [movie_id], recent_limit, tags_limit)
+        if not details:
+            raise HTTPException(status_code=404, detail="Film nie znaleziony")
+        return details[0]
+    return cached_json(request, MOVIE_DETAILS_TABLES, MovieFullOut, load)
+
+@app.get("/movies/{movie_id}/similar", response_model=list[SimilarMovieOut])
+def get_similar_movies(movie_id: int, k: int = Query(20, ge=1, le=SIMILARITY_K),
+                       db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Odczyt gotowych sąsiadów z indeksu liczonego w tle (app/similarity.py)
+    if not similar_movies.ready:
+        # Bez zapisanego indeksu budujemy go raz, w tle - na tym samym silniku co sesja żądania
+        similar_movies.build_in_background(sessionmaker(bind=db.get_bind()))
+        raise HTTPException(status_code=503, detail="Indeks podobnych filmów jest w trakcie budowy",
+                            headers={"Retry-After": "30"})
+    neighbors = similar_movies.similar(movie_id, k)
+    if neighbors is None:
+        if db.get(Movie, movie_id) is None:
+            raise HTTPException(status_code=404, detail="Film nie znaleziony")
+        return []
+    ids = [neighbor_id for neighbor_id, _ in neighbors]
+    movies = {m.movieId: m for m in db.query(Movie).filter(Movie.movieId.in_(ids))}
+    return [
+        {"movieId": neighbor_id, "title": movies[neighbor_id].title, "genres": movies[neighbor_id].genres, "score": score}
+        for neighbor_id, score in neighbors if neighbor_id in movies
+    ]
+
+@app.put("/movies/{movie_id}/my-rating", response_model=RatingOut)
+def upsert_my_rating(movie_id: int, rating_data: RatingUpsert, response: Response,
+                     db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Ocena zalogowanego użytkownika: tworzy (201) albo nadpisuje (200) jedyną ocenę tego filmu
+    exists = catalog.movies.get(movie_id) if catalog.enabled else db.get(Movie, movie_id)
+    if exists is None:
         raise HTTPException(status_code=404, detail="Film nie znaleziony")
-    return movie
+    row, created = aggregates.upsert_rating(db, current_user.id, movie_id, rating_data.rating, rating_data.timestamp)
+    db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
+    response.status_code = 201 if created else 200
+    return row
 
 @app.post("/movies", response_model=MovieOut, status_code=201)
 def create_movie(movie_data: MovieCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     new_movie = Movie(title=movie_data.title, genres=movie_data.genres)
     db.add(new_movie)
+    db.flush()
+    genres.set_movie_genres(db, new_movie.movieId, new_movie.genres)
     db.commit()
+    catalog.refresh(db, movies=[new_movie.movieId])
+    table_versions.bump("movies")
     db.refresh(new_movie)
     return new_movie
 
@@ -48,8 +265,13 @@ def update_movie(movie_update: MovieUpdate, movie_id: int, db: Session = Depends
     if not movie:
         raise HTTPException(status_code=404, detail="Film nie znaleziony")
     if movie_update.title: movie.title = movie_update.title
-    if movie_update.genres: movie.genres = movie_update.genres
+    if movie_update.genres:
+        movie.genres = movie_update.genres
+        genres.set_movie_genres(db, movie_id, movie.genres)
     db.commit()
+    catalog.refresh(db, movies=[movie_id])
+    table_versions.bump("movies")
+    top_movies.mark_dirty()
     db.refresh(movie)
     return movie
 
@@ -59,22 +281,35 @@ def delete_movie(movie_id: int, db: Session = Depends(get_db), current_user = De
     if not movie:
         raise HTTPException(status_code=404, detail="Film nie znaleziony")
     db.delete(movie)
+    genres.set_movie_genres(db, movie_id, None)
     db.commit()
+    catalog.refresh(db, movies=[movie_id])
+    table_versions.bump("movies")
+    top_movies.mark_dirty()
     return None
 
 # LINKS CRUD
 
 @app.get("/links", response_model=list[LinkOut])
-def get_links(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return db.query(Link).offset(skip).limit(limit).all()
+def get_links(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    if catalog.enabled:
+        return cached_json(request, ("links",), list[LinkOut],
+                           lambda response: catalog.page(catalog.links, response, cursor, skip, limit))
+    return cached_json(request, ("links",), list[LinkOut],
+                       lambda response: keyset_page(db.query(Link), Link.movieId, response, cursor, skip, limit))
 
 @app.get("/links/{movie_id}", response_model=LinkOut)
-def get_link(movie_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    # W tabeli links movieId jest Primary Key
-    link = db.query(Link).filter(Link.movieId == movie_id).first()
-    if not link:
-        raise HTTPException(status_code=404, detail="Link nie znaleziony")
-    return link
+def get_link(movie_id: int, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def load(response):
+        # W tabeli links movieId jest Primary Key
+        if catalog.enabled:
+            link = catalog.links.get(movie_id)
+        else:
+            link = db.query(Link).filter(Link.movieId == movie_id).first()
+        if not link:
+            raise HTTPException(status_code=404, detail="Link nie znaleziony")
+        return link
+    return cached_json(request, ("links",), LinkOut, load)
 
 @app.post("/links", response_model=LinkOut, status_code=201)
 def create_link(link_data: LinkCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -91,6 +326,8 @@ def create_link(link_data: LinkCreate, db: Session = Depends(get_db), current_us
     new_link = Link(**link_data.dict())
     db.add(new_link)
     db.commit()
+    catalog.refresh(db, links=[new_link.movieId])
+    table_versions.bump("links")
     db.refresh(new_link)
     return new_link
 
@@ -103,6 +340,8 @@ def update_link(link_update: LinkUpdate, movie_id: int, db: Session = Depends(ge
     if link_update.imdbId: link.imdbId = link_update.imdbId
     if link_update.tmdbId: link.tmdbId = link_update.tmdbId
     db.commit()
+    catalog.refresh(db, links=[movie_id])
+    table_versions.bump("links")
     db.refresh(link)
     return link
 
@@ -113,23 +352,52 @@ def delete_link(movie_id: int, db: Session = Depends(get_db), current_user = Dep
         raise HTTPException(status_code=404, detail="Link nie znaleziony")
     db.delete(link)
     db.commit()
+    catalog.refresh(db, links=[movie_id])
+    table_versions.bump("links")
     return None
 
+# WRITE-BEHIND (WRITE_BEHIND=1): wstawienia ocen i tagów zapisywane paczkami przez jeden wątek
+
+def submit_write_behind(kind: str, values: dict) -> dict:
+    future = write_queue.write_behind.submit(kind, values)
+    try:
+        try:
+            return future.result(timeout=write_queue.WRITE_BEHIND_TIMEOUT)
+        except FutureTimeoutError:
+            # Anulowany wpis nie zostanie zapisany - ponowienie przez klienta jest bezpieczne
+            if future.cancel():
+                raise HTTPException(status_code=503, detail=write_queue.TIMEOUT_DETAIL, headers={"Retry-After": "1"})
+            # Writer już zapisuje paczkę z tym wpisem - wynik przyjdzie za chwilę
+            return future.result()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=aggregates.DUPLICATE_RATING)
+
 # RATINGS CRUD
 
 @app.get("/ratings", response_model=list[RatingOut])
-def get_ratings(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return db.query(Rating).offset(skip).limit(limit).all()
+def get_ratings(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+                filters: RangeFilters = Depends(rating_filters), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # Filtry movieId/userId/since/until/min_rating/max_rating i sort - dobór indeksu opisany w app/filters.py
+    return cached_json(request, ("ratings",), list[RatingOut],
+                       lambda response: filtered_page(db.query(Rating), Rating, filters, response, cursor, skip, limit))
 
 @app.get("/ratings/{rating_id}", response_model=RatingOut)
-def get_rating(rating_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    rating = db.query(Rating).filter(Rating.id == rating_id).first()
-    if not rating:
-        raise HTTPException(status_code=404, detail="Ocena nie znaleziona")
-    return rating
+def get_rating(rating_id: int, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def load(response):
+        rating = db.query(Rating).filter(Rating.id == rating_id).first()
+        if not rating:
+            raise HTTPException(status_code=404, detail="Ocena nie znaleziona")
+        return rating
+    return cached_json(request, ("ratings",), RatingOut, load)
 
 @app.post("/ratings", response_model=RatingOut, status_code=201)
 def create_rating(rating_data: RatingCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    if write_queue.write_behind is not None:
+        result = submit_write_behind("rating", {"userId": current_user.id, **rating_data.model_dump()})
+        table_versions.bump("ratings")
+        top_movies.mark_dirty()
+        return result
+
     # Przypisujemy ocenę do aktualnie zalogowanego użytkownika
     new_rating = Rating(
         userId=current_user.id,
@@ -138,7 +406,15 @@ def create_rating(rating_data: RatingCreate, db: Session = Depends(get_db), curr
         timestamp=rating_data.timestamp
     )
     db.add(new_rating)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=aggregates.DUPLICATE_RATING)
+    aggregates.add_rating(db, new_rating.movieId, new_rating.rating)
     db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
     db.refresh(new_rating)
     return new_rating
 
@@ -152,9 +428,14 @@ def update_rating(rating_update: RatingUpdate, rating_id: int, db: Session = Dep
     if rating.userId != current_user.id and current_user.role != "ROLE_ADMIN":
          raise HTTPException(status_code=403, detail="Nie możesz edytować cudzej oceny")
 
+    old_value = rating.rating
     if rating_update.rating is not None: rating.rating = rating_update.rating
     if rating_update.timestamp is not None: rating.timestamp = rating_update.timestamp
+    db.flush()
+    aggregates.change_rating(db, rating.movieId, old_value, rating.rating)
     db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
     db.refresh(rating)
     return rating
 
@@ -164,23 +445,36 @@ def delete_rating(rating_id: int, db: Session = Depends(get_db), current_user =
     if not rating:
         raise HTTPException(status_code=404, detail="Ocena nie znaleziona")
     db.delete(rating)
+    db.flush()
+    aggregates.remove_rating(db, rating.movieId, rating.rating)
     db.commit()
+    table_versions.bump("ratings")
+    top_movies.mark_dirty()
     return None
 
 # TAGS CRUD
 @app.get("/tags", response_model=list[TagOut])
-def get_tags(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return db.query(Tag).offset(skip).limit(limit).all()
+def get_tags(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=PAGE_LIMIT_MAX), cursor: Optional[str] = None,
+             filters: RangeFilters = Depends(tag_filters), db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    return cached_json(request, ("tags",), list[TagOut],
+                       lambda response: filtered_page(db.query(Tag), Tag, filters, response, cursor, skip, limit))
 
 @app.get("/tags/{tag_id}", response_model=TagOut)
-def get_tag(tag_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if not tag:
-        raise HTTPException(status_code=404, detail="Tag nie znaleziony")
-    return tag
+def get_tag(tag_id: int, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    def load(response):
+        tag = db.query(Tag).filter(Tag.id == tag_id).first()
+        if not tag:
+            raise HTTPException(status_code=404, detail="Tag nie znaleziony")
+        return tag
+    return cached_json(request, ("tags",), TagOut, load)
 
 @app.post("/tags", response_model=TagOut, status_code=201)
 def create_tag(tag_data: TagCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    if write_queue.write_behind is not None:
+        result = submit_write_behind("tag", {"userId": current_user.id, **tag_data.model_dump()})
+        table_versions.bump("tags")
+        return result
+
     new_tag = Tag(
         userId=current_user.id,
         movieId=tag_data.movieId,
@@ -189,6 +483,7 @@ def create_tag(tag_data: TagCreate, db: Session = Depends(get_db), current_user
     )
     db.add(new_tag)
     db.commit()
+    table_versions.bump("tags")
     db.refresh(new_tag)
     return new_tag
 
@@ -200,6 +495,7 @@ def update_tag(tag_update: TagUpdate, tag_id: int, db: Session = Depends(get_db)
     
     if tag_update.tag is not None: tag.tag = tag_update.tag
     db.commit()
+    table_versions.bump("tags")
     db.refresh(tag)
     return tag
 
@@ -210,4 +506,10 @@ def delete_tag(tag_id: int, db: Session = Depends(get_db), current_user = Depend
         raise HTTPException(status_code=404, detail="Tag nie znaleziony")
     db.delete(tag)
     db.commit()
-    return None
\ No newline at end of file
+    table_versions.bump("tags")
+    return None
+
+# Tryb asynchroniczny (DB_ASYNC=1): trasy CRUD podmieniamy na wersje `async def` z app/crud_async.py
+if USE_ASYNC_DB:
+    from app.crud_async import router as async_crud_router, replace_routes
+    replace_routes(app, async_crud_router)
@@ -5,6 +5,8 @@ conn = sqlite3.connect('app/database.db')
 cursor = conn.cursor()
 
 # Ustawiamy rolę ROLE_ADMIN dla użytkownika o nazwie 'admin'
+# Uwaga: działający serwer może pamiętać starą rolę w cache tokenów przez AUTH_CACHE_TTL sekund
+# (zmiana przez PUT /auth/users/{id} unieważnia cache od razu).
 username_to_promote = "admin"
 
 cursor.execute("UPDATE users SET role = 'ROLE_ADMIN' WHERE username = ?", (username_to_promote,))
@@ -0,0 +1,311 @@
+# app/metrics.py
+# Metryki w formacie tekstowym Prometheusa (GET /metrics) - bez zależności od prometheus_client.
+#
+# MetricsMiddleware (czysty middleware ASGI, nie buforuje odpowiedzi - działa też ze streamingiem
+# eksportu) mierzy dla każdej trasy: czas odpowiedzi, rozmiar ciała, liczbę żądań w toku,
+# a przez zdarzenia silnika SQLAlchemy (before/after_cursor_execute) także liczbę zapytań SQL
+# i czas spędzony w bazie na jedno żądanie. Etykietą jest szablon trasy ("/movies/{movie_id}"),
+# a nie surowa ścieżka, więc liczba serii nie rośnie z liczbą filmów.
+#
+# Zapytania wolniejsze niż SLOW_QUERY_MS trafiają do logu razem z EXPLAIN QUERY PLAN.
+#
+# Liczniki są w pamięci procesu - przy kilku workerach uvicorna każdy ma własne (Prometheus
+# sumuje je po stronie serwera, jeśli worker jest osobnym celem scrapowania).
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Domyślnie wyłączone (METRICS_ENABLED=1 włącza middleware, instrumentację silnika i GET /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+# GET /metrics wymaga tokena administratora albo - dla scrapera Prometheusa, który nie loguje się
+# jak użytkownik API - nagłówka "Authorization: Bearer <METRICS_TOKEN>", jeśli jest ustawiony
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Próg wolnego zapytania w ms (0 = bez logowania wolnych zapytań)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels) -> None:
+        # Licznik tylko w pierwszym pasującym kubełku; skumulowane sumy liczymy przy renderowaniu
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def total(self, *labels) -> float:
+        entry = self._values.get(labels)
+        return entry[1] if entry else 0.0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        # Funkcje wołane przy scrapowaniu - zwracają gotowe linie (np. stan puli połączeń)
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self.metrics:
+            metric.reset()
+
+
+registry = Registry()
+
+ROUTE_LABELS = ("method", "route")
+http_requests = registry.register(Counter(
+    "http_requests_total", "Liczba obsłużonych żądań HTTP", ("method", "route", "status")))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Czas obsługi żądania HTTP", ROUTE_LABELS, LATENCY_BUCKETS))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Rozmiar ciała odpowiedzi HTTP", ROUTE_LABELS, SIZE_BUCKETS))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Żądania HTTP w trakcie obsługi"))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Liczba zapytań SQL wykonanych w jednym żądaniu", ROUTE_LABELS, QUERY_COUNT_BUCKETS))
+db_time_per_request = registry.register(Histogram(
+    "db_query_time_per_request_seconds", "Łączny czas zapytań SQL w jednym żądaniu", ROUTE_LABELS, LATENCY_BUCKETS))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Czas pojedynczego zapytania SQL (także poza żądaniami)", (), LATENCY_BUCKETS))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "Zapytania SQL wolniejsze niż SLOW_QUERY_MS"))
+
+
+# ---------------------------------------------------------------------------------------------
+# SQL: liczenie zapytań przez zdarzenia silnika
+# ---------------------------------------------------------------------------------------------
+
+class QueryStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Statystyki bieżącego żądania. Endpointy synchroniczne działają w wątkach puli anyio, które
+# dostają kopię kontekstu - wspólny jest obiekt QueryStats, więc zliczenia wracają do middleware.
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+
+def query_plan(connection, statement: str, parameters) -> str:
+    """EXPLAIN QUERY PLAN jako wcięte drzewo. Idzie surowym kursorem DBAPI, bez zdarzeń SQLAlchemy."""
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        rows = cursor.fetchall()
+    except Exception as exc:
+        return f"(brak planu: {exc})"
+    finally:
+        cursor.close()
+    depth, lines = {0: -1}, []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_query_duration.observe(elapsed)
+    stats = current_queries.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        # executemany: parametry to lista wierszy - plan i tak jest ten sam co dla jednego
+        plan = query_plan(conn, statement, parameters[0] if executemany and parameters else parameters)
+        logger.warning("Wolne zapytanie SQL (%.1f ms): %s\nPlan:\n%s", elapsed * 1000, statement, plan)
+
+
+def _handle_error(context):
+    # Zapytanie zakończone wyjątkiem nie wywołuje after_cursor_execute - zdejmujemy jego start
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+LISTENERS = (
+    ("before_cursor_execute", _before_cursor_execute),
+    ("after_cursor_execute", _after_cursor_execute),
+    ("handle_error", _handle_error),
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    for name, listener in LISTENERS:
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+
+
+def uninstrument_engine(engine: Engine) -> None:
+    for name, listener in LISTENERS:
+        if event.contains(engine, name, listener):
+            event.remove(engine, name, listener)
+
+
+# ---------------------------------------------------------------------------------------------
+# HTTP: middleware
+# ---------------------------------------------------------------------------------------------
+
+def route_label(scope) -> str:
+    # scope["route"] ustawia router po dopasowaniu; bez dopasowania (404) wspólna etykieta
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = QueryStats()
+        token = current_queries.set(stats)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            current_queries.reset(token)
+            labels = (scope["method"], route_label(scope))
+            http_requests.inc(*labels, status_code)
+            http_duration.observe(elapsed, *labels)
+            http_response_size.observe(size, *labels)
+            db_queries_per_request.observe(stats.queries, *labels)
+            db_time_per_request.observe(stats.seconds, *labels)
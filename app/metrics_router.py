@@ -0,0 +1,51 @@
+# app/metrics_router.py
+# GET /metrics - metryki w formacie tekstowym Prometheusa (zob. app/metrics.py).
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from app.db import engine, get_db
+from app import metrics
+from app.metrics import registry, CONTENT_TYPE
+from app.response_cache import response_cache
+from app.security import get_current_user, get_current_admin_user
+
+router = APIRouter()
+
+# Bez auto_error: brak nagłówka obsługujemy sami (401), a token może być też METRICS_TOKEN
+optional_bearer = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+def _sample(kind: str, name: str, help: str, value) -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def collect_state() -> list[str]:
+    # Stan odczytywany przy scrapowaniu: pula połączeń i cache odpowiedzi
+    cache = response_cache.stats()
+    return [
+        *_sample("gauge", "db_pool_checked_out", "Połączenia z puli wypożyczone przez sesje", engine.pool.checkedout()),
+        *_sample("gauge", "response_cache_entries", "Wpisy w cache odpowiedzi GET", cache["entries"]),
+        *_sample("gauge", "response_cache_bytes", "Rozmiar ciał odpowiedzi w cache", cache["bytes"]),
+        *_sample("counter", "response_cache_hits_total", "Trafienia cache odpowiedzi od startu", cache["hits"]),
+        *_sample("counter", "response_cache_misses_total", "Chybienia cache odpowiedzi od startu", cache["misses"]),
+    ]
+
+
+registry.collectors.append(collect_state)
+
+
+def require_metrics_access(token: Optional[str] = Depends(optional_bearer), db: Session = Depends(get_db)) -> None:
+    """Dostęp do metryk: wspólny METRICS_TOKEN (scraper) albo token JWT administratora."""
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Brak autoryzacji",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if metrics.METRICS_TOKEN and hmac.compare_digest(token, metrics.METRICS_TOKEN):
+        return
+    get_current_admin_user(get_current_user(token, db))
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(_: None = Depends(require_metrics_access)):
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
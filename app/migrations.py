@@ -0,0 +1,108 @@
+# app/migrations.py
+# Zmiany schematu dla istniejących baz. create_all tworzy tylko brakujące tabele - nowe indeksy
+# na istniejących tabelach dodajemy tutaj (przy starcie aplikacji, idempotentnie).
+import logging
+from sqlalchemy.orm import Session
+from app import aggregates
+from app.models import Rating, Tag, SEARCH_TRIGGERS
+
+logger = logging.getLogger(__name__)
+
+# Jednokolumnowe indeksy sprzed indeksów złożonych - ich rolę przejmują prefiksy nowych
+LEGACY_RATING_INDEXES = ("ix_ratings_userId", "ix_ratings_movieId")
+LEGACY_TAG_INDEXES = ("ix_tags_userId", "ix_tags_movieId")
+
+# Z powtórzonych ocen (userId, movieId) zostaje najnowsza: największy timestamp, potem największe id
+DEDUPE_RATINGS_SQL = (
+    "DELETE FROM ratings WHERE id IN ("
+    " SELECT id FROM ("
+    "  SELECT id, ROW_NUMBER() OVER ("
+    "   PARTITION BY userId, movieId ORDER BY timestamp DESC, id DESC) AS position"
+    "  FROM ratings)"
+    " WHERE position > 1)"
+)
+
+
+def _index_names(db: Session, table: str) -> set[str]:
+    return set(db.connection().exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,)
+    ).scalars())
+
+
+def _index_columns(db: Session, name: str) -> list[str]:
+    return [row[2] for row in db.connection().exec_driver_sql(f'PRAGMA index_info("{name}")')]
+
+
+def stale_indexes(db: Session, model, legacy=()) -> tuple[list[str], list]:
+    """Zwraca (nazwy indeksów do usunięcia, indeksy modelu do utworzenia).
+
+    Indeks o tej samej nazwie, ale innych kolumnach (zmieniona definicja) jest w obu listach.
+    """
+    existing = _index_names(db, model.__tablename__)
+    drop = [name for name in legacy if name in existing]
+    create = []
+    for index in model.__table__.indexes:
+        if index.name not in existing:
+            create.append(index)
+        elif _index_columns(db, index.name) != [column.name for column in index.columns]:
+            drop.append(index.name)
+            create.append(index)
+    return drop, create
+
+
+def replace_indexes(db: Session, drop: list[str], create: list) -> None:
+    connection = db.connection()
+    for name in drop:
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    for index in create:
+        index.create(connection)
+
+
+def migrate_rating_keys(db: Session) -> int:
+    """Usuwa powtórzone oceny, zamienia stare indeksy na złożone (z unikalnym (userId, movieId))
+    i przelicza statystyki, jeśli coś usunięto. Zwraca liczbę usuniętych ocen."""
+    drop, create = stale_indexes(db, Rating, LEGACY_RATING_INDEXES)
+    if not drop and not create:
+        return 0
+
+    removed = 0
+    if any(index.unique for index in create):
+        removed = db.connection().exec_driver_sql(DEDUPE_RATINGS_SQL).rowcount
+    replace_indexes(db, drop, create)
+    if removed:
+        aggregates.rebuild_rating_stats(db)
+    db.commit()
+    logger.info("Migracja ocen: usunięto %d powtórzonych ocen, nowe indeksy %s",
+                removed, [index.name for index in create])
+    return removed
+
+
+def migrate_tag_indexes(db: Session) -> bool:
+    """Zamienia jednokolumnowe indeksy tagów na złożone (userId/movieId, timestamp, id)."""
+    drop, create = stale_indexes(db, Tag, LEGACY_TAG_INDEXES)
+    if not drop and not create:
+        return False
+    replace_indexes(db, drop, create)
+    db.commit()
+    logger.info("Migracja tagów: nowe indeksy %s", [index.name for index in create])
+    return True
+
+
+def migrate_search_triggers(db: Session) -> list[str]:
+    """Podmienia triggery indeksu wyszukiwarki, których treść różni się od SEARCH_TRIGGERS
+    (np. dawny tags_fts_ai składający wszystkie tagi filmu przy każdym wstawieniu)."""
+    connection = db.connection()
+    stored = dict(connection.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+    ).all())
+    replaced = [
+        name for name, sql in SEARCH_TRIGGERS.items()
+        if name in stored and stored[name] != sql.replace(" IF NOT EXISTS", "", 1)
+    ]
+    for name in replaced:
+        connection.exec_driver_sql(f'DROP TRIGGER "{name}"')
+        connection.exec_driver_sql(SEARCH_TRIGGERS[name])
+    if replaced:
+        db.commit()
+        logger.info("Migracja wyszukiwarki: nowe triggery %s", replaced)
+    return replaced
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, UniqueConstraint, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -9,6 +9,13 @@ class Movie(Base):
     title = Column(String, index=True)
     genres = Column(String)
 
+# Znormalizowane gatunki filmu (Movie.genres to napis "A|B|C").
+# Klucz (genre, movieId) służy jako indeks do filtrowania po gatunku w kolejności movieId.
+class MovieGenre(Base):
+    __tablename__ = "movie_genres"
+    genre = Column(String, primary_key=True)
+    movieId = Column(Integer, primary_key=True, index=True)
+
 class Link(Base):
     __tablename__ = "links"
     movieId = Column(Integer, primary_key=True, index=True)
@@ -18,19 +25,52 @@ class Link(Base):
 class Rating(Base):
     __tablename__ = "ratings"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    userId = Column(Integer, index=True)
-    movieId = Column(Integer, index=True)
+    userId = Column(Integer)
+    movieId = Column(Integer)
     rating = Column(Float)
     timestamp = Column(Integer)
 
+    # Jedna ocena użytkownika na film (klucz PUT /movies/{id}/my-rating). Indeksy wg czasu mają
+    # dopisane pozostałe kolumny wiersza, więc "oceny użytkownika/filmu po czasie" czytają sam indeks;
+    # id zaraz po timestamp daje kolejność (timestamp, id) potrzebną paginacji po kursorze (app/filters.py).
+    # Prefiksy zastępują dawne jednokolumnowe ix_ratings_userId/ix_ratings_movieId, a (userId, id)
+    # i (movieId, id) przejmują ich drugą rolę: strony ocen użytkownika/filmu w domyślnej kolejności id.
+    __table_args__ = (
+        Index("ux_ratings_user_movie", "userId", "movieId", unique=True),
+        Index("ix_ratings_user_time", "userId", "timestamp", "id", "movieId", "rating"),
+        Index("ix_ratings_movie_time", "movieId", "timestamp", "id", "userId", "rating"),
+        Index("ix_ratings_user_by_id", "userId", "id"),
+        Index("ix_ratings_movie_by_id", "movieId", "id"),
+        Index("ix_ratings_time", "timestamp", "id"),
+    )
+
+# Zagregowane statystyki ocen filmu, aktualizowane razem z każdą zmianą w tabeli ratings
+class MovieRatingStats(Base):
+    __tablename__ = "movie_rating_stats"
+    movieId = Column(Integer, primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_sum_sq = Column(Float, nullable=False, default=0.0)
+    min_rating = Column(Float)
+    max_rating = Column(Float)
+
 class Tag(Base):
     __tablename__ = "tags"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    userId = Column(Integer, index=True)
-    movieId = Column(Integer, index=True)
+    userId = Column(Integer)
+    movieId = Column(Integer)
     tag = Column(String)
     timestamp = Column(Integer)
 
+    # Te same klucze co przy ocenach (bez pokrycia - tekst tagu zostaje w tabeli)
+    __table_args__ = (
+        Index("ix_tags_user_time", "userId", "timestamp", "id"),
+        Index("ix_tags_movie_time", "movieId", "timestamp", "id"),
+        Index("ix_tags_user_by_id", "userId", "id"),
+        Index("ix_tags_movie_by_id", "movieId", "id"),
+        Index("ix_tags_time", "timestamp", "id"),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -38,4 +78,45 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, default="user", nullable=False)
-    is_active = Column(Boolean, default=True)  
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+
+
+# Indeks pełnotekstowy FTS5 dla wyszukiwarki filmów (tytuł + tagi, rowid = movieId).
+# Triggery utrzymują go przy zapisach przez API (także wsadowych). Nowy tag jest dopisywany na koniec
+# kolumny tags, więc koszt nie rośnie z liczbą tagów filmu; zmiana i usunięcie tagu składają listę
+# od nowa. Import CSV (app/import_csv.py) wyłącza triggery i na końcu odbudowuje indeks jednym zapytaniem.
+MOVIE_YEAR_SQL = (
+    "CASE WHEN rtrim({t}) GLOB '*([0-9][0-9][0-9][0-9])' "
+    "THEN CAST(substr(rtrim({t}), -5, 4) AS INTEGER) END"
+)
+MOVIE_TAGS_SQL = "(SELECT group_concat(tag, ' ') FROM tags WHERE tags.movieId = {m})"
+
+SEARCH_TABLE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+    "title, tags, year UNINDEXED, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+SEARCH_TRIGGERS = {
+    "movies_fts_ai": "CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN "
+    "INSERT INTO movies_fts (rowid, title, tags, year) VALUES (new.movieId, new.title, "
+    f"{MOVIE_TAGS_SQL.format(m='new.movieId')}, {MOVIE_YEAR_SQL.format(t='new.title')}); END",
+    "movies_fts_au": "CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE OF title ON movies BEGIN "
+    "DELETE FROM movies_fts WHERE rowid = old.movieId; "
+    "INSERT INTO movies_fts (rowid, title, tags, year) VALUES (new.movieId, new.title, "
+    f"{MOVIE_TAGS_SQL.format(m='new.movieId')}, {MOVIE_YEAR_SQL.format(t='new.title')}); END",
+    "movies_fts_ad": "CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN "
+    "DELETE FROM movies_fts WHERE rowid = old.movieId; END",
+    "tags_fts_ai": "CREATE TRIGGER IF NOT EXISTS tags_fts_ai AFTER INSERT ON tags WHEN new.tag IS NOT NULL BEGIN "
+    "UPDATE movies_fts SET tags = coalesce(tags || ' ', '') || new.tag WHERE rowid = new.movieId; END",
+    "tags_fts_au": "CREATE TRIGGER IF NOT EXISTS tags_fts_au AFTER UPDATE OF tag, movieId ON tags BEGIN "
+    f"UPDATE movies_fts SET tags = {MOVIE_TAGS_SQL.format(m='old.movieId')} WHERE rowid = old.movieId; "
+    f"UPDATE movies_fts SET tags = {MOVIE_TAGS_SQL.format(m='new.movieId')} WHERE rowid = new.movieId; END",
+    "tags_fts_ad": "CREATE TRIGGER IF NOT EXISTS tags_fts_ad AFTER DELETE ON tags BEGIN "
+    f"UPDATE movies_fts SET tags = {MOVIE_TAGS_SQL.format(m='old.movieId')} WHERE rowid = old.movieId; END",
+}
+
+SEARCH_INDEX_DDL = [SEARCH_TABLE_DDL, *SEARCH_TRIGGERS.values()]
+
+for _statement in SEARCH_INDEX_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS movies_fts"))
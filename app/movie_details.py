@@ -0,0 +1,101 @@
+# app/movie_details.py
+# GET /movies/{id}/full i GET /movies/full?ids=1,2,3: film, link, statystyki ocen, ostatnie oceny
+# i najczęstsze tagi w jednej odpowiedzi - zamiast czterech żądań (każde z autoryzacją).
+# Liczba zapytań nie zależy od liczby filmów:
+#   filmy, linki    - snapshot katalogu (CATALOG_SNAPSHOT=1) albo po jednym IN po kluczu głównym,
+#   statystyki      - jedno IN po movie_rating_stats (utrzymywanej przez app/aggregates.py),
+#   ostatnie oceny  - UNION ALL zapytań z LIMIT; każde to wsteczny odczyt pokrywającego
+#                     ix_ratings_movie_time, więc czytamy tylko zwracane wiersze,
+#   najczęstsze tagi - GROUP BY (movieId, tag) po ix_tags_movie_time i ROW_NUMBER() po liczbie.
+import os
+from collections import defaultdict
+from fastapi import HTTPException
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+from app import aggregates
+from app.catalog import catalog
+from app.models import Movie, Link, MovieRatingStats, Rating, Tag
+
+# Ile filmów można pobrać jednym ?ids=; trzyma też UNION ALL poniżej limitu SQLite (500 członów)
+MOVIE_DETAILS_MAX_IDS = int(os.getenv("MOVIE_DETAILS_MAX_IDS", "100"))
+
+
+def parse_ids(raw: str) -> list[int]:
+    """"1,2,3" -> [1, 2, 3] bez powtórzeń, w kolejności z żądania."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids musi być listą liczb oddzielonych przecinkami")
+    if not ids:
+        raise HTTPException(status_code=400, detail="Podaj co najmniej jedno id")
+    if len(ids) > MOVIE_DETAILS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Można pobrać najwyżej {MOVIE_DETAILS_MAX_IDS} filmów naraz")
+    return ids
+
+
+def _movies(db: Session, ids: list[int]) -> dict:
+    if catalog.enabled:
+        rows = (catalog.movies.get(movie_id) for movie_id in ids)
+        return {row.movieId: {"movieId": row.movieId, "title": row.title, "genres": row.genres}
+                for row in rows if row is not None}
+    stmt = select(Movie.movieId, Movie.title, Movie.genres).where(Movie.movieId.in_(ids))
+    return {row.movieId: row._asdict() for row in db.execute(stmt)}
+
+
+def _links(db: Session, ids: list[int]) -> dict:
+    if catalog.enabled:
+        rows = (catalog.links.get(movie_id) for movie_id in ids)
+        return {row.movieId: {"movieId": row.movieId, "imdbId": row.imdbId, "tmdbId": row.tmdbId}
+                for row in rows if row is not None}
+    stmt = select(Link.movieId, Link.imdbId, Link.tmdbId).where(Link.movieId.in_(ids))
+    return {row.movieId: row._asdict() for row in db.execute(stmt)}
+
+
+def _recent_ratings(db: Session, ids: list[int], limit: int) -> dict:
+    legs = [
+        select(select(Rating.id, Rating.userId, Rating.movieId, Rating.rating, Rating.timestamp)
+               .where(Rating.movieId == movie_id)
+               .order_by(Rating.timestamp.desc(), Rating.id.desc())
+               .limit(limit).subquery())
+        for movie_id in ids
+    ]
+    recent = defaultdict(list)
+    for row in db.execute(union_all(*legs) if len(legs) > 1 else legs[0]):
+        recent[row.movieId].append(row._asdict())
+    return recent
+
+
+def _top_tags(db: Session, ids: list[int], limit: int) -> dict:
+    counts = (select(Tag.movieId, Tag.tag, func.count().label("count"))
+              .where(Tag.movieId.in_(ids)).group_by(Tag.movieId, Tag.tag).subquery())
+    ranked = select(counts, func.row_number().over(
+        partition_by=counts.c.movieId, order_by=(counts.c["count"].desc(), counts.c.tag),
+    ).label("position")).subquery()
+    stmt = (select(ranked.c.movieId, ranked.c.tag, ranked.c["count"])
+            .where(ranked.c.position <= limit).order_by(ranked.c.movieId, ranked.c.position))
+    top = defaultdict(list)
+    for row in db.execute(stmt):
+        top[row.movieId].append({"tag": row.tag, "count": row.count})
+    return top
+
+
+def load_details(db: Session, ids: list[int], recent_limit: int = 10, tags_limit: int = 10) -> list[dict]:
+    """Szczegóły filmów w kolejności `ids`; nieistniejące filmy są pomijane."""
+    movies = _movies(db, ids)
+    ids = [movie_id for movie_id in ids if movie_id in movies]
+    if not ids:
+        return []
+    links = _links(db, ids)
+    stats = {row.movieId: row for row in db.scalars(select(MovieRatingStats).where(MovieRatingStats.movieId.in_(ids)))}
+    recent = _recent_ratings(db, ids, recent_limit) if recent_limit else {}
+    tags = _top_tags(db, ids, tags_limit) if tags_limit else {}
+    return [
+        {
+            **movies[movie_id],
+            "link": links.get(movie_id),
+            "stats": aggregates.stats_to_dict(movie_id, stats.get(movie_id)),
+            "recent_ratings": recent.get(movie_id, []),
+            "top_tags": tags.get(movie_id, []),
+        }
+        for movie_id in ids
+    ]
@@ -0,0 +1,82 @@
+# app/pagination.py
+# Paginacja po kluczu (keyset/cursor): zamiast OFFSET, który zmusza SQLite do przejścia
+# i odrzucenia `skip` wierszy, filtrujemy po kluczu głównym większym niż ostatni zwrócony.
+import base64
+import json
+import os
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Największy dozwolony ?limit= list (endpointy deklarują Query(50, ge=1, le=PAGE_LIMIT_MAX))
+PAGE_LIMIT_MAX = int(os.getenv("PAGE_LIMIT_MAX", "1000"))
+
+
+def encode_cursor(last_key) -> str:
+    raw = json.dumps({"after": last_key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_key(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, arity: int = 1):
+    """Zwraca klucz z kursora: liczbę dla klucza z jednej kolumny albo listę `arity` liczb.
+
+    Kursor przychodzi od klienta - inny kształt (np. kursor po id przy sortowaniu po (timestamp, id),
+    null, napis, obiekt) to 400, a nie błąd zapytania.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (ValueError, KeyError, TypeError):
+        after = None
+    if arity == 1 and _is_key(after):
+        return after
+    if arity > 1 and isinstance(after, list) and len(after) == arity and all(map(_is_key, after)):
+        return after
+    raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+
+
+def keyset_statement(query, key, cursor: Optional[str] = None, skip: int = 0, limit: int = 50,
+                     descending: bool = False):
+    """Dokłada do zapytania (Query albo select()) warunek kursora, sortowanie i limit.
+
+    Z kursorem strona zaczyna się za ostatnim kluczem poprzedniej strony (stały koszt
+    niezależnie od głębokości), bez kursora działa dotychczasowe skip/limit.
+    Pobieramy jeden wiersz więcej niż `limit`, żeby wiedzieć, czy jest następna strona.
+    `key` to kolumna albo krotka kolumn (np. (timestamp, id)) - wtedy kursor porównujemy
+    jako row value, które SQLite dopasowuje do indeksu o tych kolumnach.
+    """
+    columns = key if isinstance(key, tuple) else (key,)
+    if cursor is not None:
+        after = decode_cursor(cursor, len(columns))
+        position = tuple_(*key) if isinstance(key, tuple) else key
+        after = tuple_(*after) if isinstance(key, tuple) else after
+        query = query.filter(position < after if descending else position > after)
+    query = query.order_by(*(column.desc() if descending else column for column in columns))
+    if cursor is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def finish_page(rows, key, response: Response, limit: int):
+    """Obcina nadmiarowy wiersz i ustawia nagłówek X-Next-Cursor, jeśli jest kolejna strona."""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if isinstance(key, tuple):
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in key])
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, key.key))
+    return rows
+
+
+def keyset_page(query, key, response: Response, cursor: Optional[str] = None, skip: int = 0, limit: int = 50,
+                descending: bool = False):
+    """Zwraca jedną stronę wyników posortowanych po `key` (wersja dla synchronicznego Query)."""
+    return finish_page(keyset_statement(query, key, cursor, skip, limit, descending).all(), key, response, limit)
@@ -0,0 +1,154 @@
+# app/ranking.py
+# Ranking "najlepiej oceniane" liczony średnią bayesowską:
+#   score = (C * m + suma_ocen) / (C + liczba_ocen)
+# gdzie m to średnia wszystkich ocen, a C to "wirtualna" liczba głosów o wartości m.
+# Filmy z kilkoma ocenami 5.0 nie wyprzedzają więc filmów z tysiącami wysokich ocen.
+#
+# Ranking budujemy z tabeli movie_rating_stats (jeden wiersz na film, bez GROUP BY po ratings)
+# i trzymamy w pamięci jako posortowane listy - całej i osobno dla każdego gatunku.
+# Tylko pierwsze zbudowanie odbywa się w żądaniu; nieaktualny ranking przeliczamy w wątku w tle,
+# a żądania do tego czasu dostają poprzednią wersję.
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.genres import split_genres
+from app.models import Movie, MovieRatingStats
+
+logger = logging.getLogger(__name__)
+
+# Maksymalny wiek rankingu (s) - po tym czasie przeliczamy go nawet bez zmian w tym procesie
+# (np. po imporcie CSV z innego procesu).
+TOP_MOVIES_MAX_AGE = float(os.getenv("TOP_MOVIES_MAX_AGE", "300"))
+# Po zmianie ocen przeliczamy ranking najwyżej raz na tyle sekund
+TOP_MOVIES_MIN_REFRESH = float(os.getenv("TOP_MOVIES_MIN_REFRESH", "1"))
+# Waga C; brak wartości = średnia liczba ocen na film
+TOP_MOVIES_PRIOR_VOTES = os.getenv("TOP_MOVIES_PRIOR_VOTES")
+
+
+class RankedMovie(NamedTuple):
+    movieId: int
+    title: str
+    genres: str
+    score: float
+    count: int
+    mean: float
+
+
+class TopMoviesRanking:
+    def __init__(self, max_age: float = TOP_MOVIES_MAX_AGE, min_refresh_seconds: float = TOP_MOVIES_MIN_REFRESH,
+                 prior_votes: Optional[float] = None):
+        self.max_age = max_age
+        self.min_refresh_seconds = min_refresh_seconds
+        self.prior_votes = prior_votes
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self._dirty = True
+        self._all: list[RankedMovie] = []
+        self._by_genre: dict[str, list[RankedMovie]] = {}
+        # Przeliczenie w tle; reset() zmienia generację, więc wynik sprzed resetu jest odrzucany
+        self._worker: Optional[threading.Thread] = None
+        self._generation = 0
+
+    def mark_dirty(self) -> None:
+        """Wołane przez endpointy zapisujące oceny/filmy."""
+        self._dirty = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._built_at = 0.0
+            self._dirty = True
+            self._all, self._by_genre = [], {}
+
+    def _is_stale(self) -> bool:
+        if not self._built_at:
+            return True
+        age = time.monotonic() - self._built_at
+        return age >= self.max_age or (self._dirty and age >= self.min_refresh_seconds)
+
+    def refresh(self, db: Session) -> None:
+        """Przelicza ranking od razu, w bieżącym wątku."""
+        with self._lock:
+            self._publish(self._build(db))
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Czeka na zakończenie przeliczania w tle (jeśli trwa)."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _build(self, db: Session) -> tuple[list[RankedMovie], dict[str, list[RankedMovie]]]:
+        self._dirty = False
+        rows = db.execute(
+            select(Movie.movieId, Movie.title, Movie.genres, MovieRatingStats.rating_count, MovieRatingStats.rating_sum)
+            .join(MovieRatingStats, MovieRatingStats.movieId == Movie.movieId)
+            .where(MovieRatingStats.rating_count > 0)
+        ).all()
+        total_count = sum(r.rating_count for r in rows)
+        global_mean = sum(r.rating_sum for r in rows) / total_count if total_count else 0.0
+        prior = self.prior_votes if self.prior_votes is not None else (total_count / len(rows) if rows else 0.0)
+
+        ranked = sorted(
+            (
+                RankedMovie(r.movieId, r.title, r.genres,
+                            (prior * global_mean + r.rating_sum) / (prior + r.rating_count),
+                            r.rating_count, r.rating_sum / r.rating_count)
+                for r in rows
+            ),
+            key=lambda m: (-m.score, -m.count, m.movieId),
+        )
+        by_genre: dict[str, list[RankedMovie]] = {}
+        for movie in ranked:
+            for genre in split_genres(movie.genres):
+                by_genre.setdefault(genre, []).append(movie)
+        return ranked, by_genre
+
+    def _publish(self, snapshot: tuple[list[RankedMovie], dict[str, list[RankedMovie]]]) -> None:
+        # Podmiana całej struktury naraz - czytelnicy widzą stary albo nowy ranking, nigdy pół na pół
+        self._all, self._by_genre = snapshot
+        self._built_at = time.monotonic()
+
+    def _refresh_in_background(self, db: Session) -> None:
+        with self._lock:
+            if (self._worker is not None and self._worker.is_alive()) or not self._is_stale():
+                return
+            # Własna sesja na tym samym silniku - sesja żądania zostanie zamknięta przed końcem przeliczania
+            self._worker = threading.Thread(target=self._background_refresh, args=(db.get_bind(), self._generation),
+                                            name="top-movies-refresh", daemon=True)
+            self._worker.start()
+
+    def _background_refresh(self, bind, generation: int) -> None:
+        try:
+            with Session(bind=bind) as db:
+                snapshot = self._build(db)
+            with self._lock:
+                if generation == self._generation:
+                    self._publish(snapshot)
+        except Exception:
+            self._dirty = True
+            logger.exception("Przeliczenie rankingu najlepiej ocenianych filmów nie powiodło się")
+
+    def top(self, db: Session, limit: int = 10, genre: Optional[str] = None, min_votes: int = 0) -> list[RankedMovie]:
+        if not self._built_at:
+            with self._lock:
+                if not self._built_at:
+                    self._publish(self._build(db))
+        elif self._is_stale():
+            self._refresh_in_background(db)
+        ranked = self._by_genre.get(genre, []) if genre else self._all
+        result = []
+        for movie in ranked:
+            if movie.count >= min_votes:
+                result.append(movie)
+                if len(result) == limit:
+                    break
+        return result
+
+
+top_movies = TopMoviesRanking(
+    prior_votes=float(TOP_MOVIES_PRIOR_VOTES) if TOP_MOVIES_PRIOR_VOTES else None
+)
@@ -0,0 +1,254 @@
+# app/recommendations.py
+# Spersonalizowane rekomendacje: faktoryzacja macierzy ocen metodą ALS (explicit feedback).
+#
+# Trening: oceny (minus średnia globalna) w rzadkiej macierzy użytkownik x film; na przemian
+# rozwiązujemy układy (V_u^T V_u + reg * n_u * I) x = V_u^T r_u dla wszystkich użytkowników,
+# potem analogicznie dla filmów. Macierze f x f składamy wiersz po wierszu (BLAS), a rozwiązujemy
+# paczkami - jedno np.linalg.solve na stosie ALS_CHUNK układów.
+#
+# Trening idzie w osobnym procesie (spawn), co RECOMMENDER_CHECK_INTERVAL sekund sprawdzamy,
+# czy w tabeli ratings coś się zmieniło - wtedy douczamy model kilkoma iteracjami, startując
+# z poprzednich wektorów (warm start). Do tego przy zapytaniu wektor użytkownika, który ocenił
+# coś od ostatniego treningu, przeliczamy z jego aktualnych ocen (fold-in - jeden układ f x f),
+# więc nowa ocena wpływa na rekomendacje od razu.
+#
+# Ocena rekomendacji to jeden iloczyn macierz-wektor (filmy x f) i wybór top-k bez filmów,
+# które użytkownik już ocenił.
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+import numpy as np
+from scipy import sparse
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from app.models import MovieRatingStats, Rating
+from app.similarity import load_ratings
+
+RECOMMENDER_FACTORS = int(os.getenv("RECOMMENDER_FACTORS", "32"))
+RECOMMENDER_REG = float(os.getenv("RECOMMENDER_REG", "0.1"))
+RECOMMENDER_ITERATIONS = int(os.getenv("RECOMMENDER_ITERATIONS", "10"))
+# Iteracje douczania od poprzedniego modelu
+RECOMMENDER_WARM_ITERATIONS = int(os.getenv("RECOMMENDER_WARM_ITERATIONS", "3"))
+# Co ile sekund sprawdzać, czy są nowe oceny (0 = bez treningu w tle)
+RECOMMENDER_CHECK_INTERVAL = float(os.getenv("RECOMMENDER_CHECK_INTERVAL", "300"))
+# Ile wierszy (x f x f x 4 B) wchodzi do jednej paczki układów - ogranicza pamięć treningu
+ALS_CHUNK = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def _solve_side(r: sparse.csr_matrix, fixed: np.ndarray, reg: float) -> np.ndarray:
+    """Jeden krok ALS: nowe wektory dla wierszy `r` przy ustalonych wektorach kolumn `fixed`."""
+    n_rows, f = r.shape[0], fixed.shape[1]
+    out = np.empty((n_rows, f), dtype=np.float32)
+    indptr, indices, data = r.indptr, r.indices, r.data
+    eye = np.eye(f, dtype=np.float32)
+    for start in range(0, n_rows, ALS_CHUNK):
+        stop = min(start + ALS_CHUNK, n_rows)
+        a = np.empty((stop - start, f, f), dtype=np.float32)
+        b = np.empty((stop - start, f), dtype=np.float32)
+        # V_u^T V_u liczone przez BLAS dla każdego wiersza - ~7x szybciej niż sumowanie
+        # zmaterializowanych iloczynów zewnętrznych (reduceat po ocena x f x f)
+        for i, row in enumerate(range(start, stop)):
+            lo, hi = indptr[row], indptr[row + 1]
+            v = fixed[indices[lo:hi]]
+            a[i] = v.T @ v
+            b[i] = data[lo:hi] @ v
+        counts = np.diff(indptr[start:stop + 1]).astype(np.float32)
+        a += (reg * counts)[:, None, None] * eye
+        out[start:stop] = np.linalg.solve(a, b[..., None])[..., 0]
+    return out
+
+
+def _warm_factors(ids: np.ndarray, previous_ids: Optional[np.ndarray], previous: Optional[np.ndarray],
+                  f: int, rng: np.random.Generator) -> np.ndarray:
+    factors = rng.normal(0, 0.1, (len(ids), f)).astype(np.float32)
+    if previous is not None and len(previous_ids) and previous.shape[1] == f:
+        pos = np.clip(np.searchsorted(previous_ids, ids), 0, len(previous_ids) - 1)
+        known = previous_ids[pos] == ids
+        factors[known] = previous[pos[known]]
+    return factors
+
+
+def train_als(user_ids: np.ndarray, movie_ids: np.ndarray, ratings: np.ndarray,
+              factors: int = RECOMMENDER_FACTORS, reg: float = RECOMMENDER_REG,
+              iterations: int = RECOMMENDER_ITERATIONS, previous: Optional[dict] = None, seed: int = 0) -> dict:
+    users, u_idx = np.unique(user_ids, return_inverse=True)
+    items, i_idx = np.unique(movie_ids, return_inverse=True)
+    mean = float(ratings.mean()) if len(ratings) else 0.0
+    # Wartości równe średniej (0 po odjęciu) to też obserwacje - nie usuwamy jawnych zer
+    r = sparse.csr_matrix(((ratings - mean).astype(np.float32), (u_idx, i_idx)), shape=(len(users), len(items)))
+    rt = r.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    previous = previous or {}
+    user_factors = _warm_factors(users, previous.get("user_ids"), previous.get("user_factors"), factors, rng)
+    item_factors = _warm_factors(items, previous.get("item_ids"), previous.get("item_factors"), factors, rng)
+    for _ in range(iterations):
+        user_factors = _solve_side(r, item_factors, reg)
+        item_factors = _solve_side(rt, user_factors, reg)
+    return {
+        "user_ids": users.astype(np.int64),
+        "item_ids": items.astype(np.int64),
+        "user_factors": user_factors,
+        "item_factors": item_factors,
+        "user_counts": np.diff(r.indptr).astype(np.int64),
+        "mean": mean,
+        "reg": reg,
+    }
+
+
+def ratings_fingerprint(db: Session) -> tuple:
+    """ "Odcisk" tabeli ratings: największe id, liczba ocen z tabeli statystyk i suma kontrolna wartości.
+
+    Suma kontrolna waży każdą ocenę numerami użytkownika i filmu, więc zmiana wartości (też upsert
+    przez PUT /movies/{id}/my-rating) albo przeniesienie oceny do innego wiersza zmienia odcisk.
+    To jeden sekwencyjny odczyt tabeli bez sortowania - ułamek kosztu samego treningu. Oceny są
+    wielokrotnościami 0.5, a wagi liczbami całkowitymi, więc suma jest dokładna (bez błędów zaokrągleń).
+    """
+    checksum = func.total(Rating.rating * (Rating.userId % 1009 + 1) * (Rating.movieId % 1013 + 1))
+    return (
+        db.scalar(select(func.max(Rating.id))),
+        db.scalar(select(func.coalesce(func.sum(MovieRatingStats.rating_count), 0))),
+        db.scalar(select(checksum)),
+    )
+
+
+def train_from_database(db_path: str, previous: Optional[dict], iterations: int) -> tuple[dict, dict]:
+    """Uruchamiane w procesie treningowym: czyta oceny z bazy i zwraca (model, raport)."""
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        with Session(engine) as db:
+            fingerprint = ratings_fingerprint(db)
+            started = time.perf_counter()
+            users, movies, values = load_ratings(db)
+        loaded = time.perf_counter()
+        model = train_als(users, movies, values, iterations=iterations, previous=previous)
+        info = {
+            "ratings": len(values),
+            "users": len(model["user_ids"]),
+            "movies": len(model["item_ids"]),
+            "factors": model["item_factors"].shape[1],
+            "iterations": iterations,
+            "warm_start": previous is not None,
+            "load_seconds": round(loaded - started, 3),
+            "train_seconds": round(time.perf_counter() - loaded, 3),
+        }
+        return {**model, "fingerprint": fingerprint}, info
+    finally:
+        engine.dispose()
+
+
+def fold_in(model: dict, item_positions: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Wektor użytkownika z jego ocen przy ustalonych wektorach filmów (jeden krok ALS)."""
+    v = model["item_factors"][item_positions]
+    f = v.shape[1]
+    a = v.T @ v + model["reg"] * len(values) * np.eye(f, dtype=np.float32)
+    return np.linalg.solve(a, v.T @ (values - model["mean"]).astype(np.float32))
+
+
+class Recommender:
+    def __init__(self, check_interval: float = RECOMMENDER_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.info: dict = {}
+        self._model: Optional[dict] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._training: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def set_model(self, model: dict, info: dict) -> None:
+        self._model = model
+        self.info = {**info, "trained_at": time.time()}
+
+    def train(self, db: Session, iterations: int = RECOMMENDER_ITERATIONS) -> dict:
+        """Trening w bieżącym procesie (testy, CLI)."""
+        fingerprint = ratings_fingerprint(db)
+        users, movies, values = load_ratings(db)
+        model = train_als(users, movies, values, iterations=iterations, previous=self._model)
+        self.set_model({**model, "fingerprint": fingerprint},
+                       {"ratings": len(values), "users": len(model["user_ids"]), "movies": len(model["item_ids"])})
+        return self.info
+
+    def needs_training(self, db: Session) -> bool:
+        return self._model is None or self._model["fingerprint"] != ratings_fingerprint(db)
+
+    def train_in_background(self, db_path: str) -> Optional[Future]:
+        """Zleca trening w procesie treningowym; None, jeśli poprzedni jeszcze trwa."""
+        with self._lock:
+            if self._training is not None and not self._training.done():
+                return None
+            if self._executor is None:
+                # "spawn" - bez kopiowania stanu procesu serwera (wątki, połączenia z bazą)
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            previous = self._model
+            iterations = RECOMMENDER_WARM_ITERATIONS if previous is not None else RECOMMENDER_ITERATIONS
+            if previous is not None:
+                previous = {key: previous[key] for key in ("user_ids", "item_ids", "user_factors", "item_factors")}
+            self._training = self._executor.submit(train_from_database, db_path, previous, iterations)
+            self._training.add_done_callback(self._on_trained)
+            return self._training
+
+    def _on_trained(self, future: Future) -> None:
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Trening modelu rekomendacji nie powiódł się", exc_info=exc)
+            return
+        self.set_model(*future.result())
+
+    def recommend(self, db: Session, user_id: int, k: int) -> Optional[list[tuple[int, float]]]:
+        """Top-k (movieId, przewidywana ocena) bez filmów już ocenionych. None, gdy brak modelu
+        albo użytkownik nie ma ocen znanych modelowi."""
+        model = self._model
+        if model is None:
+            return None
+        rated = db.execute(select(Rating.movieId, Rating.rating).where(Rating.userId == user_id)).all()
+        item_ids = model["item_ids"]
+        rated_ids = np.array([movie_id for movie_id, _ in rated], dtype=np.int64)
+        pos = np.clip(np.searchsorted(item_ids, rated_ids), 0, max(len(item_ids) - 1, 0))
+        known = (item_ids[pos] == rated_ids) if len(item_ids) else np.zeros(len(rated_ids), bool)
+
+        user_pos = int(np.searchsorted(model["user_ids"], user_id))
+        trained = user_pos < len(model["user_ids"]) and model["user_ids"][user_pos] == user_id
+        if trained and model["user_counts"][user_pos] == len(rated):
+            vector = model["user_factors"][user_pos]
+        elif known.any():
+            # Nowe oceny od ostatniego treningu (albo nowy użytkownik) - fold-in
+            values = np.array([value for _, value in rated], dtype=np.float32)
+            vector = fold_in(model, pos[known], values[known])
+        else:
+            return None
+
+        scores = model["item_factors"] @ vector + model["mean"]
+        scores[pos[known]] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(item_ids[i]), float(scores[i])) for i in top]
+
+    def reset(self) -> None:
+        self._model = None
+        self.info = {}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        training = self._training is not None and not self._training.done()
+        return {"ready": self.ready, "training": training, **self.info}
+
+
+recommender = Recommender()
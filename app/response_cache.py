@@ -0,0 +1,163 @@
+# app/response_cache.py
+# Cache gotowych odpowiedzi JSON dla endpointów GET + ETag / 304 Not Modified.
+#
+# Każda tabela ma licznik wersji, który endpointy zapisujące podbijają po commit (bump).
+# Klucz wpisu to ścieżka + query string + wersje tabel, z których odpowiedź jest zbudowana,
+# więc po zapisie stare wpisy przestają pasować od razu (bez TTL) i wypadają z LRU.
+# Rozmiar cache jest ograniczony sumą bajtów ciał odpowiedzi (RESPONSE_CACHE_MAX_BYTES).
+#
+# Liczniki i cache są w pamięci procesu: zapisów przez inny worker uvicorna albo import CLI
+# (także przyrostowy, na żywej bazie) nie widać w licznikach. Dlatego cache jest opcjonalny
+# (RESPONSE_CACHE_MAX_BYTES, domyślnie 0 - zostaje sam ETag liczony z aktualnej odpowiedzi),
+# a wpis żyje najwyżej RESPONSE_CACHE_TTL sekund - tyle co najwyżej trwa nieaktualna odpowiedź
+# po zapisie spoza procesu. Zapisy przez ten proces unieważniają wpisy od razu.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app.pagination import NEXT_CURSOR_HEADER
+
+# Np. 33554432 (32 MiB); 0 = bez cache odpowiedzi
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "0"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "5"))
+
+# Nagłówki ustawiane przez endpoint, które trzeba odtworzyć przy trafieniu w cache
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+# Dane są dostępne tylko po zalogowaniu - bez współdzielonych cache po drodze, zawsze rewalidacja
+CACHE_CONTROL = "private, no-cache"
+
+
+class TableVersions:
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def snapshot(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._versions.clear()
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+        with self._lock:
+            stored = self._data.get(key)
+            if stored is not None and time.monotonic() >= stored[1]:
+                # Wpis starszy niż TTL - mógł go unieważnić zapis spoza procesu
+                del self._data[key]
+                self.size -= len(stored[0][1])
+                stored = None
+            if stored is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return stored[0]
+
+    def set(self, key: Hashable, etag: str, body: bytes, headers: dict) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0][1])
+            self._data[key] = ((etag, body, headers), time.monotonic() + self.ttl)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, ((_, evicted, _), _) = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self.size, "max_bytes": self.max_bytes, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+
+table_versions = TableVersions()
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _cache_key(request: Request, tables: tuple[str, ...]) -> tuple:
+    return request.url.path, request.url.query, tables, table_versions.snapshot(tables)
+
+
+def _serialize(response_model, value: Any, scratch: Response) -> tuple[str, bytes, dict]:
+    adapter = _adapter(response_model)
+    body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {name: scratch.headers[name] for name in CACHED_HEADERS if name in scratch.headers}
+    return etag, body, headers
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _respond(request: Request, entry: tuple) -> Response:
+    etag, body, headers = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_json(request: Request, tables: tuple[str, ...], response_model,
+                load: Callable[[Response], Any]) -> Response:
+    """Zwraca odpowiedź z cache albo wywołuje `load(response)` i zapamiętuje wynik.
+
+    `tables` to tabele, z których zbudowana jest odpowiedź; `load` dostaje obiekt Response
+    na nagłówki (np. X-Next-Cursor) i zwraca dane do serializacji przez `response_model`.
+    """
+    key = _cache_key(request, tables)
+    entry = response_cache.get(key)
+    if entry is None:
+        scratch = Response()
+        entry = _serialize(response_model, load(scratch), scratch)
+        response_cache.set(key, *entry)
+    return _respond(request, entry)
+
+
+async def cached_json_async(request: Request, tables: tuple[str, ...], response_model,
+                            load: Callable[[Response], Awaitable[Any]]) -> Response:
+    key = _cache_key(request, tables)
+    entry = response_cache.get(key)
+    if entry is None:
+        scratch = Response()
+        entry = _serialize(response_model, await load(scratch), scratch)
+        response_cache.set(key, *entry)
+    return _respond(request, entry)
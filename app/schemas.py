@@ -15,6 +15,17 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+class UserAdminUpdate(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class AuthCacheStatsOut(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -64,6 +75,10 @@ class RatingCreate(RatingBase):
     movieId: int
     # userId weźmiemy z tokena zalogowanego użytkownika, nie przesyłamy go w body
 
+class RatingUpsert(RatingBase):
+    # PUT /movies/{id}/my-rating - movieId z adresu, userId z tokena
+    pass
+
 class RatingUpdate(BaseModel):
     rating: Optional[float] = None
     timestamp: Optional[int] = None
@@ -75,6 +90,58 @@ class RatingOut(RatingBase):
     class Config:
         from_attributes = True
 
+class MovieSearchOut(BaseModel):
+    movieId: int
+    title: str
+    genres: str
+    year: Optional[int] = None
+    score: float
+
+class GenreCountOut(BaseModel):
+    genre: str
+    count: int
+
+class MovieStatsOut(BaseModel):
+    movieId: int
+    count: int
+    mean: Optional[float] = None
+    stddev: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class TagCountOut(BaseModel):
+    tag: str
+    count: int
+
+class MovieFullOut(MovieBase):
+    # Film z linkiem, statystykami, ostatnimi ocenami i najczęstszymi tagami (GET /movies/{id}/full)
+    movieId: int
+    link: Optional[LinkOut] = None
+    stats: MovieStatsOut
+    recent_ratings: list[RatingOut]
+    top_tags: list[TagCountOut]
+
+class SimilarMovieOut(BaseModel):
+    movieId: int
+    title: str
+    genres: str
+    score: float
+
+class RecommendationOut(BaseModel):
+    movieId: int
+    title: str
+    genres: str
+    score: float  # przewidywana ocena (source="model") albo wynik rankingu (source="top")
+    source: str
+
+class TopMovieOut(BaseModel):
+    movieId: int
+    title: str
+    genres: str
+    score: float
+    count: int
+    mean: float
+
 # --- TAG SCHEMAS ---
 class TagBase(BaseModel):
     tag: str
@@ -92,4 +159,19 @@ class TagOut(TagBase):
     userId: int
     movieId: int
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- BATCH SCHEMAS ---
+class LinkBatchItem(LinkUpdate):
+    movieId: int
+
+class BatchItemResult(BaseModel):
+    index: int  # pozycja elementu w przesłanej liście
+    status: str  # created / updated / deleted / error
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchOut(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
@@ -0,0 +1,76 @@
+# app/search.py
+# Wyszukiwarka filmów na indeksie FTS5 movies_fts (tabela i triggery są w models.py).
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models import MOVIE_YEAR_SQL
+
+# Wagi BM25 dla kolumn (title, tags, year) - trafienie w tytule liczy się bardziej niż w tagach
+BM25_WEIGHTS = (10.0, 1.0, 0.0)
+
+YEAR_IN_QUERY = re.compile(r"\((\d{4})\)\s*$")
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+REBUILD_SQL = (
+    "INSERT INTO movies_fts (rowid, title, tags, year) "
+    f"SELECT m.movieId, m.title, t.tags, {MOVIE_YEAR_SQL.format(t='m.title')} "
+    "FROM movies m LEFT JOIN (SELECT movieId, group_concat(tag, ' ') AS tags FROM tags GROUP BY movieId) t "
+    "ON t.movieId = m.movieId"
+)
+
+
+def rebuild_search_index(db: Session) -> None:
+    db.execute(text("DELETE FROM movies_fts"))
+    db.execute(text(REBUILD_SQL))
+
+
+def backfill_search_index(db: Session) -> None:
+    """Wypełnia pusty indeks FTS, jeśli baza ma już filmy (np. baza sprzed dodania wyszukiwarki)."""
+    empty = db.execute(text("SELECT 1 FROM movies_fts LIMIT 1")).first() is None
+    if empty and db.execute(text("SELECT 1 FROM movies LIMIT 1")).first() is not None:
+        rebuild_search_index(db)
+        db.commit()
+
+
+def parse_query(q: str) -> tuple[Optional[str], Optional[int]]:
+    """Zamienia tekst użytkownika na zapytanie FTS5 i wyciąga rok z końcówki "(1995)".
+
+    Każde słowo jest cytowane (bez składni FTS5 od użytkownika), a ostatnie dostaje
+    gwiazdkę - wyszukiwanie prefiksowe dla podpowiedzi w trakcie pisania.
+    """
+    year = None
+    match = YEAR_IN_QUERY.search(q)
+    if match:
+        year = int(match.group(1))
+        q = q[:match.start()]
+    tokens = TOKEN.findall(q)
+    if not tokens:
+        return None, year
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms), year
+
+
+def search_movies(db: Session, q: str, limit: int = 20, year: Optional[int] = None) -> list[dict]:
+    match, query_year = parse_query(q)
+    year = year or query_year
+    if match is None:
+        return []
+    sql = (
+        "SELECT m.movieId, m.title, m.genres, f.year, bm25(movies_fts, :w_title, :w_tags, :w_year) AS rank "
+        "FROM movies_fts f JOIN movies m ON m.movieId = f.rowid "
+        "WHERE movies_fts MATCH :match"
+        + (" AND f.year = :year" if year else "")
+        + " ORDER BY rank LIMIT :limit"
+    )
+    w_title, w_tags, w_year = BM25_WEIGHTS
+    rows = db.execute(text(sql), {
+        "match": match, "year": year, "limit": limit,
+        "w_title": w_title, "w_tags": w_tags, "w_year": w_year,
+    })
+    # bm25() zwraca wartości ujemne (im mniejsza, tym lepiej) - odwracamy znak dla czytelności
+    return [
+        {"movieId": r.movieId, "title": r.title, "genres": r.genres, "year": r.year, "score": -r.rank}
+        for r in rows
+    ]
@@ -1,7 +1,15 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import User
-from app.db import get_db
+from app.db import get_db, get_async_db
+from app.cache import TTLCache
 import bcrypt  # Używamy bezpośrednio bcrypt
 from jose import jwt, JWTError
 import os
@@ -16,11 +24,40 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Cache zweryfikowanych tokenów -> dane użytkownika, żeby nie pytać tabeli users przy każdym żądaniu.
+# Wpis żyje najwyżej AUTH_CACHE_TTL sekund (i nie dłużej niż sam token); 0 wyłącza cache.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Niezmienna kopia danych zalogowanego użytkownika (bez sesji SQLAlchemy, bez hasha hasła)."""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+
+
+auth_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+def invalidate_user(username: str) -> int:
+    """Usuwa z cache wszystkie tokeny użytkownika - wołać po zmianie roli lub dezaktywacji."""
+    return auth_cache.invalidate(lambda principal: principal.username == username)
+
+# Koszt bcrypt (log2 liczby rund). Zmiana działa od razu dla nowych haseł,
+# a stare hashe są przeliczane przy najbliższym udanym logowaniu.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Pula procesów do bcrypt: liczba procesów i limit zadań czekających (powyżej - od razu 503)
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "2"))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32"))
+
 # Funkcja do hashowania hasła (bez passlib)
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     # Konwertujemy hasło na bajty i generujemy sól
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
     # Hashujemy i zwracamy jako string (dekodujemy z bajtów)
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8')
@@ -32,6 +69,72 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     hashed_password_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
 
+# Czy hash został policzony z innym kosztem niż aktualny BCRYPT_ROUNDS ("$2b$12$...")
+def needs_rehash(hashed_password: str) -> bool:
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+class PasswordHasherPool:
+    """Wykonuje bcrypt w osobnej puli procesów, żeby fala logowań nie zajmowała
+    wątków obsługujących zwykłe zapytania CRUD.
+
+    Liczba zadań w kolejce jest ograniczona - po przekroczeniu limitu od razu
+    zwracamy 503 zamiast kolejkować kolejne logowania bez końca.
+    """
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None and self.workers > 0:
+            with self._lock:
+                if self._executor is None:
+                    # "spawn" - bez kopiowania stanu procesu serwera (wątki, połączenia z bazą)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Zbyt wiele jednoczesnych logowań, spróbuj ponownie",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                # workers=0: bez puli procesów, bcrypt w wątku
+                return await asyncio.to_thread(fn, *args)
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, BCRYPT_ROUNDS)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordHasherPool()
+
 # Funkcja do generowania tokenu JWT
 def create_access_token(subject: str, role: str, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = {"sub": subject, "role": role, "iat": datetime.now(timezone.utc)}
@@ -39,28 +142,51 @@ def create_access_token(subject: str, role: str, expires_delta: Optional[timedel
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# Funkcja autoryzująca użytkownika z tokenu
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Nieprawidłowy token lub brak autoryzacji",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_payload(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def _remember(token: str, payload: dict, user: Optional[User]) -> Principal:
     if not user or not user.is_active:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    principal = Principal(id=user.id, username=user.username, role=user.role, is_active=user.is_active)
+    expires_in = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+    auth_cache.set(token, principal, ttl=expires_in)
+    return principal
+
+# Funkcja autoryzująca użytkownika z tokenu
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached
+    payload = _token_payload(token)
+    user = db.query(User).filter(User.username == payload["sub"]).first()
+    return _remember(token, payload, user)
+
+# To samo dla tras z app/crud_async.py (DB_ASYNC=1): sesja aiosqlite zamiast get_db, więc
+# autoryzacja nie zajmuje wątku z puli Starlette ani połączenia z synchronicznej puli
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached
+    payload = _token_payload(token)
+    user = (await db.scalars(select(User).where(User.username == payload["sub"]))).first()
+    return _remember(token, payload, user)
 
 # Funkcja sprawdzająca czy użytkownik to ADMIN
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "ROLE_ADMIN":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,288 @@
+# app/similarity.py
+# "Podobne filmy" (item-item): podobieństwo filmów liczone z tabeli ratings.
+#
+# Oceny układamy w rzadką macierz użytkownik x film (scipy.sparse), w trybie adjusted cosine
+# odejmujemy od każdej oceny średnią użytkownika, normalizujemy kolumny i liczymy S = X^T X
+# blokami wierszy (blok x wszystkie filmy), więc pamięć nie rośnie z kwadratem liczby filmów.
+# Z każdego bloku zostaje tylko k najlepszych sąsiadów filmu - indeks ma rozmiar filmy x k.
+# Podobieństwa z małej liczby wspólnych oceniających są ściągane w dół (shrinkage):
+#   s' = s * n / (n + SIMILARITY_SHRINK)
+#
+# Indeks liczymy w tle (start aplikacji / CLI), a zapytanie to tylko odczyt jednego wiersza.
+# Z SIMILARITY_PATH indeks jest zapisywany na dysk i wczytywany jako memory-map (np.load mmap_mode).
+# Każdy zapis trafia do nowego katalogu wersji, a plik CURRENT (podmieniany jednym rename) wskazuje
+# aktualną wersję - czytelnik zawsze mapuje trzy pliki z tej samej wersji.
+#
+# Uwaga: import CSV z --single-user przypisuje wszystkie oceny użytkownikowi 1 - takiej bazy
+# nie da się użyć do rekomendacji.
+import argparse
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Optional
+import numpy as np
+from scipy import sparse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# Ilu sąsiadów trzymamy dla każdego filmu (górna granica parametru k w API)
+SIMILARITY_K = int(os.getenv("SIMILARITY_K", "50"))
+SIMILARITY_METHOD = os.getenv("SIMILARITY_METHOD", "adjusted_cosine")  # albo "cosine"
+SIMILARITY_SHRINK = float(os.getenv("SIMILARITY_SHRINK", "10"))
+# Liczba filmów w jednym bloku mnożenia (blok x filmy x 4 B na gęstą macierz pośrednią)
+SIMILARITY_BLOCK = int(os.getenv("SIMILARITY_BLOCK", "256"))
+# Katalog na zapisany indeks (obok bazy; puste = tylko w pamięci)
+SIMILARITY_PATH = os.getenv("SIMILARITY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "similarity_index"))
+# Budowa indeksu przy starcie aplikacji, gdy nie ma zapisanego w SIMILARITY_PATH (pełny odczyt ratings).
+# Domyślnie start tylko wczytuje zapisany indeks; bez niego indeks budujemy raz, w tle, przy pierwszym
+# zapytaniu o podobne filmy (albo wcześniej z CLI: python -m app.similarity)
+SIMILARITY_ON_STARTUP = os.getenv("SIMILARITY_ON_STARTUP", "0") == "1"
+# Co ile sekund przeliczać indeks w tle (0 = tylko przy starcie)
+SIMILARITY_REBUILD_INTERVAL = float(os.getenv("SIMILARITY_REBUILD_INTERVAL", "0"))
+
+READ_CHUNK = 1_000_000
+INDEX_FILES = ("movie_ids", "neighbors", "scores")
+INDEX_POINTER = "CURRENT"
+# Ile poprzednich wersji zostawiamy (czytelnik mógł właśnie odczytać stary wskaźnik)
+INDEX_KEEP_VERSIONS = 1
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Szczytowe zużycie pamięci procesu w MiB; None tam, gdzie nie ma modułu resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss: Linux podaje KiB, macOS - bajty
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_ratings(db: Session) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Czyta (userId, movieId, rating) paczkami prosto do tablic numpy.
+
+    Idziemy surowym kursorem sqlite3 - wiersze ORM/Row są tu ponad 10x wolniejsze.
+    """
+    users, movies, values = [], [], []
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT userId, movieId, rating FROM ratings WHERE rating IS NOT NULL")
+        while rows := cursor.fetchmany(READ_CHUNK):
+            block = np.array(rows, dtype=np.float64)
+            users.append(block[:, 0].astype(np.int64))
+            movies.append(block[:, 1].astype(np.int64))
+            values.append(block[:, 2].astype(np.float32))
+    finally:
+        cursor.close()
+    if not users:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+    return np.concatenate(users), np.concatenate(movies), np.concatenate(values)
+
+
+def build_index(user_ids: np.ndarray, movie_ids: np.ndarray, ratings: np.ndarray, k: int = SIMILARITY_K,
+                method: str = SIMILARITY_METHOD, shrink: float = SIMILARITY_SHRINK,
+                block: int = SIMILARITY_BLOCK) -> dict:
+    """Liczy indeks top-k sąsiadów. Zwraca tablice movie_ids [n], neighbors [n, k] (pozycje, -1 = brak)
+    i scores [n, k]."""
+    items, item_idx = np.unique(movie_ids, return_inverse=True)
+    _, user_idx = np.unique(user_ids, return_inverse=True)
+    n_users, n_items = int(user_idx.max(initial=-1)) + 1, len(items)
+
+    values = ratings.astype(np.float32)
+    if method == "adjusted_cosine":
+        counts = np.bincount(user_idx, minlength=n_users)
+        means = np.bincount(user_idx, weights=values, minlength=n_users) / np.maximum(counts, 1)
+        values = values - means[user_idx].astype(np.float32)
+    elif method != "cosine":
+        raise ValueError(f"Nieznana metoda podobieństwa: {method}")
+
+    norms = np.sqrt(np.bincount(item_idx, weights=values.astype(np.float64) ** 2, minlength=n_items))
+    norms[norms == 0] = np.inf  # film bez wariancji ocen nie ma sąsiadów
+    x = sparse.csr_matrix(((values / norms[item_idx]).astype(np.float32), (user_idx, item_idx)),
+                          shape=(n_users, n_items))
+    x.eliminate_zeros()
+    xt = x.T.tocsr()
+    # Macierz binarna do liczenia wspólnych oceniających (dla shrinkage)
+    b = sparse.csr_matrix((np.ones(len(item_idx), np.float32), (user_idx, item_idx)), shape=(n_users, n_items))
+    bt = b.T.tocsr()
+
+    k = min(k, max(n_items - 1, 0))
+    neighbors = np.full((n_items, k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    for start in range(0, n_items, block):
+        stop = min(start + block, n_items)
+        sim = (xt[start:stop] @ x).toarray()
+        if shrink > 0:
+            common = (bt[start:stop] @ b).toarray()
+            sim *= common / (common + shrink)
+        sim[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        sim[sim == 0] = -np.inf  # brak wspólnych ocen to brak sąsiedztwa, a nie podobieństwo 0
+        if k == 0:
+            continue
+        top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sim, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        valid = np.isfinite(top_scores)
+        neighbors[start:stop] = np.where(valid, top, -1)
+        scores[start:stop] = np.where(valid, top_scores, 0.0)
+    return {"movie_ids": items.astype(np.int64), "neighbors": neighbors, "scores": scores}
+
+
+def save_index(index: dict, path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    os.mkdir(os.path.join(path, version))
+    for name in INDEX_FILES:
+        np.save(os.path.join(path, version, f"{name}.npy"), index[name])
+    # Wskaźnik podmieniany rename - czytelnik widzi starą albo nową wersję, nigdy mieszankę plików
+    tmp = os.path.join(path, f"{INDEX_POINTER}.{version}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(path, INDEX_POINTER))
+    _remove_old_versions(path, version)
+
+
+def _remove_old_versions(path: str, current: str) -> None:
+    # Wersje sortują się po czasie zapisu; zmapowane pliki usuniętej wersji zostają dostępne do zamknięcia
+    versions = sorted(name for name in os.listdir(path) if name.startswith("v") and name != current
+                      and os.path.isdir(os.path.join(path, name)))
+    for name in versions[:max(len(versions) - INDEX_KEEP_VERSIONS, 0)]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def load_index(path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, INDEX_POINTER), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    files = {name: os.path.join(path, version, f"{name}.npy") for name in INDEX_FILES}
+    if not all(os.path.exists(f) for f in files.values()):
+        return None
+    return {name: np.load(f, mmap_mode="r") for name, f in files.items()}
+
+
+class SimilarMovies:
+    def __init__(self, k: int = SIMILARITY_K, path: str = SIMILARITY_PATH):
+        self.k = k
+        self.path = path
+        self._index: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._builder: Optional[threading.Thread] = None
+        self._builder_lock = threading.Lock()
+        self.build_info: dict = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def build_in_background(self, session_factory) -> None:
+        """Zleca budowę indeksu w wątku, o ile indeks nie jest gotowy i nikt go już nie buduje."""
+        with self._builder_lock:
+            if self.ready or (self._builder is not None and self._builder.is_alive()):
+                return
+            self._builder = threading.Thread(target=self._build_with, args=(session_factory,),
+                                             name="similarity-build", daemon=True)
+            self._builder.start()
+
+    def _build_with(self, session_factory) -> None:
+        try:
+            with session_factory() as db:
+                report = self.build(db)
+            logger.info("Indeks podobnych filmów: %s", report)
+        except Exception:
+            logger.exception("Budowa indeksu podobnych filmów nie powiodła się")
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Czeka na zakończenie budowy w tle (jeśli trwa)."""
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def build(self, db: Session) -> dict:
+        """Przelicza indeks z tabeli ratings i podmienia go. Zwraca raport (czas, pamięć)."""
+        with self._lock:
+            started = time.perf_counter()
+            users, movies, values = load_ratings(db)
+            loaded = time.perf_counter()
+            index = build_index(users, movies, values, k=self.k)
+            built = time.perf_counter()
+            if self.path:
+                save_index(index, self.path)
+                index = load_index(self.path)
+            self._index = index
+            self.build_info = {
+                "ratings": len(values),
+                "movies": len(index["movie_ids"]),
+                "k": self.k,
+                "load_seconds": round(loaded - started, 3),
+                "build_seconds": round(built - loaded, 3),
+                "index_bytes": sum(index[name].nbytes for name in INDEX_FILES),
+                "memory_mapped": bool(self.path),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            return self.build_info
+
+    def load(self) -> bool:
+        """Wczytuje zapisany indeks z SIMILARITY_PATH (memory-map). Zwraca False, gdy go nie ma."""
+        index = load_index(self.path) if self.path else None
+        if index is None:
+            return False
+        self._index = index
+        self.build_info = {"movies": len(index["movie_ids"]), "k": index["neighbors"].shape[1],
+                           "index_bytes": sum(index[name].nbytes for name in INDEX_FILES), "memory_mapped": True}
+        return True
+
+    def reset(self) -> None:
+        self._index = None
+        self.build_info = {}
+
+    def similar(self, movie_id: int, k: int) -> Optional[list[tuple[int, float]]]:
+        """Lista (movieId, podobieństwo) malejąco; None, gdy film nie ma ocen w indeksie."""
+        index = self._index
+        if index is None:
+            raise RuntimeError("Indeks podobieństwa nie jest gotowy")
+        ids = index["movie_ids"]
+        pos = int(np.searchsorted(ids, movie_id))
+        if pos >= len(ids) or ids[pos] != movie_id:
+            return None
+        row, row_scores = index["neighbors"][pos, :k], index["scores"][pos, :k]
+        valid = row >= 0
+        return [(int(m), float(s)) for m, s in zip(ids[row[valid]], row_scores[valid])]
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, **self.build_info}
+
+
+similar_movies = SimilarMovies()
+
+
+def main(argv=None):
+    from app.db import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Budowa indeksu podobnych filmów (item-item).")
+    parser.add_argument("--db", default=str(DB_PATH), help="ścieżka do pliku bazy SQLite")
+    parser.add_argument("--out", default=SIMILARITY_PATH,
+                        help="katalog na indeks (.npy, memory-map); domyślnie SIMILARITY_PATH")
+    parser.add_argument("--k", type=int, default=SIMILARITY_K)
+    args = parser.parse_args(argv)
+    if not args.out:
+        # Indeks zbudowany tylko w pamięci procesu CLI przepadłby razem z nim
+        parser.error("podaj --out (albo ustaw SIMILARITY_PATH) - katalog, z którego serwer wczyta indeks")
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    with Session(engine) as db:
+        report = SimilarMovies(k=args.k, path=args.out).build(db)
+    engine.dispose()
+    for key, value in report.items():
+        print(f"{key:>15}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db import get_db
+from app.models import Movie, Rating
+from app.schemas import RecommendationOut
+from app.security import get_current_user
+from app.recommendations import recommender
+from app.ranking import top_movies
+
+router = APIRouter()
+
+# Rekomendacje dla zalogowanego użytkownika z modelu ALS (app/recommendations.py).
+# Bez modelu albo bez ocen użytkownika: najlepiej oceniane filmy, których jeszcze nie ocenił.
+@router.get("/me/recommendations", response_model=list[RecommendationOut])
+def get_my_recommendations(k: int = Query(20, ge=1, le=100), db: Session = Depends(get_db),
+                           current_user = Depends(get_current_user)):
+    recommended = recommender.recommend(db, current_user.id, k)
+    if recommended is None:
+        rated = set(db.scalars(select(Rating.movieId).where(Rating.userId == current_user.id)))
+        ranked = [m for m in top_movies.top(db, k + len(rated)) if m.movieId not in rated][:k]
+        return [
+            {"movieId": m.movieId, "title": m.title, "genres": m.genres, "score": m.score, "source": "top"}
+            for m in ranked
+        ]
+    movies = {m.movieId: m for m in db.query(Movie).filter(Movie.movieId.in_([movie_id for movie_id, _ in recommended]))}
+    return [
+        {"movieId": movie_id, "title": movies[movie_id].title, "genres": movies[movie_id].genres,
+         "score": score, "source": "model"}
+        for movie_id, score in recommended if movie_id in movies
+    ]
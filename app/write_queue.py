@@ -0,0 +1,142 @@
+# app/write_queue.py
+# Tryb "write-behind" (WRITE_BEHIND=1) dla POST /ratings i POST /tags.
+# Zamiast osobnego commit (fsync) + refresh dla każdego żądania, jeden wątek zapisujący zbiera
+# wstawienia przez krótkie okno (WRITE_BEHIND_WINDOW_MS) albo do WRITE_BEHIND_MAX_BATCH wierszy
+# i zapisuje je w jednej transakcji. Każde żądanie czeka na swój wynik (z nadanym id).
+#
+# Po przekroczeniu WRITE_BEHIND_TIMEOUT żądanie anuluje swój wpis (Future.cancel) - writer pomija
+# anulowane wpisy, więc 503 oznacza, że zapisu nie będzie i klient może go bezpiecznie powtórzyć.
+# Jeśli writer zdążył już wziąć wpis do paczki, anulowanie się nie uda i żądanie czeka na wynik.
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Optional
+from sqlalchemy.orm import sessionmaker
+from app.db import SessionLocal
+from app.models import Rating, Tag
+from app import aggregates
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_WINDOW_MS = float(os.getenv("WRITE_BEHIND_WINDOW_MS", "5"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500"))
+# Ile żądanie czeka na zapis, zanim go anuluje i dostanie 503
+WRITE_BEHIND_TIMEOUT = float(os.getenv("WRITE_BEHIND_TIMEOUT", "5"))
+TIMEOUT_DETAIL = "Zapis nie zmieścił się w limicie czasu i został anulowany, spróbuj ponownie"
+
+MODELS = {"rating": Rating, "tag": Tag}
+COLUMNS = {
+    "rating": ("id", "userId", "movieId", "rating", "timestamp"),
+    "tag": ("id", "userId", "movieId", "tag", "timestamp"),
+}
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, session_factory: sessionmaker, window_ms: float = WRITE_BEHIND_WINDOW_MS,
+                 max_batch: int = WRITE_BEHIND_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self.cancelled = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Zapisuje to, co czeka w kolejce, i kończy wątek."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def submit(self, kind: str, values: dict) -> Future:
+        self.start()
+        future: Future = Future()
+        self._queue.put((kind, values, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(self._claim(batch))
+            if stop:
+                return
+
+    def _claim(self, batch: list) -> list:
+        """Oznacza wpisy jako zapisywane (potem nie da się ich anulować) i pomija już anulowane."""
+        claimed = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        self.cancelled += len(batch) - len(claimed)
+        return claimed
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        try:
+            results = self._write_transaction(batch)
+        except Exception as exc:
+            # Jeden błędny wiersz nie może zablokować całej paczki - zapisujemy pojedynczo
+            if len(batch) > 1:
+                for item in batch:
+                    self._write([item])
+            else:
+                batch[0][2].set_exception(exc)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _write_transaction(self, batch: list) -> list[dict]:
+        with self.session_factory() as db:
+            objects = [MODELS[kind](**values) for kind, values, _ in batch]
+            db.add_all(objects)
+            ratings_by_movie = defaultdict(list)
+            for (kind, values, _) in batch:
+                if kind == "rating":
+                    ratings_by_movie[values["movieId"]].append(values["rating"])
+            for movie_id, values in ratings_by_movie.items():
+                aggregates.add_ratings(db, movie_id, values)
+            db.flush()  # nadaje id wszystkim wierszom paczki
+            results = [
+                {column: getattr(obj, column) for column in COLUMNS[kind]}
+                for obj, (kind, _, _) in zip(objects, batch)
+            ]
+            db.commit()
+        self.batches += 1
+        self.rows += len(batch)
+        return results
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "rows": self.rows, "cancelled": self.cancelled, "pending": self._queue.qsize()}
+
+
+# Writer aplikacji; None, gdy tryb write-behind jest wyłączony
+write_behind: Optional[GroupCommitWriter] = GroupCommitWriter(SessionLocal) if WRITE_BEHIND else None
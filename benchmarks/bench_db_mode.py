@@ -0,0 +1,135 @@
+"""Porównanie przepustowości trybu synchronicznego i asynchronicznego (DB_ASYNC=1).
+
+Skrypt uruchamia serwer uvicorn na kopii bazy dwa razy (sync i async) i w obu trybach
+odpytuje go z wielu równoczesnych klientów (GET /movies/{id} i GET /ratings z kursorem).
+
+Użycie (z katalogu głównego repozytorium):
+    python benchmarks/bench_db_mode.py --clients 100 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.security import create_access_token, hash_password  # noqa: E402
+
+BENCH_USER = "bench"
+
+
+def prepare_database(source: Path, target: Path) -> list[int]:
+    """Kopiuje bazę, dodaje użytkownika testowego i zwraca listę movieId do losowania."""
+    shutil.copy(source, target)
+    conn = sqlite3.connect(target)
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO users (username, password_hash, role, is_active) VALUES (?, ?, 'user', 1)",
+            (BENCH_USER, hash_password("bench-password", rounds=4)),
+        )
+    movie_ids = [row[0] for row in conn.execute("SELECT movieId FROM movies")]
+    conn.close()
+    return movie_ids
+
+
+def start_server(db_path: Path, port: int, async_mode: bool) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_PATH=str(db_path), DB_ASYNC="1" if async_mode else "0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Serwer nie wystartował")
+
+
+async def run_load(base_url: str, token: str, movie_ids: list[int], clients: int, duration: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"},
+                                 limits=limits, timeout=30.0) as client:
+        async def worker():
+            nonlocal errors
+            cursor = None
+            while time.monotonic() < deadline:
+                if random.random() < 0.5:
+                    request = client.get(f"/movies/{random.choice(movie_ids)}")
+                else:
+                    request = client.get("/ratings", params={"limit": 50, **({"cursor": cursor} if cursor else {})})
+                start = time.perf_counter()
+                response = await request
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                cursor = response.headers.get("X-Next-Cursor")
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=str(ROOT / "app" / "database.db"), help="baza źródłowa (kopiowana)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="czas pomiaru dla jednego trybu (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    token = create_access_token(subject=BENCH_USER, role="user")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        movie_ids = prepare_database(Path(args.db), db_path)
+        for mode in ("sync", "async"):
+            server = start_server(db_path, args.port, async_mode=(mode == "async"))
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                asyncio.run(wait_until_ready(base_url))
+                results[mode] = asyncio.run(run_load(base_url, token, movie_ids, args.clients, args.duration))
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"\n{args.clients} klientów, {args.duration:.0f}s na tryb")
+    print(f"{'tryb':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'błędy':>6}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>6}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
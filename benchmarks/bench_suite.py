@@ -0,0 +1,461 @@
+"""Zestaw benchmarków API i importu CSV z kontrolą regresji.
+
+Kroki:
+  1. Przygotowanie danych w wybranej skali (--ratings, od 10k do 10M ocen): movies/links/tags
+     z katalogu --csv-dir, a ratings.csv powielany z danych źródłowych (każde kolejne przejście
+     dostaje nowe userId), zapis strumieniowy do katalogu tymczasowego. Z --synthetic wszystkie
+     pliki tworzy generator app/generate_csv.py (rozkłady jak w MovieLens, filmy w skali danych).
+  2. Import do pustej bazy przez app/import_csv.py (osobny proces) - mierzony czas i wiersze/s.
+  3. Serwer uvicorn na tej bazie i po kolei każdy endpoint z app/main.py, auth_router i routerów
+     pomocniczych: --clients równoczesnych klientów przez --duration sekund na endpoint.
+     Dla każdego: liczba żądań, błędy, req/s, p50/p95/p99.
+  4. Wyniki do pliku JSON (--out); z --baseline porównanie z poprzednim wynikiem - kod wyjścia 1,
+     jeśli p95 albo czas importu wzrosły, albo req/s spadło o więcej niż --max-regression.
+
+Użycie (z katalogu głównego repozytorium):
+    python benchmarks/bench_suite.py --ratings 1000000 --clients 32 --duration 10 --out bench.json
+    python benchmarks/bench_suite.py --ratings 1000000 --baseline bench.json --max-regression 0.2
+    python benchmarks/bench_suite.py --list
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import generate_csv  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.security import create_access_token, hash_password  # noqa: E402
+from bench_db_mode import wait_until_ready  # noqa: E402
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+# Metryki porównywane z wynikiem bazowym: (klucz, True = większe jest gorsze)
+COMPARED = (("p95_ms", True), ("rps", False))
+
+
+# ---------------------------------------------------------------------------------------------
+# Dane
+# ---------------------------------------------------------------------------------------------
+
+def seed_csv(source: Path, target: Path, ratings: int) -> dict:
+    """Zapisuje zestaw CSV z `ratings` ocenami; pozostałe pliki kopiuje bez zmian."""
+    target.mkdir(parents=True, exist_ok=True)
+    for name in ("movies.csv", "links.csv", "tags.csv"):
+        shutil.copy(source / name, target / name)
+    with open(source / "ratings.csv", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    user_col = header.index("userId")
+    user_span = max(int(row[user_col]) for row in rows)
+
+    written = 0
+    with open(target / "ratings.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        for offset in itertools.count(step=user_span):
+            for row in rows[:ratings - written]:
+                row = list(row)
+                row[user_col] = str(int(row[user_col]) + offset)
+                writer.writerow(row)
+            written = min(ratings, written + len(rows))
+            if written >= ratings:
+                break
+    return {"ratings": written, "source": str(source)}
+
+
+def run_import(csv_dir: Path, db_path: Path, workers: int) -> dict:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    command = [sys.executable, "app/import_csv.py", "--db", str(db_path), "--csv-dir", str(csv_dir),
+               "--workers", str(workers)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if result.returncode != 0 or "SUKCES" not in result.stdout:
+        raise RuntimeError(f"Import nie powiódł się:\n{result.stdout}\n{result.stderr}")
+    with sqlite3.connect(db_path) as conn:
+        rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("movies", "links", "ratings", "tags")}
+    return {"seconds": round(seconds, 3), "rows": rows,
+            "rows_per_second": round(sum(rows.values()) / seconds), "workers": workers}
+
+
+def add_bench_user(db_path: Path) -> None:
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO users (username, password_hash, role, is_active) VALUES (?, ?, 'ROLE_ADMIN', 1)",
+            (BENCH_USER, hash_password(BENCH_PASSWORD, rounds=4)),
+        )
+
+
+# ---------------------------------------------------------------------------------------------
+# Scenariusze
+# ---------------------------------------------------------------------------------------------
+
+class Context:
+    """Dane do losowania parametrów + pule rekordów utworzonych przez benchmark (do PUT/DELETE)."""
+
+    def __init__(self, db_path: Path):
+        with sqlite3.connect(db_path) as conn:
+            self.movie_ids = [row[0] for row in conn.execute("SELECT movieId FROM movies")]
+            self.max_rating_id = conn.execute("SELECT MAX(id) FROM ratings").fetchone()[0] or 1
+            self.max_tag_id = conn.execute("SELECT MAX(id) FROM tags").fetchone()[0] or 1
+            self.words = [row[0].split()[0] for row in conn.execute("SELECT title FROM movies LIMIT 2000")
+                          if row[0].split()]
+            self.genres = [row[0] for row in conn.execute("SELECT DISTINCT genre FROM movie_genres")] or ["Drama"]
+        self.created: dict[str, list[int]] = {"movies": [], "links": [], "ratings": [], "tags": [], "users": []}
+        self.counter = itertools.count()
+
+    def movie(self) -> int:
+        return random.choice(self.movie_ids)
+
+    def unique(self, prefix: str) -> str:
+        return f"{prefix}-{os.getpid()}-{next(self.counter)}"
+
+
+Prepared = tuple[str, str, dict]
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Zwraca (metoda, ścieżka, argumenty httpx); może wykonać niemierzone żądania przygotowawcze
+    prepare: Callable[[Context, httpx.AsyncClient], Awaitable[Prepared]]
+    expect: tuple[int, ...] = (200,)
+    # Po udanym żądaniu: zapamiętanie utworzonego rekordu (niemierzone)
+    remember: Optional[Callable[[Context, httpx.Response], None]] = None
+
+
+def get(path: Callable[[Context], str], params: Callable[[Context], dict] = lambda ctx: {}):
+    async def prepare(ctx, client):
+        return "GET", path(ctx), {"params": params(ctx)}
+    return prepare
+
+
+def send(method: str, path: Callable[[Context], str], body: Callable[[Context], object]):
+    async def prepare(ctx, client):
+        return method, path(ctx), {"json": body(ctx)}
+    return prepare
+
+
+async def take(ctx: Context, client: httpx.AsyncClient, pool: str) -> int:
+    """Rekord utworzony przez benchmark (do PUT/DELETE); gdy pula pusta - tworzy go bez pomiaru."""
+    if ctx.created[pool]:
+        return ctx.created[pool].pop()
+    if pool in ("movies", "links"):
+        movie_id = (await client.post("/movies", json={"title": ctx.unique("bench"), "genres": "Drama"})).json()["movieId"]
+        if pool == "links":
+            await client.post("/links", json={"movieId": movie_id, "imdbId": "0000001"})
+        return movie_id
+    if pool == "users":
+        return (await client.post("/auth/users", json={"username": ctx.unique("u"), "password": "secret-pass"})).json()["id"]
+    body = {"movieId": ctx.movie(), **({"rating": 3.5} if pool == "ratings" else {"tag": "bench"})}
+    return (await client.post(f"/{pool}", json=body)).json()["id"]
+
+
+def pooled(method: str, pool: str, path: str, body: Optional[dict] = None, keep: bool = False):
+    async def prepare(ctx, client):
+        key = await take(ctx, client, pool)
+        if keep:
+            ctx.created[pool].append(key)
+        return method, path.format(key), {"json": body} if body is not None else {}
+    return prepare
+
+
+def remember(pool: str, field: str = "id"):
+    def store(ctx: Context, response: httpx.Response) -> None:
+        if response.status_code == 201:  # 409 (film już oceniony) nie tworzy wiersza
+            ctx.created[pool].append(response.json()[field])
+    return store
+
+
+async def create_link(ctx, client):
+    movie_id = (await client.post("/movies", json={"title": ctx.unique("link"), "genres": "Drama"})).json()["movieId"]
+    return "POST", "/links", {"json": {"movieId": movie_id, "imdbId": "0000001", "tmdbId": "1"}}
+
+
+async def delete_ratings_batch(ctx, client):
+    ids = [await take(ctx, client, "ratings") for _ in range(20)]
+    return "DELETE", "/ratings/batch", {"json": ids}
+
+
+async def login(ctx, client):
+    return "POST", "/auth/login", {"data": {"username": BENCH_USER, "password": BENCH_PASSWORD}}
+
+
+SCENARIOS = [
+    Scenario("GET /", get(lambda ctx: "/")),
+    Scenario("GET /movies", get(lambda ctx: "/movies", lambda ctx: {"skip": random.randrange(len(ctx.movie_ids))})),
+    Scenario("GET /movies?genre", get(lambda ctx: "/movies",
+                                      lambda ctx: {"genre": random.sample(ctx.genres, min(2, len(ctx.genres)))})),
+    Scenario("GET /movies/facets", get(lambda ctx: "/movies/facets", lambda ctx: {"genre": random.choice(ctx.genres)})),
+    Scenario("GET /movies/top", get(lambda ctx: "/movies/top")),
+    Scenario("GET /movies/search", get(lambda ctx: "/movies/search", lambda ctx: {"q": random.choice(ctx.words)})),
+    Scenario("GET /movies/{id}", get(lambda ctx: f"/movies/{ctx.movie()}")),
+    Scenario("GET /movies/{id}/stats", get(lambda ctx: f"/movies/{ctx.movie()}/stats"), expect=(200, 404)),
+    Scenario("GET /movies/{id}/full", get(lambda ctx: f"/movies/{ctx.movie()}/full")),
+    Scenario("GET /movies/full?ids", get(lambda ctx: "/movies/full",
+                                         lambda ctx: {"ids": ",".join(str(ctx.movie()) for _ in range(20))})),
+    Scenario("GET /movies/{id}/similar", get(lambda ctx: f"/movies/{ctx.movie()}/similar"), expect=(200, 404)),
+    Scenario("POST /movies", send("POST", lambda ctx: "/movies", lambda ctx: {"title": ctx.unique("bench"), "genres": "Drama"}),
+             expect=(201,), remember=remember("movies", "movieId")),
+    Scenario("PUT /movies/{id}", pooled("PUT", "movies", "/movies/{}", {"genres": "Comedy"}, keep=True)),
+    Scenario("DELETE /movies/{id}", pooled("DELETE", "movies", "/movies/{}"), expect=(204,)),
+    Scenario("GET /links", get(lambda ctx: "/links", lambda ctx: {"skip": random.randrange(len(ctx.movie_ids))})),
+    Scenario("GET /links/{id}", get(lambda ctx: f"/links/{ctx.movie()}"), expect=(200, 404)),
+    Scenario("POST /links", create_link, expect=(201,), remember=remember("links", "movieId")),
+    Scenario("PUT /links/{id}", pooled("PUT", "links", "/links/{}", {"tmdbId": "2"}, keep=True)),
+    Scenario("DELETE /links/{id}", pooled("DELETE", "links", "/links/{}"), expect=(204,)),
+    Scenario("PUT /links/batch", send("PUT", lambda ctx: "/links/batch",
+                                      lambda ctx: [{"movieId": ctx.movie(), "tmdbId": "3"} for _ in range(20)])),
+    Scenario("GET /ratings", get(lambda ctx: "/ratings", lambda ctx: {"skip": random.randrange(1000)})),
+    Scenario("GET /ratings?movieId", get(lambda ctx: "/ratings",
+                                         lambda ctx: {"movieId": ctx.movie(), "sort": "-timestamp"})),
+    Scenario("GET /ratings/{id}", get(lambda ctx: f"/ratings/{random.randint(1, ctx.max_rating_id)}"), expect=(200, 404)),
+    Scenario("POST /ratings", send("POST", lambda ctx: "/ratings", lambda ctx: {"movieId": ctx.movie(), "rating": 4.0}),
+             expect=(201, 409), remember=remember("ratings")),
+    Scenario("PUT /movies/{id}/my-rating", send("PUT", lambda ctx: f"/movies/{ctx.movie()}/my-rating",
+                                                lambda ctx: {"rating": random.choice((2.0, 3.5, 5.0))}),
+             expect=(200, 201)),
+    Scenario("PUT /ratings/{id}", pooled("PUT", "ratings", "/ratings/{}", {"rating": 2.5}, keep=True)),
+    Scenario("DELETE /ratings/{id}", pooled("DELETE", "ratings", "/ratings/{}"), expect=(204,)),
+    Scenario("POST /ratings/batch", send("POST", lambda ctx: "/ratings/batch",
+                                         lambda ctx: [{"movieId": ctx.movie(), "rating": 3.0} for _ in range(100)])),
+    Scenario("DELETE /ratings/batch", delete_ratings_batch),
+    Scenario("GET /tags", get(lambda ctx: "/tags", lambda ctx: {"skip": random.randrange(1000)})),
+    Scenario("GET /tags?movieId", get(lambda ctx: "/tags", lambda ctx: {"movieId": ctx.movie(), "sort": "-timestamp"})),
+    Scenario("GET /tags/{id}", get(lambda ctx: f"/tags/{random.randint(1, ctx.max_tag_id)}"), expect=(200, 404)),
+    Scenario("POST /tags", send("POST", lambda ctx: "/tags", lambda ctx: {"movieId": ctx.movie(), "tag": "bench"}),
+             expect=(201,), remember=remember("tags")),
+    Scenario("PUT /tags/{id}", pooled("PUT", "tags", "/tags/{}", {"tag": "bench2"}, keep=True)),
+    Scenario("DELETE /tags/{id}", pooled("DELETE", "tags", "/tags/{}"), expect=(204,)),
+    Scenario("POST /tags/batch", send("POST", lambda ctx: "/tags/batch",
+                                      lambda ctx: [{"movieId": ctx.movie(), "tag": "bench"} for _ in range(100)])),
+    Scenario("GET /export/ratings?movieId", get(lambda ctx: "/export/ratings", lambda ctx: {"movieId": ctx.movie()})),
+    Scenario("GET /export/movies?format=csv", get(lambda ctx: "/export/movies", lambda ctx: {"format": "csv"})),
+    Scenario("GET /users/me/recommendations", get(lambda ctx: "/users/me/recommendations")),
+    Scenario("GET /diagnostics/db", get(lambda ctx: "/diagnostics/db")),
+    Scenario("GET /metrics", get(lambda ctx: "/metrics")),
+    Scenario("POST /auth/login", login),
+    Scenario("GET /auth/user_details", get(lambda ctx: "/auth/user_details")),
+    Scenario("GET /auth/cache-stats", get(lambda ctx: "/auth/cache-stats")),
+    Scenario("POST /auth/users", send("POST", lambda ctx: "/auth/users",
+                                      lambda ctx: {"username": ctx.unique("u"), "password": "secret-pass"}),
+             expect=(201,), remember=remember("users")),
+    Scenario("PUT /auth/users/{id}", pooled("PUT", "users", "/auth/users/{}", {"is_active": True}, keep=True)),
+]
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0] if latencies else 0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, scenario: Scenario, clients: int, duration: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            method, path, kwargs = await scenario.prepare(ctx, client)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in scenario.expect:
+                errors += 1
+            elif scenario.remember is not None:
+                scenario.remember(ctx, response)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return summarize(latencies, errors, time.monotonic() - started)
+
+
+async def wait_for_models(client: httpx.AsyncClient, timeout: float) -> dict:
+    """Czeka, aż indeks podobnych filmów i model rekomendacji będą gotowe (budują się w tle)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = (await client.get("/diagnostics/db")).json()
+        ready = {name: state[name]["ready"] for name in ("similarity", "recommender")}
+        if all(ready.values()) or time.monotonic() > deadline:
+            return ready
+        await asyncio.sleep(1.0)
+
+
+async def run_endpoints(base_url: str, ctx: Context, scenarios: list[Scenario], clients: int,
+                        duration: float, warmup_timeout: float) -> tuple[dict, dict]:
+    token = create_access_token(subject=BENCH_USER, role="ROLE_ADMIN")
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"},
+                                 limits=limits, timeout=60.0) as client:
+        ready = await wait_for_models(client, warmup_timeout)
+        if not all(ready.values()):
+            # Bez modeli /similar i /recommendations mierzyłyby same odpowiedzi 503
+            raise RuntimeError(f"Modele nie są gotowe po {warmup_timeout:.0f}s: {ready}")
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(client, ctx, scenario, clients, duration)
+            r = results[scenario.name]
+            print(f"{scenario.name:<34} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['errors']:>6}", flush=True)
+    return results, ready
+
+
+def start_server(db_path: Path, port: int, extra_env: dict) -> subprocess.Popen:
+    # Metryki są domyślnie wyłączone - włączamy je, żeby zmierzyć też GET /metrics. Indeks podobnych
+    # filmów budujemy przy starcie, we własnym katalogu obok bazy testowej (nie w app/similarity_index).
+    env = {
+        **os.environ, "METRICS_ENABLED": "1", "DATABASE_PATH": str(db_path),
+        "SIMILARITY_ON_STARTUP": "1", "SIMILARITY_PATH": str(db_path.parent / "similarity_index"),
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+# ---------------------------------------------------------------------------------------------
+# Regresje
+# ---------------------------------------------------------------------------------------------
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Lista opisów regresji względem wyniku bazowego (tylko endpointy obecne w obu)."""
+    problems = []
+    old_import, new_import = baseline.get("import"), results.get("import")
+    if old_import and new_import and new_import["seconds"] > old_import["seconds"] * (1 + threshold):
+        problems.append(f"import: {old_import['seconds']}s -> {new_import['seconds']}s")
+    for name, new in results.get("endpoints", {}).items():
+        old = baseline.get("endpoints", {}).get(name)
+        if old is None:
+            continue
+        for key, higher_is_worse in COMPARED:
+            limit = old[key] * (1 + threshold) if higher_is_worse else old[key] * (1 - threshold)
+            if (new[key] > limit) if higher_is_worse else (new[key] < limit):
+                problems.append(f"{name}: {key} {old[key]} -> {new[key]}")
+    return problems
+
+
+def parse_env(values: list[str]) -> dict:
+    env = {}
+    for value in values:
+        key, sep, val = value.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Oczekiwano KLUCZ=WARTOŚĆ, a jest: {value}")
+        env[key] = val
+    return env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv-dir", default=str(ROOT / "database"), help="źródłowe pliki CSV")
+    parser.add_argument("--ratings", type=int, default=100_000, help="liczba ocen w bazie testowej")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="dane z generatora app/generate_csv.py zamiast powielania --csv-dir")
+    parser.add_argument("--import-workers", type=int, default=0, help="--workers dla import_csv.py")
+    parser.add_argument("--clients", type=int, default=16, help="równocześni klienci na endpoint")
+    parser.add_argument("--duration", type=float, default=5.0, help="czas pomiaru jednego endpointu (s)")
+    parser.add_argument("--endpoints", nargs="*", default=None,
+                        help="tylko scenariusze zawierające któryś z podanych napisów")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KLUCZ=WARTOŚĆ",
+                        help="dodatkowe zmienne środowiskowe serwera (np. CATALOG_SNAPSHOT=1)")
+    parser.add_argument("--warmup-timeout", type=float, default=300.0,
+                        help="ile czekać na indeks podobieństw i model rekomendacji (s)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="plik JSON na wyniki")
+    parser.add_argument("--baseline", help="poprzedni wynik JSON do porównania")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="dopuszczalne pogorszenie p95 / req/s / czasu importu (ułamek, 0.25 = 25%%)")
+    parser.add_argument("--list", action="store_true", help="wypisz scenariusze i zakończ")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.endpoints or any(p in s.name for p in args.endpoints)]
+    if args.list:
+        print("\n".join(s.name for s in scenarios))
+        return 0
+    random.seed(args.seed)
+    server_env = parse_env(args.server_env)
+
+    results = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "ratings": args.ratings, "synthetic": args.synthetic, "clients": args.clients,
+            "duration": args.duration, "server_env": server_env,
+        },
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print(f"Dane: {args.ratings} ocen...", flush=True)
+        if args.synthetic:
+            results["seed"] = generate_csv.generate(tmp / "csv", args.ratings, seed=args.seed)
+        else:
+            results["seed"] = seed_csv(Path(args.csv_dir), tmp / "csv", args.ratings)
+        db_path = tmp / "bench.db"
+        results["import"] = run_import(tmp / "csv", db_path, args.import_workers)
+        print(f"Import: {results['import']['seconds']}s ({results['import']['rows_per_second']} wierszy/s)")
+        add_bench_user(db_path)
+
+        server = start_server(db_path, args.port, server_env)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            asyncio.run(wait_until_ready(base_url, timeout=120.0))
+            ctx = Context(db_path)
+            print(f"\n{args.clients} klientów, {args.duration:.0f}s na endpoint")
+            print(f"{'endpoint':<34} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'błędy':>6}")
+            results["endpoints"], results["meta"]["models_ready"] = asyncio.run(
+                run_endpoints(base_url, ctx, scenarios, args.clients, args.duration, args.warmup_timeout))
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.baseline:
+        problems = find_regressions(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")),
+                                    args.max_regression)
+        if problems:
+            print(f"\nREGRESJA (próg {args.max_regression:.0%}):")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print(f"\nBez regresji względem {args.baseline} (próg {args.max_regression:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Porównanie wstawiania ocen: commit na każde żądanie vs zapis paczkami (WRITE_BEHIND=1).
+
+Skrypt działa w procesie, bez serwera HTTP: N wątków (jak pula wątków FastAPI) wstawia oceny
+do kopii bazy - raz każdy osobnym commit + refresh, raz przez GroupCommitWriter.
+
+Użycie (z katalogu głównego repozytorium):
+    python benchmarks/bench_write_behind.py --threads 32 --inserts 2000
+"""
+import argparse
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import aggregates  # noqa: E402
+from app.db import apply_sqlite_profile  # noqa: E402
+from app.models import Base, Rating  # noqa: E402
+from app.write_queue import GroupCommitWriter  # noqa: E402
+
+
+def per_request_insert(Sessions, values: dict) -> None:
+    with Sessions() as db:
+        rating = Rating(**values)
+        db.add(rating)
+        aggregates.add_rating(db, rating.movieId, rating.rating)
+        db.commit()
+        db.refresh(rating)
+
+
+def run(insert, movie_ids: list[int], threads: int, inserts: int) -> float:
+    per_thread = inserts // threads
+
+    def worker():
+        for i in range(per_thread):
+            insert({"userId": 1, "movieId": random.choice(movie_ids), "rating": random.choice((1.0, 3.5, 5.0)),
+                    "timestamp": i})
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=str(ROOT / "app" / "database.db"), help="baza źródłowa (kopiowana)")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copy(args.db, db_path)
+        conn = sqlite3.connect(db_path)
+        movie_ids = [row[0] for row in conn.execute("SELECT movieId FROM movies")]
+        conn.close()
+
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False},
+                               pool_size=args.threads, max_overflow=-1)
+        event.listen(engine, "connect", apply_sqlite_profile)
+        Sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Kopia może pochodzić sprzed tabeli statystyk - tworzymy ją tak jak aplikacja przy starcie
+        Base.metadata.create_all(bind=engine)
+        with Sessions() as db:
+            aggregates.backfill_rating_stats(db)
+
+        results["commit/żądanie"] = run(lambda v: per_request_insert(Sessions, v), movie_ids,
+                                        args.threads, args.inserts)
+
+        writer = GroupCommitWriter(Sessions, window_ms=args.window_ms)
+        results["write-behind"] = run(lambda v: writer.submit("rating", v).result(), movie_ids,
+                                      args.threads, args.inserts)
+        writer.stop()
+        engine.dispose()
+
+    print(f"\n{args.threads} wątków, {args.inserts} wstawień, okno {args.window_ms:.0f} ms")
+    for mode, rate in results.items():
+        print(f"{mode:<16} {rate:>10.0f} wstawień/s")
+    print(f"paczki: {writer.batches}, średnio {writer.rows / max(writer.batches, 1):.1f} wierszy/paczkę")
+    return results
+
+
+if __name__ == "__main__":
+    main()
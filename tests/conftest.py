@@ -1,3 +1,11 @@
+import os
+# Metryki są domyślnie wyłączone - testy sprawdzają też middleware i GET /metrics
+os.environ.setdefault("METRICS_ENABLED", "1")
+# Cache odpowiedzi też jest domyślnie wyłączony - testy sprawdzają jego działanie
+os.environ.setdefault("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+# Indeks podobnych filmów tylko w pamięci - testy nie zapisują go do katalogu aplikacji
+os.environ.setdefault("SIMILARITY_PATH", "")
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.pool import StaticPool  # NOWE: Importujemy StaticPool
@@ -7,7 +15,11 @@ from app.main import app
 
 # POPRAWKA: Importujemy WSZYSTKIE modele, aby SQLAlchemy wiedziało, że ma je utworzyć w bazie
 from app.models import Base, User, Movie, Link, Rating, Tag
-from app.security import get_current_user, get_current_admin_user
+from app.security import get_current_user, get_current_admin_user, auth_cache
+from app.ranking import top_movies
+from app.response_cache import response_cache, table_versions
+from app.similarity import similar_movies
+from app.recommendations import recommender
 from fastapi.testclient import TestClient
 
 # Używamy bazy w pamięci RAM (szybka i znika po testach)
@@ -53,6 +65,16 @@ def client(session):
     app.dependency_overrides[get_current_user] = override_get_current_user
     app.dependency_overrides[get_current_admin_user] = override_get_current_user
 
+    # Stan w pamięci (ranking) nie może przechodzić między testami z różnymi bazami
+    top_movies.wait()
+    top_movies.reset()
+    auth_cache.clear()
+    response_cache.clear()
+    table_versions.reset()
+    similar_movies.wait()
+    similar_movies.reset()
+    recommender.reset()
+
     yield TestClient(app)
     
     # Sprzątanie nadpisań po teście
@@ -0,0 +1,117 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.crud_async import router, replace_routes
+from app.db import get_async_db, get_db
+from app.models import Base, User
+from app.security import auth_cache, create_access_token, get_current_user_async, hash_password
+from app.ranking import top_movies
+from app.response_cache import response_cache, table_versions
+
+
+@pytest.fixture()
+def async_client(tmp_path):
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with SessionLocal() as db:
+            yield db
+
+    test_app = FastAPI()
+    test_app.include_router(router)
+    test_app.dependency_overrides[get_async_db] = override_get_async_db
+    test_app.dependency_overrides[get_current_user_async] = lambda: User(id=1, username="testadmin", role="ROLE_ADMIN", is_active=True)
+    top_movies.reset()
+    response_cache.clear()
+    table_versions.reset()
+
+    with TestClient(test_app) as client:
+        yield client
+
+
+def test_async_movie_crud(async_client):
+    movie = async_client.post("/movies", json={"title": "Async Movie", "genres": "Drama|Comedy"}).json()
+    movie_id = movie["movieId"]
+
+    assert async_client.get(f"/movies/{movie_id}").json()["title"] == "Async Movie"
+    assert [m["movieId"] for m in async_client.get("/movies", params={"genre": "Comedy"}).json()] == [movie_id]
+
+    assert async_client.put(f"/movies/{movie_id}", json={"title": "Renamed"}).json()["title"] == "Renamed"
+    assert async_client.delete(f"/movies/{movie_id}").status_code == 204
+    assert async_client.get(f"/movies/{movie_id}").status_code == 404
+
+
+def test_async_ratings_pagination_and_links(async_client):
+    movie_ids = [async_client.post("/movies", json={"title": f"M{i}", "genres": "G"}).json()["movieId"] for i in range(3)]
+    movie_id = movie_ids[0]
+    ids = [async_client.post("/ratings", json={"movieId": m, "rating": 4.0}).json()["id"] for m in movie_ids]
+
+    first = async_client.get("/ratings", params={"limit": 2})
+    assert [r["id"] for r in first.json()] == ids[:2]
+    rest = async_client.get("/ratings", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [r["id"] for r in rest.json()] == ids[2:]
+    assert async_client.get("/ratings", params={"limit": 0}).status_code == 422
+
+    assert async_client.put(f"/ratings/{ids[0]}", json={"rating": 2.0}).json()["rating"] == 2.0
+    assert async_client.delete(f"/ratings/{ids[1]}").status_code == 204
+
+    assert async_client.post("/links", json={"movieId": movie_id, "imdbId": "tt1"}).status_code == 201
+    assert async_client.post("/links", json={"movieId": movie_id, "imdbId": "tt1"}).status_code == 409
+    assert async_client.post("/links", json={"movieId": 999, "imdbId": "tt1"}).status_code == 404
+
+
+def test_async_my_rating_upsert_and_duplicate_post(async_client):
+    movie_id = async_client.post("/movies", json={"title": "M", "genres": "G"}).json()["movieId"]
+    assert async_client.put(f"/movies/{movie_id}/my-rating", json={"rating": 4.0}).status_code == 201
+    updated = async_client.put(f"/movies/{movie_id}/my-rating", json={"rating": 2.5})
+    assert updated.status_code == 200 and updated.json()["rating"] == 2.5
+    assert async_client.post("/ratings", json={"movieId": movie_id, "rating": 5.0}).status_code == 409
+
+
+def test_replace_routes_keeps_route_order():
+    app = FastAPI()
+
+    @app.get("/movies/top")
+    def top():
+        return "sync-top"
+
+    @app.get("/movies/{movie_id}")
+    def movie(movie_id: int):
+        return "sync"
+
+    replace_routes(app, router)
+    paths = [route.path for route in app.router.routes if route.path.startswith("/movies")]
+    assert paths.index("/movies/top") < paths.index("/movies/{movie_id}")
+    assert [r for r in app.router.routes if r.path == "/movies/{movie_id}" and "GET" in r.methods][0].endpoint is not movie
+
+
+def test_async_routes_authenticate_with_async_session(async_client, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'async.db'}")
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), {"username": "alice", "password_hash": hash_password("secret123", rounds=4),
+                                               "role": "user", "is_active": True})
+    engine.dispose()
+
+    app = async_client.app
+    del app.dependency_overrides[get_current_user_async]
+
+    def no_sync_session():
+        raise AssertionError("trasy async nie mogą używać synchronicznej sesji")
+
+    app.dependency_overrides[get_db] = no_sync_session
+    auth_cache.clear()
+    token = create_access_token(subject="alice", role="user")
+    response = async_client.get("/movies", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert auth_cache.stats()["size"] == 1
+    assert async_client.get("/movies", headers={"Authorization": "Bearer zly-token"}).status_code == 401
+    auth_cache.clear()
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from app.models import User
+from app.security import auth_cache, create_access_token, get_current_user, hash_password, invalidate_user
+
+
+@pytest.fixture()
+def user(session):
+    auth_cache.clear()
+    user = User(username="alice", password_hash=hash_password("secret123"), role="user", is_active=True)
+    session.add(user)
+    session.commit()
+    yield user
+    auth_cache.clear()
+
+
+def test_current_user_is_cached(session, user):
+    token = create_access_token(subject="alice", role="user")
+
+    first = get_current_user(token, session)
+    second = get_current_user(token, session)
+
+    assert first.id == user.id and first.role == "user"
+    assert second is first
+    assert auth_cache.stats()["hits"] == 1
+    assert auth_cache.stats()["misses"] == 1
+
+
+def test_invalidate_user_after_deactivation(session, user):
+    token = create_access_token(subject="alice", role="user")
+    get_current_user(token, session)
+
+    user.is_active = False
+    session.commit()
+    assert invalidate_user("alice") == 1
+
+    with pytest.raises(HTTPException) as exc:
+        get_current_user(token, session)
+    assert exc.value.status_code == 401
+
+
+def test_admin_role_change_invalidates_cache(client, session, user):
+    token = create_access_token(subject="alice", role="user")
+    get_current_user(token, session)
+
+    response = client.put(f"/auth/users/{user.id}", json={"role": "ROLE_ADMIN"})
+    assert response.status_code == 200
+    assert get_current_user(token, session).role == "ROLE_ADMIN"
+    assert client.get("/auth/cache-stats").json()["size"] == 1
+
+
+def test_login_rehashes_password_when_cost_changes(client, session, monkeypatch):
+    from app import security
+    user = User(username="bob", password_hash=hash_password("secret123", rounds=4), role="user", is_active=True)
+    session.add(user)
+    session.commit()
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", 5)
+
+    response = client.post("/auth/login", data={"username": "bob", "password": "secret123"})
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+    stored = session.query(User).filter(User.username == "bob").one()
+    assert stored.password_hash.startswith("$2b$05$")
+
+    assert client.post("/auth/login", data={"username": "bob", "password": "wrong-pass"}).status_code == 401
+
+
+def test_login_fails_fast_when_hashing_queue_is_full(client, monkeypatch):
+    from app.security import password_pool
+    monkeypatch.setattr(password_pool, "max_pending", 0)
+
+    response = client.post("/auth/login", data={"username": "nobody", "password": "secret123"})
+    # Użytkownik nie istnieje - bcrypt nie jest wołany, więc limit kolejki nie ma znaczenia
+    assert response.status_code == 401
+
+    response = client.post("/auth/users", json={"username": "carol", "password": "secret123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_async_auth_endpoints_query_outside_event_loop(client, session):
+    # Zapytania login i POST /users idą do puli wątków - żadne nie może wykonać się na pętli zdarzeń
+    on_loop = []
+
+    def record(conn, cursor, statement, *args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(statement)
+        except RuntimeError:
+            pass
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert client.post("/auth/users", json={"username": "dave", "password": "secret123"}).status_code == 201
+        assert client.post("/auth/users", json={"username": "dave", "password": "secret123"}).status_code == 409
+        assert client.post("/auth/login", data={"username": "dave", "password": "secret123"}).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert on_loop == []
@@ -0,0 +1,85 @@
+from app import aggregates
+from app.models import Rating
+
+
+def create_movie(client, title="Batch Movie"):
+    return client.post("/movies", json={"title": title, "genres": "Drama"}).json()["movieId"]
+
+
+def test_create_ratings_batch_with_partial_failure(client):
+    m1, m2 = create_movie(client), create_movie(client, "Other")
+    items = [
+        {"movieId": m1, "rating": 4.0},
+        {"movieId": 9999, "rating": 3.0},
+        {"movieId": m2, "rating": 2.0},
+        {"movieId": m1, "rating": 5.0},
+    ]
+    response = client.post("/ratings/batch", json=items)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["succeeded"], data["failed"]) == (2, 2)
+    assert [r["status"] for r in data["results"]] == ["created", "error", "created", "error"]
+    assert data["results"][1]["error"] == "Film o podanym ID nie istnieje"
+    # Druga ocena tego samego filmu w paczce narusza unikalność (userId, movieId)
+    assert data["results"][3]["error"] == aggregates.DUPLICATE_RATING
+
+    created = data["results"][0]
+    assert client.get(f"/ratings/{created['id']}").json()["rating"] == 4.0
+    stats = client.get(f"/movies/{m1}/stats").json()
+    assert stats["count"] == 1 and stats["mean"] == 4.0
+
+    # Film oceniony wcześniej też jest odrzucany, reszta paczki przechodzi
+    again = client.post("/ratings/batch", json=[{"movieId": m2, "rating": 1.0}, {"movieId": create_movie(client, "New"), "rating": 1.0}])
+    assert [r["status"] for r in again.json()["results"]] == ["error", "created"]
+
+
+def test_delete_ratings_batch_updates_stats(client, session):
+    movie_id = create_movie(client)
+    # Trzech użytkowników ocenia ten sam film (jedna ocena na użytkownika)
+    ratings = [Rating(userId=user_id, movieId=movie_id, rating=v) for user_id, v in ((1, 1.0), (2, 3.0), (3, 5.0))]
+    session.add_all(ratings)
+    session.flush()
+    aggregates.rebuild_rating_stats(session)
+    session.commit()
+    ids = [r.id for r in ratings]
+
+    response = client.request("DELETE", "/ratings/batch", json=[ids[0], ids[2], 12345, ids[0]])
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["deleted", "deleted", "error", "error"]
+    assert client.get(f"/ratings/{ids[0]}").status_code == 404
+
+    stats = client.get(f"/movies/{movie_id}/stats").json()
+    assert stats["count"] == 1 and stats["min"] == stats["max"] == 3.0
+
+
+def test_create_tags_batch(client):
+    movie_id = create_movie(client)
+    response = client.post("/tags/batch", json=[{"movieId": movie_id, "tag": f"t{i}"} for i in range(50)])
+    assert response.json()["succeeded"] == 50
+    ids = [r["id"] for r in response.json()["results"]]
+    assert len(set(ids)) == 50
+    assert client.get(f"/tags/{ids[-1]}").json()["tag"] == "t49"
+
+
+def test_upsert_links_batch(client):
+    m1, m2 = create_movie(client), create_movie(client, "Other")
+    client.post("/links", json={"movieId": m1, "imdbId": "old"})
+
+    response = client.put("/links/batch", json=[
+        {"movieId": m1, "imdbId": "new"},
+        {"movieId": m2, "imdbId": "tt2", "tmdbId": "2"},
+        {"movieId": 9999, "imdbId": "x"},
+        {"movieId": m2, "imdbId": "dup"},
+    ])
+    assert [r["status"] for r in response.json()["results"]] == ["updated", "created", "error", "error"]
+    assert client.get(f"/links/{m1}").json()["imdbId"] == "new"
+    assert client.get(f"/links/{m2}").json() == {"movieId": m2, "imdbId": "tt2", "tmdbId": "2"}
+
+
+def test_batch_size_limit(client):
+    from app.batch_router import BATCH_MAX_ITEMS
+    # Limit w schemacie ciała: jeden błąd too_long, bez walidacji (ani błędów) poszczególnych elementów
+    response = client.post("/tags/batch", json=[{"tag": "bez movieId"}] * (BATCH_MAX_ITEMS + 1))
+    assert response.status_code == 422
+    assert [error["type"] for error in response.json()["detail"]] == ["too_long"]
+    assert client.request("DELETE", "/ratings/batch", json=list(range(BATCH_MAX_ITEMS + 1))).status_code == 422
@@ -0,0 +1,67 @@
+import pytest
+from app.catalog import catalog, SnapshotTable, MovieRow
+from app.models import Movie
+from app.pagination import encode_cursor
+
+
+@pytest.fixture()
+def snapshot(client, session, monkeypatch):
+    monkeypatch.setattr(catalog, "enabled", True)
+    catalog.reload(session)
+    yield catalog
+    catalog.movies, catalog.links = SnapshotTable([]), SnapshotTable([])
+
+
+def test_reads_are_served_from_snapshot(client, session, snapshot):
+    movie_id = client.post("/movies", json={"title": "Snapshot", "genres": "Drama"}).json()["movieId"]
+    assert snapshot.movies.get(movie_id).title == "Snapshot"
+
+    # Wiersz dopisany z pominięciem API nie jest widoczny - odczyt nie idzie do bazy
+    session.add(Movie(movieId=500, title="Hidden", genres="Drama"))
+    session.commit()
+    assert client.get("/movies/500").status_code == 404
+    assert client.get(f"/movies/{movie_id}").json()["title"] == "Snapshot"
+
+
+def test_writes_patch_snapshot(client, snapshot):
+    movie_id = client.post("/movies", json={"title": "Before", "genres": "Drama"}).json()["movieId"]
+    client.put(f"/movies/{movie_id}", json={"title": "After"})
+    assert client.get(f"/movies/{movie_id}").json()["title"] == "After"
+
+    client.post("/links", json={"movieId": movie_id, "imdbId": "tt1"})
+    client.put("/links/batch", json=[{"movieId": movie_id, "tmdbId": "9"}])
+    assert client.get(f"/links/{movie_id}").json() == {"movieId": movie_id, "imdbId": "tt1", "tmdbId": "9"}
+
+    client.delete(f"/links/{movie_id}")
+    client.delete(f"/movies/{movie_id}")
+    assert client.get(f"/links/{movie_id}").status_code == 404
+    assert client.get(f"/movies/{movie_id}").status_code == 404
+    assert snapshot.stats() == {"enabled": True, "movies": 0, "links": 0}
+
+
+def test_snapshot_pages_match_keyset_pages(client, snapshot):
+    for i in range(5):
+        client.post("/movies", json={"title": f"M{i}", "genres": "Drama"})
+    first = client.get("/movies", params={"limit": 2})
+    rest = client.get("/movies", params={"limit": 10, "cursor": first.headers["X-Next-Cursor"]})
+    assert [m["title"] for m in first.json()] == ["M0", "M1"]
+    assert [m["title"] for m in rest.json()] == ["M2", "M3", "M4"]
+    assert "X-Next-Cursor" not in rest.headers
+    assert [m["title"] for m in client.get("/movies", params={"skip": 4}).json()] == ["M4"]
+
+
+def test_snapshot_pages_validate_cursor_and_limit(client, snapshot):
+    client.post("/movies", json={"title": "M", "genres": "Drama"})
+    for path in ("/movies", "/links"):
+        assert client.get(path, params={"cursor": encode_cursor("abc")}).status_code == 400
+        assert client.get(path, params={"cursor": encode_cursor([1, 2])}).status_code == 400
+        assert client.get(path, params={"limit": 0}).status_code == 422
+        assert client.get(path, params={"skip": -1}).status_code == 422
+
+
+def test_patched_table_is_a_new_sorted_copy():
+    table = SnapshotTable([MovieRow(3, "c", ""), MovieRow(1, "a", "")])
+    patched = table.patched({2: MovieRow(2, "b", ""), 3: None})
+    assert list(table.keys) == [1, 3]
+    assert list(patched.keys) == [1, 2]
+    assert patched.get(2).title == "b"
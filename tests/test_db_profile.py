@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, event
+from app import db as app_db
+
+
+def test_sqlite_profile_applied_on_connect(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    event.listen(engine, "connect", app_db.apply_sqlite_profile)
+
+    with engine.connect() as conn:
+        active = app_db.read_sqlite_settings(conn)
+
+    assert active["journal_mode"] == "wal"
+    assert active["synchronous"] == 1  # NORMAL
+    assert active["temp_store"] == 2  # MEMORY
+    assert active["busy_timeout"] == app_db.SQLITE_PROFILE["busy_timeout"]
+    assert active["cache_size"] == app_db.SQLITE_PROFILE["cache_size"]
+    engine.dispose()
+
+
+def test_db_diagnostics_endpoint(client):
+    response = client.get("/diagnostics/db")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["configured"]["journal_mode"] == app_db.SQLITE_PROFILE["journal_mode"]
+    assert set(data["active"]) == set(app_db.SQLITE_PROFILE)
+    assert "pool" in data and "maintenance" in data
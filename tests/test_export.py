@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from app.models import Rating
+
+
+def seed(client, session):
+    movie_id = client.post("/movies", json={"title": "Heat (1995)", "genres": "Crime"}).json()["movieId"]
+    other_id = client.post("/movies", json={"title": "Alien (1979)", "genres": "Horror"}).json()["movieId"]
+    client.post("/ratings/batch", json=[
+        {"movieId": movie_id, "rating": 4.0, "timestamp": 100},
+        {"movieId": other_id, "rating": 5.0, "timestamp": 300},
+    ])
+    # Druga ocena filmu pochodzi od innego użytkownika (jedna ocena na parę userId, movieId)
+    session.add(Rating(userId=2, movieId=movie_id, rating=3.0, timestamp=200))
+    session.commit()
+    return movie_id, other_id
+
+
+def test_export_ratings_ndjson_with_filters(client, session):
+    movie_id, _ = seed(client, session)
+    response = client.get("/export/ratings", params={"movieId": movie_id, "ts_from": 150})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"id": 3, "userId": 2, "movieId": movie_id, "rating": 3.0, "timestamp": 200}]
+
+
+def test_export_movies_csv_streams_all_rows(client, session, monkeypatch):
+    from app import export_router
+    monkeypatch.setattr(export_router, "EXPORT_CHUNK_ROWS", 1)
+    seed(client, session)
+    response = client.get("/export/movies", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["movieId", "title", "genres"]
+    assert [r[1] for r in rows[1:]] == ["Heat (1995)", "Alien (1979)"]
+
+
+def test_export_rejects_unknown_table_and_filter(client):
+    assert client.get("/export/users").status_code == 404
+    assert client.get("/export/movies", params={"userId": 1}).status_code == 400
+
+
+
+def test_export_stream_does_not_depend_on_request_session(tmp_path):
+    import asyncio
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import NullPool
+    from app import export_router
+    from app.models import Base, Movie
+
+    # NullPool: zamknięcie sesji naprawdę zamyka jej połączenie z bazą
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}", poolclass=NullPool)
+    Base.metadata.create_all(bind=engine)
+    db = Session(engine)
+    db.add_all([Movie(movieId=1, title="Heat (1995)", genres="Crime"), Movie(movieId=2, title="Alien (1979)", genres="Horror")])
+    db.commit()
+
+    response = export_router.export_table("movies", format="ndjson", db=db, current_user=None)
+    # Starsze wersje FastAPI zamykały sesję z get_db przed wysłaniem ciała odpowiedzi
+    db.close()
+
+    async def read_body():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    rows = [json.loads(line) for line in asyncio.run(read_body()).splitlines()]
+    assert [row["title"] for row in rows] == ["Heat (1995)", "Alien (1979)"]
+    engine.dispose()
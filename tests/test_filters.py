@@ -0,0 +1,122 @@
+import itertools
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import sqlite
+from app.filters import RangeFilters, apply_filters
+from app.models import Base, Rating, Tag
+from app.pagination import encode_cursor, keyset_statement
+
+
+def seed(session):
+    # Trzech użytkowników ocenia i taguje trzy filmy; jedna ocena i jeden tag bez timestamp
+    for user_id, movie_id in itertools.product((1, 2, 3), (10, 20, 30)):
+        timestamp = None if (user_id, movie_id) == (3, 30) else user_id * 100 + movie_id
+        session.add(Rating(userId=user_id, movieId=movie_id, rating=(user_id + movie_id // 10) / 2, timestamp=timestamp))
+        session.add(Tag(userId=user_id, movieId=movie_id, tag=f"t{user_id}-{movie_id}", timestamp=timestamp))
+    session.commit()
+
+
+def pages(client, path, params):
+    rows, params = [], dict(params, limit=2)
+    while True:
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        rows += response.json()
+        if "X-Next-Cursor" not in response.headers:
+            return rows
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+def test_rating_filters_and_time_ordered_pages(client, session):
+    seed(session)
+    by_movie = pages(client, "/ratings", {"movieId": 20})
+    assert [(r["userId"], r["movieId"]) for r in by_movie] == [(1, 20), (2, 20), (3, 20)]
+
+    # Sam zakres czasu jest zwracany wg czasu
+    window = pages(client, "/ratings", {"since": 200, "until": 320})
+    assert [r["timestamp"] for r in window] == [210, 220, 230, 310]
+
+    ranged = pages(client, "/ratings", {"userId": 2, "min_rating": 2.0, "max_rating": 2.5})
+    assert [(r["movieId"], r["rating"]) for r in ranged] == [(20, 2.0), (30, 2.5)]
+
+    # Sortowanie po czasie malejąco przez kilka stron kursora; ocena bez timestamp jest pomijana
+    newest = pages(client, "/ratings", {"sort": "-timestamp"})
+    assert [r["timestamp"] for r in newest] == [320, 310, 230, 220, 210, 130, 120, 110]
+    oldest = pages(client, "/ratings", {"userId": 1, "sort": "timestamp"})
+    assert [r["timestamp"] for r in oldest] == [110, 120, 130]
+
+
+def test_tag_filters(client, session):
+    seed(session)
+    tags = pages(client, "/tags", {"movieId": 10, "sort": "-timestamp"})
+    assert [t["tag"] for t in tags] == ["t3-10", "t2-10", "t1-10"]
+    assert [t["tag"] for t in pages(client, "/tags", {"userId": 3, "until": 321})] == ["t3-10", "t3-20"]
+
+
+def test_invalid_filters(client):
+    # Sam zakres oceny nie ma indeksu - wymaga zawężenia filmem, użytkownikiem albo czasem
+    assert client.get("/ratings", params={"min_rating": 4.0}).status_code == 400
+    assert client.get("/ratings", params={"since": 100, "sort": "id"}).status_code == 400
+    assert client.get("/tags", params={"userId": 1, "until": 500, "sort": "-id"}).status_code == 400
+    assert client.get("/ratings", params={"sort": "rating"}).status_code == 422
+    # Kursor po id nie pasuje do sortowania po (timestamp, id)
+    cursor = encode_cursor(5)
+    assert client.get("/ratings", params={"sort": "timestamp", "cursor": cursor}).status_code == 400
+    assert client.get("/tags", params={"cursor": encode_cursor([1, 2])}).status_code == 400
+    # Para o dobrej długości, ale nie z liczb
+    for after in ([1, None], [1, "x"], [1, {"x": 1}]):
+        assert client.get("/ratings", params={"sort": "timestamp", "cursor": encode_cursor(after)}).status_code == 400
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def filter_combinations(with_rating):
+    options = {
+        "movie_id": (None, 1),
+        "user_id": (None, 2),
+        "since": (None, 100),
+        "until": (None, 900),
+        "min_rating": (None, 2.0) if with_rating else (None,),
+        "max_rating": (None, 4.5) if with_rating else (None,),
+        "sort": ("id", "-id", "timestamp", "-timestamp"),
+    }
+    for values in itertools.product(*options.values()):
+        filters = RangeFilters(**dict(zip(options, values)))
+        keyed = filters.movie_id is not None or filters.user_id is not None
+        timed = filters.since is not None or filters.until is not None
+        if not keyed and not timed:
+            if filters.min_rating is not None or filters.max_rating is not None:
+                continue  # endpoint odpowiada 400
+            if not filters.by_time:
+                continue  # bez filtrów: zwykłe przejście po kluczu głównym
+        if timed and not filters.by_time:
+            continue  # sort=id dla zakresu czasu: endpoint odpowiada 400
+        yield filters
+
+
+@pytest.mark.parametrize("model", [Rating, Tag])
+def test_no_filter_combination_scans_the_table(plan_engine, model):
+    checked = 0
+    for filters in filter_combinations(model is Rating):
+        query, key = apply_filters(select(model), model, filters)
+        cursor = encode_cursor([150, 7] if filters.by_time else 7)
+        for page_cursor in (None, cursor):
+            stmt = keyset_statement(query, key, page_cursor, 0, 50, filters.descending)
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            with plan_engine.connect() as conn:
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            # Przy filtrze wyszukanie po kluczu indeksu; pełne przejście (SCAN) tylko bez filtrów
+            keyed_or_timed = any(value is not None for value in (filters.movie_id, filters.user_id, filters.since, filters.until))
+            table_steps = [step for step in plan if model.__tablename__ in step]
+            if keyed_or_timed:
+                assert all(step.startswith("SEARCH") for step in table_steps), (filters, plan)
+            # Kolejność (id albo (timestamp, id)) pochodzi z indeksu, bez sortowania w pamięci
+            assert not any("TEMP B-TREE" in step for step in plan), (filters, plan)
+            checked += 1
+    assert checked > 50
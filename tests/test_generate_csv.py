@@ -0,0 +1,51 @@
+import csv
+from app import generate_csv, import_csv
+
+
+def read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_generated_files_match_import_format(tmp_path):
+    summary = generate_csv.generate(tmp_path, ratings=3000, users=40, movies=200, tags=150, seed=1)
+    assert (summary["movies"], summary["links"], summary["ratings"], summary["tags"]) == (200, 200, 3000, 150)
+
+    # Każdy plik przechodzi przez konwertery importera bez pominiętych wierszy
+    for table in ("movies", "links", "tags", "ratings"):
+        stats = {}
+        rows = list(import_csv.read_csv(tmp_path / import_csv.TABLES[table][0],
+                                         import_csv.row_converter(table, keep_user_ids=True), stats))
+        assert len(rows) == summary[table]
+        assert stats.get("skipped", 0) == 0
+
+    movie_ids = {int(row[0]) for row in read(tmp_path / "movies.csv")[1:]}
+    ratings = read(tmp_path / "ratings.csv")
+    assert ratings[0] == ["userId", "movieId", "rating", "timestamp"]
+    pairs = [(int(u), int(m)) for u, m, _, _ in ratings[1:]]
+    assert len(set(pairs)) == len(pairs)  # jedna ocena użytkownika na film
+    assert pairs == sorted(pairs)
+    assert {m for _, m in pairs} <= movie_ids
+    assert {float(r) for _, _, r, _ in ratings[1:]} <= {x / 2 for x in range(1, 11)}
+    counts = {}
+    for user_id, _ in pairs:
+        counts[user_id] = counts.get(user_id, 0) + 1
+    assert min(counts.values()) >= generate_csv.MIN_USER_RATINGS
+
+
+def test_same_seed_gives_identical_files(tmp_path):
+    generate_csv.generate(tmp_path / "a", ratings=2000, seed=7)
+    generate_csv.generate(tmp_path / "b", ratings=2000, seed=7)
+    generate_csv.generate(tmp_path / "c", ratings=2000, seed=8)
+    for name in ("movies.csv", "links.csv", "ratings.csv", "tags.csv"):
+        assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+    assert (tmp_path / "a" / "ratings.csv").read_bytes() != (tmp_path / "c" / "ratings.csv").read_bytes()
+
+
+def test_user_counts_are_skewed_and_exact():
+    import numpy as np
+    counts = generate_csv.user_rating_counts(150_000, 1000, 5000, np.random.default_rng(0))
+    assert counts.sum() == 150_000
+    assert counts.min() >= generate_csv.MIN_USER_RATINGS
+    # Długi ogon: średnia wyraźnie powyżej mediany
+    assert counts.mean() > 1.3 * np.median(counts)
@@ -0,0 +1,257 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine
+from app import import_csv
+from app.models import Base
+
+
+@pytest.fixture()
+def csv_dir(tmp_path):
+    folder = tmp_path / "csv"
+    folder.mkdir()
+    (folder / "movies.csv").write_text(
+        "movieId,title,genres\n"
+        "1,Toy Story (1995),Adventure|Animation|Children|Comedy|Fantasy\n"
+        "2,Jumanji (1995),Adventure|Children|Fantasy\n"
+        '3,"American President, The (1995)",Comedy|Drama|Romance\n',
+        encoding="utf-8",
+    )
+    (folder / "links.csv").write_text(
+        "movieId,imdbId,tmdbId\n1,0114709,862\n2,0113497,8844\n3,0112346,9087\n", encoding="utf-8"
+    )
+    (folder / "tags.csv").write_text(
+        "userId,movieId,tag,timestamp\n2,1,pixar,1445714994\n2,3,politics,1445714996\n", encoding="utf-8"
+    )
+    rows = "".join(f"{u},{m},{r},{964982703 + u}\n" for u in range(1, 31) for m, r in ((1, 4.0), (2, 3.5), (3, 5.0)))
+    (folder / "ratings.csv").write_text("userId,movieId,rating,timestamp\n" + rows, encoding="utf-8")
+    return folder
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    path = tmp_path / "import.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return path
+
+
+def count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_import_all_rows_in_batches(db_path, csv_dir):
+    # Paczka mniejsza niż plik - dane muszą przejść przez wiele transakcji bez utraty wierszy
+    import_csv.main(["--db", str(db_path), "--csv-dir", str(csv_dir), "--batch-size", "7"])
+
+    assert count(db_path, "movies") == 3
+    assert count(db_path, "links") == 3
+    assert count(db_path, "tags") == 2
+    assert count(db_path, "ratings") == 90
+    # Statystyki ocen przeliczone po imporcie
+    conn = sqlite3.connect(db_path)
+    assert conn.execute(
+        "SELECT rating_count, rating_sum, min_rating, max_rating FROM movie_rating_stats WHERE movieId = 2"
+    ).fetchone() == (30, 105.0, 3.5, 3.5)
+    # Indeks gatunków zbudowany z kolumny genres
+    assert conn.execute("SELECT COUNT(*) FROM movie_genres WHERE genre = 'Comedy'").fetchone()[0] == 2
+    # Indeks wyszukiwarki odbudowany po imporcie, a wyłączone na jego czas triggery - przywrócone
+    assert conn.execute("SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'pixar'").fetchall() == [(1,)]
+    triggers = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert triggers == set(import_csv.SEARCH_TRIGGERS)
+    conn.close()
+
+
+def test_batched_splits_iterator():
+    batches = list(import_csv.batched(iter(range(10)), 4))
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_import_parallel_pipeline(db_path, csv_dir):
+    # Małe fragmenty wymuszają wiele zadań dla procesów roboczych
+    import_csv.main(["--db", str(db_path), "--csv-dir", str(csv_dir), "--workers", "2", "--chunk-size", "64"])
+
+    assert count(db_path, "movies") == 3
+    assert count(db_path, "links") == 3
+    assert count(db_path, "tags") == 2
+    assert count(db_path, "ratings") == 90
+
+
+def test_chunk_ranges_cover_file_on_line_boundaries(csv_dir):
+    path = csv_dir / "ratings.csv"
+    data = path.read_bytes()
+    ranges = list(import_csv.chunk_ranges(str(path), 50))
+
+    assert ranges[0][0] == data.index(b"\n") + 1
+    assert ranges[-1][1] == len(data)
+    for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end == next_start
+        assert data[end - 1:end] == b"\n"
+
+
+def test_incremental_import_only_processes_changed_chunks(db_path, csv_dir):
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--batch-size", "10", "--incremental"]
+    import_csv.main(args)
+    assert count(db_path, "ratings") == 90
+
+    conn = sqlite3.connect(db_path)
+    assert import_csv.import_incremental(conn, "ratings", 10, str(csv_dir)) == (0, 9)
+
+    # Zmiana jednej oceny w środku pliku + dopisanie nowych wierszy na końcu
+    path = csv_dir / "ratings.csv"
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    lines[15] = lines[15].replace(",3.5,", ",1.0,").replace(",4.0,", ",1.0,").replace(",5.0,", ",1.0,")
+    lines += ["99,1,2.5,1000\n", "99,2,2.0,1001\n"]
+    path.write_text("".join(lines), encoding="utf-8")
+
+    processed, unchanged = import_csv.import_incremental(conn, "ratings", 10, str(csv_dir))
+    assert (processed, unchanged) == (2, 8)
+    assert count(db_path, "ratings") == 92
+    assert conn.execute("SELECT rating FROM ratings WHERE id = 15").fetchone()[0] == 1.0
+    assert conn.execute("SELECT COUNT(*) FROM ratings WHERE userId = 99 AND timestamp IN (1000, 1001)").fetchone()[0] == 2
+    conn.close()
+
+
+def test_incremental_import_upserts_movies(db_path, csv_dir):
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--incremental"]
+    import_csv.main(args)
+
+    path = csv_dir / "movies.csv"
+    path.write_text(path.read_text(encoding="utf-8").replace("Jumanji (1995)", "Jumanji (1996)"), encoding="utf-8")
+    import_csv.main(args)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT title FROM movies WHERE movieId = 2").fetchone()[0] == "Jumanji (1996)"
+    conn.close()
+    assert count(db_path, "movies") == 3
+
+
+def test_incremental_import_refreshes_only_changed_movies(db_path, csv_dir):
+    # Fragmenty po jednej linii - zmieniony fragment dotyczy jednego filmu
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--batch-size", "1", "--incremental"]
+    import_csv.main(args)
+    conn = sqlite3.connect(db_path)
+    # Znacznik: przeliczenie statystyk filmu 3 nadpisałoby tę wartość
+    conn.execute("UPDATE movie_rating_stats SET rating_count = 999 WHERE movieId = 3")
+    conn.commit()
+
+    # Nic się nie zmieniło - bez przeliczania statystyk i indeksów
+    import_csv.main(args)
+    assert conn.execute("SELECT rating_count FROM movie_rating_stats WHERE movieId = 3").fetchone()[0] == 999
+
+    # Zmiana oceny filmu 2 i nowy tag filmu 2 - przeliczany jest tylko film 2
+    path = csv_dir / "ratings.csv"
+    path.write_text(path.read_text(encoding="utf-8").replace("1,2,3.5,", "1,2,1.0,", 1), encoding="utf-8")
+    path = csv_dir / "tags.csv"
+    path.write_text(path.read_text(encoding="utf-8") + "5,2,jungle,1445714999\n", encoding="utf-8")
+    import_csv.main(args)
+    assert conn.execute(
+        "SELECT rating_count, rating_sum FROM movie_rating_stats WHERE movieId = 2"
+    ).fetchone() == (30, 29 * 3.5 + 1.0)
+    assert conn.execute("SELECT rating_count FROM movie_rating_stats WHERE movieId = 3").fetchone()[0] == 999
+    assert conn.execute("SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'jungle'").fetchall() == [(2,)]
+    assert conn.execute("SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'pixar'").fetchall() == [(1,)]
+    conn.close()
+
+
+def test_incremental_import_swapped_rating_pairs_keep_all_rows(db_path, csv_dir):
+    (csv_dir / "ratings.csv").write_text(
+        "userId,movieId,rating,timestamp\n1,1,4.0,1\n2,1,3.0,2\n2,2,5.0,3\n1,2,2.0,4\n", encoding="utf-8"
+    )
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--batch-size", "1", "--incremental"]
+    import_csv.main(args)
+
+    # Linie 2 i 4 zamieniają się parami (userId, movieId) - wiersz z linii 4 jest na chwilę wypierany
+    path = csv_dir / "ratings.csv"
+    path.write_text(path.read_text(encoding="utf-8").replace("2,1,3.0,2", "1,2,3.0,2").replace("1,2,2.0,4", "2,1,2.0,4"),
+                    encoding="utf-8")
+    import_csv.main(args)
+    conn = sqlite3.connect(db_path)
+    expected = [(1, 1, 4.0), (1, 2, 3.0), (2, 1, 2.0), (2, 2, 5.0)]
+    assert conn.execute("SELECT userId, movieId, rating FROM ratings ORDER BY userId, movieId").fetchall() == expected
+    # Kolejne uruchomienie niczego nie zmienia i nie gubi wierszy
+    import_csv.main(args)
+    assert conn.execute("SELECT userId, movieId, rating FROM ratings ORDER BY userId, movieId").fetchall() == expected
+    conn.close()
+
+
+def test_incremental_import_reimports_chunk_displaced_by_earlier_chunk(db_path, csv_dir):
+    (csv_dir / "ratings.csv").write_text(
+        "userId,movieId,rating,timestamp\n1,1,4.0,1\n1,2,2.0,2\n", encoding="utf-8"
+    )
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--batch-size", "1", "--incremental"]
+    import_csv.main(args)
+
+    # Linia 1 przejmuje parę linii 2, a linia 2 - nową parę: obie zmiany w jednym uruchomieniu
+    path = csv_dir / "ratings.csv"
+    path.write_text("userId,movieId,rating,timestamp\n1,2,4.5,1\n1,3,2.0,2\n", encoding="utf-8")
+    import_csv.main(args)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT userId, movieId, rating FROM ratings ORDER BY movieId").fetchall() == [
+        (1, 2, 4.5), (1, 3, 2.0)
+    ]
+    conn.close()
+
+
+def test_incremental_import_keeps_search_triggers_for_api_writes(db_path, csv_dir, client, monkeypatch):
+    from sqlalchemy.orm import Session
+    from app.db import get_db
+    from app.main import app
+
+    args = ["--db", str(db_path), "--csv-dir", str(csv_dir), "--incremental"]
+    import_csv.main(args)
+
+    # API zapisuje do tej samej bazy w trakcie importu przyrostowego
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    def file_db():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = file_db
+    import_incremental = import_csv.import_incremental
+
+    def import_with_api_writes(conn, table, *args, **kwargs):
+        if table == "ratings":
+            movie_id = client.post("/movies", json={"title": "Heat (1995)", "genres": "Crime"}).json()["movieId"]
+            client.post("/tags", json={"movieId": 1, "tag": "heist", "timestamp": 1})
+            assert client.put(f"/movies/{movie_id}", json={"title": "Heat (1995) remastered"}).status_code == 200
+        return import_incremental(conn, table, *args, **kwargs)
+
+    monkeypatch.setattr(import_csv, "import_incremental", import_with_api_writes)
+    path = csv_dir / "ratings.csv"
+    path.write_text(path.read_text(encoding="utf-8") + "99,2,2.0,1001\n", encoding="utf-8")
+    import_csv.main(args)
+    engine.dispose()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT title FROM movies_fts WHERE movies_fts MATCH 'remastered'").fetchall() == [
+        ("Heat (1995) remastered",)
+    ]
+    assert conn.execute("SELECT rowid FROM movies_fts WHERE movies_fts MATCH 'heist'").fetchall() == [(1,)]
+    triggers = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert triggers == set(import_csv.SEARCH_TRIGGERS)
+    conn.close()
+
+
+def test_keep_user_ids(db_path, csv_dir):
+    import_csv.main(["--db", str(db_path), "--csv-dir", str(csv_dir), "--keep-user-ids"])
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(DISTINCT userId) FROM ratings").fetchone()[0] == 30
+    assert conn.execute("SELECT DISTINCT userId FROM tags").fetchall() == [(2,)]
+    conn.close()
+
+
+def test_single_user_keeps_first_rating_per_movie(db_path, csv_dir):
+    import_csv.main(["--db", str(db_path), "--csv-dir", str(csv_dir), "--single-user"])
+    conn = sqlite3.connect(db_path)
+    # Unikalny indeks (userId, movieId): z 30 ocen każdego filmu zostaje pierwsza z pliku
+    assert conn.execute("SELECT userId, movieId, timestamp FROM ratings ORDER BY movieId").fetchall() == [
+        (1, 1, 964982704), (1, 2, 964982704), (1, 3, 964982704)
+    ]
+    assert conn.execute("SELECT DISTINCT userId FROM tags").fetchall() == [(1,)]
+    conn.close()
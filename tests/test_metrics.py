@@ -0,0 +1,96 @@
+import logging
+import pytest
+from app import metrics
+from app.metrics import Histogram, Metric, registry, http_requests, db_queries_per_request, db_slow_queries
+from app.models import User
+from app.security import auth_cache, create_access_token, hash_password
+
+
+@pytest.fixture()
+def instrumented(client, session):
+    # Testowa baza w pamięci ma własny silnik - podpinamy do niego liczniki zapytań
+    engine = session.get_bind()
+    metrics.instrument_engine(engine)
+    registry.reset()
+    yield client
+    metrics.uninstrument_engine(engine)
+
+
+@pytest.fixture()
+def scrape_token(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    return {"Authorization": "Bearer scrape-secret"}
+
+
+def test_request_metrics_use_route_template(instrumented, scrape_token):
+    client = instrumented
+    movie_id = client.post("/movies", json={"title": "M", "genres": "G"}).json()["movieId"]
+    client.get(f"/movies/{movie_id}")
+    client.get("/movies/424242")
+
+    assert http_requests.value("GET", "/movies/{movie_id}", 200) == 1
+    assert http_requests.value("GET", "/movies/{movie_id}", 404) == 1
+    # Każdy odczyt z bazy to co najmniej jedno zapytanie SQL
+    assert db_queries_per_request.count("GET", "/movies/{movie_id}") == 2
+    assert db_queries_per_request.total("GET", "/movies/{movie_id}") >= 2
+
+    body = client.get("/metrics", headers=scrape_token)
+    assert body.headers["content-type"].startswith("text/plain")
+    text = body.text
+    assert 'http_requests_total{method="GET",route="/movies/{movie_id}",status="404"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/movies",le="+Inf"} 1' in text
+    assert 'db_queries_per_request_count{method="POST",route="/movies"} 1' in text
+    assert "# TYPE http_requests_in_flight gauge" in text
+    assert "response_cache_entries" in text
+    # Trafienia i chybienia cache tylko rosną - to liczniki
+    assert "# TYPE response_cache_hits_total counter" in text
+    assert "# TYPE response_cache_misses_total counter" in text
+
+
+def test_metrics_require_scrape_token_or_admin(instrumented, session, scrape_token):
+    client = instrumented
+    auth_cache.clear()
+    session.add_all([User(username="root", password_hash=hash_password("secret123", rounds=4), role="ROLE_ADMIN"),
+                     User(username="alice", password_hash=hash_password("secret123", rounds=4), role="user")])
+    session.commit()
+
+    def bearer(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=bearer("zly-token")).status_code == 401
+    assert client.get("/metrics", headers=bearer(create_access_token("alice", "user"))).status_code == 403
+    assert client.get("/metrics", headers=bearer(create_access_token("root", "ROLE_ADMIN"))).status_code == 200
+    assert client.get("/metrics", headers=scrape_token).status_code == 200
+    auth_cache.clear()
+
+
+def test_metric_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("m", "test")
+
+
+def test_unmatched_paths_share_one_label(instrumented):
+    instrumented.get("/no/such/path")
+    instrumented.get("/another/missing")
+    assert http_requests.value("GET", "unmatched", 404) == 2
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "test", ("route",), buckets=(1, 5))
+    for value in (0.5, 3, 3, 10):
+        histogram.observe(value, "/x")
+    lines = histogram.samples()
+    assert 'h_bucket{route="/x",le="1"} 1' in lines
+    assert 'h_bucket{route="/x",le="5"} 3' in lines
+    assert 'h_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'h_sum{route="/x"} 16.5' in lines
+    assert 'h_count{route="/x"} 4' in lines
+
+
+def test_slow_query_logged_with_plan(instrumented, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        instrumented.get("/movies/1")
+    assert db_slow_queries.value() >= 1
+    assert any("Plan:" in record.getMessage() and "movies" in record.getMessage() for record in caplog.records)
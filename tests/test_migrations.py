@@ -0,0 +1,86 @@
+import sqlite3
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import migrations
+from app.models import Base, MovieRatingStats, Rating, Tag, MOVIE_TAGS_SQL
+
+# Tabele w starym kształcie: jednokolumnowe indeksy, bez unikalności (userId, movieId),
+# a ix_ratings_user_time we wcześniejszej definicji (bez id po timestamp)
+LEGACY_SCHEMA = """
+CREATE INDEX "ix_ratings_userId" ON ratings ("userId");
+CREATE INDEX "ix_ratings_movieId" ON ratings ("movieId");
+CREATE INDEX "ix_ratings_user_time" ON ratings ("userId", "timestamp", "movieId", "rating");
+CREATE INDEX "ix_tags_userId" ON tags ("userId");
+CREATE INDEX "ix_tags_movieId" ON tags ("movieId");
+"""
+
+
+def legacy_db(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    for index in [*Rating.__table__.indexes, *Tag.__table__.indexes]:
+        conn.execute(f"DROP INDEX {index.name}")
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO ratings (userId, movieId, rating, timestamp) VALUES (?, ?, ?, ?)", [
+        (1, 10, 2.0, 100), (1, 10, 4.0, 300), (1, 10, 3.0, 200),
+        (2, 10, 5.0, 100), (1, 20, 1.0, 100), (1, 20, 1.5, 100),
+    ])
+    conn.commit()
+    conn.close()
+    return engine.url
+
+
+def test_migration_dedupes_ratings_and_replaces_indexes(tmp_path):
+    path = tmp_path / "legacy.db"
+    url = legacy_db(path)
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        assert migrations.migrate_rating_keys(db) == 3
+        # Zostaje najnowsza ocena (największy timestamp, potem największe id)
+        rows = db.query(Rating.userId, Rating.movieId, Rating.rating).order_by(Rating.userId, Rating.movieId).all()
+        assert [tuple(r) for r in rows] == [(1, 10, 4.0), (1, 20, 1.5), (2, 10, 5.0)]
+        stats = db.get(MovieRatingStats, 10)
+        assert (stats.rating_count, stats.rating_sum) == (2, 9.0)
+        assert migrations.migrate_tag_indexes(db)
+        # Drugie uruchomienie nic nie robi
+        assert migrations.migrate_rating_keys(db) == 0
+        assert not migrations.migrate_tag_indexes(db)
+
+    conn = sqlite3.connect(path)
+    names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'ratings'")}
+    assert {"ux_ratings_user_movie", "ix_ratings_user_time", "ix_ratings_movie_time"} <= names
+    assert not names & set(migrations.LEGACY_RATING_INDEXES)
+    assert [row[2] for row in conn.execute("PRAGMA index_info(ix_ratings_user_time)")] == \
+        ["userId", "timestamp", "id", "movieId", "rating"]
+    tag_names = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tags'")}
+    assert tag_names == {index.name for index in Tag.__table__.indexes}
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT rating FROM ratings WHERE userId = 1 AND movieId = 10").fetchall()
+    assert "ux_ratings_user_movie" in plan[0][-1]
+    conn.close()
+    engine.dispose()
+
+
+def test_migration_replaces_search_triggers(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Dawny trigger: lista tagów składana od nowa przy każdym wstawionym tagu
+        conn.exec_driver_sql("DROP TRIGGER tags_fts_ai")
+        conn.exec_driver_sql(
+            "CREATE TRIGGER tags_fts_ai AFTER INSERT ON tags BEGIN "
+            f"UPDATE movies_fts SET tags = {MOVIE_TAGS_SQL.format(m='new.movieId')} WHERE rowid = new.movieId; END"
+        )
+        conn.exec_driver_sql("INSERT INTO movies (movieId, title, genres) VALUES (1, 'Heat (1995)', 'Crime')")
+
+    with sessionmaker(bind=engine)() as db:
+        assert migrations.migrate_search_triggers(db) == ["tags_fts_ai"]
+        assert migrations.migrate_search_triggers(db) == []
+        for tag in ("heist", "la"):
+            db.add(Tag(userId=1, movieId=1, tag=tag, timestamp=1))
+        db.commit()
+        assert db.connection().exec_driver_sql("SELECT tags FROM movies_fts WHERE rowid = 1").scalar() == "heist la"
+    engine.dispose()
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import event
+from app import aggregates
+from app.models import Link, Movie, Rating, Tag
+
+
+def seed(session):
+    session.add_all([Movie(movieId=1, title="Heat (1995)", genres="Crime"),
+                     Movie(movieId=2, title="Alien (1979)", genres="Horror"),
+                     Movie(movieId=3, title="Up (2009)", genres="Animation")])
+    session.add(Link(movieId=1, imdbId="0113277", tmdbId="949"))
+    for user_id in range(1, 6):
+        session.add(Rating(userId=user_id, movieId=1, rating=float(user_id), timestamp=100 + user_id))
+    session.add(Rating(userId=1, movieId=2, rating=2.5, timestamp=50))
+    for user_id, tag in enumerate(["heist", "heist", "la", "heist", "la", "pacino"]):
+        session.add(Tag(userId=user_id, movieId=1, tag=tag, timestamp=user_id))
+    session.flush()
+    aggregates.rebuild_rating_stats(session)
+    session.commit()
+
+
+@pytest.fixture()
+def statements(session):
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_movie_full_combines_movie_link_stats_ratings_and_tags(client, session):
+    seed(session)
+    response = client.get("/movies/1/full", params={"recent_limit": 3, "tags_limit": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["movieId"], data["title"], data["genres"]) == (1, "Heat (1995)", "Crime")
+    assert data["link"] == {"movieId": 1, "imdbId": "0113277", "tmdbId": "949"}
+    assert (data["stats"]["count"], data["stats"]["mean"]) == (5, 3.0)
+    # Najnowsze oceny pierwsze
+    assert [r["userId"] for r in data["recent_ratings"]] == [5, 4, 3]
+    assert data["top_tags"] == [{"tag": "heist", "count": 3}, {"tag": "la", "count": 2}]
+
+    bare = client.get("/movies/3/full").json()
+    assert bare["link"] is None and bare["recent_ratings"] == [] and bare["top_tags"] == []
+    assert bare["stats"] == {"movieId": 3, "count": 0, "mean": None, "stddev": None, "min": None, "max": None}
+    assert client.get("/movies/999/full").status_code == 404
+
+
+def test_movies_full_batch_uses_constant_number_of_queries(client, session, statements):
+    seed(session)
+    statements.clear()
+    response = client.get("/movies/full", params={"ids": "2,999,1,2,3"})
+    assert response.status_code == 200
+    # Kolejność z żądania, bez powtórzeń i nieistniejących filmów
+    assert [m["movieId"] for m in response.json()] == [2, 1, 3]
+    assert response.json()[0]["recent_ratings"][0]["rating"] == 2.5
+    # Filmy, linki, statystyki, oceny (UNION ALL), tagi - niezależnie od liczby filmów
+    assert len(statements) == 5
+
+    assert client.get("/movies/full", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/movies/full", params={"ids": ",".join(map(str, range(1, 200)))}).status_code == 400
+
+
+def test_movie_full_cache_follows_rating_changes(client, session):
+    seed(session)
+    assert client.get("/movies/3/full").json()["stats"]["count"] == 0
+    client.put("/movies/3/my-rating", json={"rating": 4.0, "timestamp": 500})
+    data = client.get("/movies/3/full").json()
+    assert data["stats"]["count"] == 1
+    assert data["recent_ratings"][0]["timestamp"] == 500
@@ -1,3 +1,22 @@
+import base64
+import json
+import itertools
+from app import aggregates
+from app.models import Rating
+from app.pagination import PAGE_LIMIT_MAX
+from app.ranking import top_movies
+
+# Kolejni użytkownicy do ocen - jeden użytkownik ocenia film tylko raz
+user_ids = itertools.count(100)
+
+
+def rate_many(session, movie_id, value, times):
+    session.add_all(Rating(userId=next(user_ids), movieId=movie_id, rating=value) for _ in range(times))
+    session.flush()
+    aggregates.add_ratings(session, movie_id, [value] * times)
+    session.commit()
+    top_movies.mark_dirty()
+
 def test_create_movie(client):
     # D - weryfikacja czy po wykonaniu requestu POST dodał się nowy element
     payload = {"title": "Test Movie", "genres": "Action"}
@@ -61,4 +80,123 @@ def test_delete_movie(client):
 
     # Sprawdzamy czy zniknął (powinien być 404)
     get_res = client.get(f"/movies/{movie_id}")
-    assert get_res.status_code == 404
\ No newline at end of file
+    assert get_res.status_code == 404
+
+def test_read_movies_cursor_pagination(client):
+    for i in range(5):
+        client.post("/movies", json={"title": f"Movie {i}", "genres": "Drama"})
+
+    # Kolejne strony pobieramy po kursorze z nagłówka X-Next-Cursor
+    seen = []
+    response = client.get("/movies", params={"limit": 2})
+    while True:
+        assert response.status_code == 200
+        seen += [m["movieId"] for m in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = client.get("/movies", params={"limit": 2, "cursor": cursor})
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+def test_read_movies_invalid_cursor(client):
+    response = client.get("/movies", params={"cursor": "nie-kursor"})
+    assert response.status_code == 400
+    # Poprawny base64/JSON, ale wartość nie jest kluczem: null, obiekt, napis, lista
+    for after in (None, {"x": 1}, "abc", [1, 2], True):
+        cursor = base64.urlsafe_b64encode(json.dumps({"after": after}).encode()).decode()
+        assert client.get("/movies", params={"cursor": cursor}).status_code == 400
+
+def test_read_movies_limit_bounds(client):
+    client.post("/movies", json={"title": "Movie", "genres": "Drama"})
+    for limit in (0, -1, PAGE_LIMIT_MAX + 1):
+        assert client.get("/movies", params={"limit": limit}).status_code == 422
+    assert client.get("/movies", params={"skip": -1}).status_code == 422
+
+def test_top_movies_bayesian_ranking(client, session, monkeypatch):
+    monkeypatch.setattr(top_movies, "min_refresh_seconds", 0)
+    popular = client.post("/movies", json={"title": "Popular", "genres": "Drama|Comedy"}).json()["movieId"]
+    niche = client.post("/movies", json={"title": "Niche", "genres": "Drama"}).json()["movieId"]
+    weak = client.post("/movies", json={"title": "Weak", "genres": "Comedy"}).json()["movieId"]
+    rate_many(session, popular, 4.5, 20)
+    rate_many(session, niche, 5.0, 1)
+    rate_many(session, weak, 1.0, 5)
+
+    # Jedna ocena 5.0 nie wygrywa z dwudziestoma ocenami 4.5
+    response = client.get("/movies/top")
+    assert response.status_code == 200
+    assert [m["movieId"] for m in response.json()] == [popular, niche, weak]
+
+    assert [m["movieId"] for m in client.get("/movies/top", params={"genre": "Comedy"}).json()] == [popular, weak]
+    assert [m["movieId"] for m in client.get("/movies/top", params={"min_votes": 5}).json()] == [popular, weak]
+
+    # Po zmianie ocen ranking jest przeliczany w tle - do tego czasu żądania dostają poprzednią wersję
+    rate_many(session, popular, 1.0, 40)
+    assert [m["movieId"] for m in client.get("/movies/top").json()] == [popular, niche, weak]
+    top_movies.wait(timeout=5)
+    assert [m["movieId"] for m in client.get("/movies/top").json()] == [niche, popular, weak]
+
+def test_top_movies_skips_placeholder_genre(client, session):
+    movie_id = client.post("/movies", json={"title": "Unknown", "genres": "(no genres listed)"}).json()["movieId"]
+    rate_many(session, movie_id, 4.0, 3)
+
+    assert [m["movieId"] for m in client.get("/movies/top").json()] == [movie_id]
+    assert client.get("/movies/top", params={"genre": "(no genres listed)"}).json() == []
+
+def test_filter_movies_by_genre(client):
+    client.post("/movies", json={"title": "A", "genres": "Comedy|Drama"})
+    client.post("/movies", json={"title": "B", "genres": "Comedy"})
+    client.post("/movies", json={"title": "C", "genres": "Drama|Horror"})
+
+    def titles(**params):
+        return sorted(m["title"] for m in client.get("/movies", params=params).json())
+
+    assert titles(genre=["Comedy"]) == ["A", "B"]
+    assert titles(genre=["Comedy", "Drama"]) == ["A"]
+    assert titles(genre=["Comedy", "Horror"], genre_mode="or") == ["A", "B", "C"]
+
+def test_genre_index_follows_movie_updates(client):
+    movie_id = client.post("/movies", json={"title": "A", "genres": "Comedy"}).json()["movieId"]
+    client.put(f"/movies/{movie_id}", json={"genres": "Horror"})
+    assert client.get("/movies", params={"genre": "Comedy"}).json() == []
+    assert [m["movieId"] for m in client.get("/movies", params={"genre": "Horror"}).json()] == [movie_id]
+
+    client.delete(f"/movies/{movie_id}")
+    assert client.get("/movies/facets").json() == []
+
+def test_genre_facets(client):
+    client.post("/movies", json={"title": "A", "genres": "Comedy|Drama"})
+    client.post("/movies", json={"title": "B", "genres": "Comedy"})
+    client.post("/movies", json={"title": "C", "genres": "Drama|Horror"})
+
+    assert client.get("/movies/facets").json() == [
+        {"genre": "Comedy", "count": 2}, {"genre": "Drama", "count": 2}, {"genre": "Horror", "count": 1}
+    ]
+    # Fasety dla filmów spełniających filtr
+    assert client.get("/movies/facets", params={"genre": "Drama"}).json() == [
+        {"genre": "Drama", "count": 2}, {"genre": "Comedy", "count": 1}, {"genre": "Horror", "count": 1}
+    ]
+
+def test_search_movies_by_title_prefix_and_year(client):
+    client.post("/movies", json={"title": "Toy Story (1995)", "genres": "Animation"})
+    client.post("/movies", json={"title": "Toy Story 2 (1999)", "genres": "Animation"})
+    client.post("/movies", json={"title": "Heat (1995)", "genres": "Action"})
+
+    response = client.get("/movies/search", params={"q": "toy sto"})
+    assert response.status_code == 200
+    assert sorted(m["title"] for m in response.json()) == ["Toy Story (1995)", "Toy Story 2 (1999)"]
+
+    # Rok z końcówki "(1995)" w zapytaniu zawęża wyniki
+    response = client.get("/movies/search", params={"q": "toy story (1995)"})
+    assert [(m["title"], m["year"]) for m in response.json()] == [("Toy Story (1995)", 1995)]
+
+def test_search_movies_by_tag_and_after_update(client):
+    movie_id = client.post("/movies", json={"title": "Heat (1995)", "genres": "Action"}).json()["movieId"]
+    tag_id = client.post("/tags", json={"movieId": movie_id, "tag": "heist"}).json()["id"]
+    assert [m["movieId"] for m in client.get("/movies/search", params={"q": "heist"}).json()] == [movie_id]
+
+    client.put(f"/tags/{tag_id}", json={"tag": "robbery"})
+    assert client.get("/movies/search", params={"q": "heist"}).json() == []
+    client.put(f"/movies/{movie_id}", json={"title": "Heat 2 (2026)"})
+    assert client.get("/movies/search", params={"q": "robbery"}).json()[0]["year"] == 2026
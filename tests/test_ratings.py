@@ -1,3 +1,17 @@
+from app.main import app
+from app.models import User
+from app.security import get_current_user
+
+
+def post_rating_as(client, user_id, movie_id, value):
+    # Jedna ocena filmu na użytkownika - kolejne oceny tego filmu wystawiają inni użytkownicy
+    previous = app.dependency_overrides[get_current_user]
+    app.dependency_overrides[get_current_user] = lambda: User(id=user_id, username=f"user{user_id}", role="ROLE_ADMIN", is_active=True)
+    try:
+        return client.post("/ratings", json={"movieId": movie_id, "rating": value})
+    finally:
+        app.dependency_overrides[get_current_user] = previous
+
 def test_create_rating(client):
     # Tworzymy film
     movie_res = client.post("/movies", json={"title": "Rated Movie", "genres": "Action"})
@@ -44,4 +58,107 @@ def test_delete_rating(client):
 
     # Verify
     get_res = client.get(f"/ratings/{rating_id}")
-    assert get_res.status_code == 404
\ No newline at end of file
+    assert get_res.status_code == 404
+
+def test_read_ratings_skip_and_cursor(client):
+    movie_res = client.post("/movies", json={"title": "M", "genres": "G"})
+    m_id = movie_res.json()["movieId"]
+    ids = [post_rating_as(client, user_id, m_id, 3.0).json()["id"] for user_id in range(1, 5)]
+
+    # Stary tryb skip/limit nadal działa
+    response = client.get("/ratings", params={"skip": 1, "limit": 2})
+    assert [r["id"] for r in response.json()] == ids[1:3]
+
+    # Kursor z odpowiedzi skip/limit prowadzi do reszty wyników
+    response = client.get("/ratings", params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [r["id"] for r in response.json()] == ids[3:]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_movie_stats_follow_rating_changes(client):
+    movie_res = client.post("/movies", json={"title": "M", "genres": "G"})
+    m_id = movie_res.json()["movieId"]
+    r1 = post_rating_as(client, 1, m_id, 2.0).json()["id"]
+    post_rating_as(client, 2, m_id, 4.0)
+    r3 = post_rating_as(client, 3, m_id, 5.0).json()["id"]
+
+    stats = client.get(f"/movies/{m_id}/stats").json()
+    assert stats["count"] == 3
+    assert stats["mean"] == 11.0 / 3
+    assert (stats["min"], stats["max"]) == (2.0, 5.0)
+
+    # Zmiana i usunięcie wartości skrajnych przelicza min/max
+    client.put(f"/ratings/{r1}", json={"rating": 3.0})
+    client.delete(f"/ratings/{r3}")
+    stats = client.get(f"/movies/{m_id}/stats").json()
+    assert stats["count"] == 2
+    assert stats["mean"] == 3.5
+    assert (stats["min"], stats["max"]) == (3.0, 4.0)
+    assert stats["stddev"] == 0.5
+
+def test_movie_stats_without_ratings(client):
+    m_id = client.post("/movies", json={"title": "M", "genres": "G"}).json()["movieId"]
+    assert client.get(f"/movies/{m_id}/stats").json() == {
+        "movieId": m_id, "count": 0, "mean": None, "stddev": None, "min": None, "max": None
+    }
+    assert client.get("/movies/99999/stats").status_code == 404
+
+def test_my_rating_upsert_creates_then_updates(client):
+    m_id = client.post("/movies", json={"title": "M", "genres": "G"}).json()["movieId"]
+    post_rating_as(client, 2, m_id, 1.0)
+
+    created = client.put(f"/movies/{m_id}/my-rating", json={"rating": 4.0, "timestamp": 10})
+    assert created.status_code == 201
+    assert created.json()["userId"] == 1 and created.json()["rating"] == 4.0
+
+    # Drugi PUT nadpisuje tę samą ocenę (to samo id); bez timestamp zostaje poprzedni
+    updated = client.put(f"/movies/{m_id}/my-rating", json={"rating": 2.0})
+    assert updated.status_code == 200
+    assert updated.json() == {**created.json(), "rating": 2.0, "timestamp": 10}
+
+    stats = client.get(f"/movies/{m_id}/stats").json()
+    assert (stats["count"], stats["mean"], stats["min"], stats["max"]) == (2, 1.5, 1.0, 2.0)
+    assert client.put("/movies/99999/my-rating", json={"rating": 3.0}).status_code == 404
+
+def test_concurrent_upserts_count_the_rating_once(tmp_path):
+    import threading
+    import time
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app import aggregates
+    from app.models import Base, Movie, MovieRatingStats
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'upsert.db'}", connect_args={"check_same_thread": False, "timeout": 5})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(Movie(movieId=1, title="M", genres="G"))
+        db.commit()
+
+    # Pierwsze żądanie trzyma transakcję z nową oceną, drugie startuje w tym czasie
+    first = Session(engine)
+    assert aggregates.upsert_rating(first, 7, 1, 4.0)[1]
+    results = []
+
+    def second_request():
+        with Session(engine) as db:
+            results.append(aggregates.upsert_rating(db, 7, 1, 2.0)[1])
+            db.commit()
+
+    thread = threading.Thread(target=second_request)
+    thread.start()
+    time.sleep(0.2)
+    first.commit()
+    first.close()
+    thread.join()
+
+    assert results == [False]
+    with Session(engine) as db:
+        stats = db.get(MovieRatingStats, 1)
+        assert (stats.rating_count, stats.rating_sum) == (1, 2.0)
+    engine.dispose()
+
+def test_second_post_for_same_movie_conflicts(client):
+    m_id = client.post("/movies", json={"title": "M", "genres": "G"}).json()["movieId"]
+    assert client.post("/ratings", json={"movieId": m_id, "rating": 3.0}).status_code == 201
+    response = client.post("/ratings", json={"movieId": m_id, "rating": 5.0})
+    assert response.status_code == 409
+    assert client.get(f"/movies/{m_id}/stats").json()["count"] == 1
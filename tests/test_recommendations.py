@@ -0,0 +1,121 @@
+import numpy as np
+from app import aggregates
+from app.models import Movie, Rating
+from app.recommendations import recommender, train_als, train_from_database, Recommender
+
+
+def synthetic_ratings(n_users=60, n_movies=40, seed=1):
+    # Dwie grupy gustów: użytkownicy parzyści lubią filmy 1-20, nieparzyści 21-40
+    rng = np.random.default_rng(seed)
+    rows = []
+    for user in range(1, n_users + 1):
+        for movie in rng.choice(np.arange(1, n_movies + 1), size=15, replace=False):
+            likes = (movie <= n_movies // 2) == (user % 2 == 0)
+            rows.append((user, int(movie), 5.0 if likes else 1.0))
+    return rows
+
+
+def test_als_learns_ratings():
+    users, movies, values = map(np.array, zip(*synthetic_ratings()))
+    model = train_als(users, movies, values.astype(np.float32), factors=4, reg=0.05, iterations=10)
+    predicted = np.einsum("ij,ij->i",
+                          model["user_factors"][np.searchsorted(model["user_ids"], users)],
+                          model["item_factors"][np.searchsorted(model["item_ids"], movies)]) + model["mean"]
+    assert np.sqrt(np.mean((predicted - values) ** 2)) < 0.5
+
+    warm = train_als(users, movies, values.astype(np.float32), factors=4, iterations=0, previous=model)
+    assert np.allclose(warm["item_factors"], model["item_factors"])
+
+
+def test_recommend_excludes_rated_and_folds_in_new_ratings(session):
+    for movie_id in range(1, 41):
+        session.add(Movie(movieId=movie_id, title=f"M{movie_id}", genres="Drama"))
+    for user_id, movie_id, value in synthetic_ratings():
+        session.add(Rating(userId=user_id, movieId=movie_id, rating=value))
+    session.commit()
+
+    model = Recommender()
+    model.train(session)
+    rated = {m for (m,) in session.query(Rating.movieId).filter(Rating.userId == 2)}
+    top = model.recommend(session, 2, 5)
+    assert len(top) == 5
+    assert not rated & {movie_id for movie_id, _ in top}
+    assert all(movie_id <= 20 for movie_id, _ in top)
+
+    # Nowy użytkownik bez treningu: wektor z jego ocen (fold-in)
+    for movie_id in (21, 22, 23):
+        session.add(Rating(userId=500, movieId=movie_id, rating=5.0))
+    session.commit()
+    assert all(movie_id > 20 for movie_id, _ in model.recommend(session, 500, 5))
+    assert model.recommend(session, 999, 5) is None
+
+
+def test_train_from_database(tmp_path):
+    import sqlite3
+    from sqlalchemy import create_engine
+    from app.models import Base
+
+    path = tmp_path / "rec.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany("INSERT INTO ratings (userId, movieId, rating) VALUES (?, ?, ?)", synthetic_ratings())
+    conn.close()
+
+    model, info = train_from_database(str(path), None, 2)
+    assert info["ratings"] == 900 and not info["warm_start"]
+    assert model["item_factors"].shape == (40, 32)
+
+
+def test_recommendations_endpoint(client, session):
+    client.post("/movies", json={"title": "Rated", "genres": "Drama"})
+    client.post("/movies", json={"title": "Unrated", "genres": "Drama"})
+    client.post("/ratings", json={"movieId": 1, "rating": 5.0})
+    session.add(Rating(userId=2, movieId=2, rating=4.0))
+    aggregates.add_rating(session, 2, 4.0)
+    session.commit()
+
+    # Bez modelu: ranking najlepiej ocenianych bez filmów już ocenionych
+    response = client.get("/users/me/recommendations")
+    assert response.status_code == 200
+    assert [(m["movieId"], m["source"]) for m in response.json()] == [(2, "top")]
+
+    recommender.train(session)
+    assert [(m["movieId"], m["source"]) for m in client.get("/users/me/recommendations").json()] == [(2, "model")]
+
+
+def test_value_change_triggers_retraining(session):
+    session.add(Movie(movieId=1, title="M1", genres="Drama"))
+    session.add_all(Rating(userId=u, movieId=1, rating=3.0) for u in (1, 2))
+    session.flush()
+    aggregates.add_ratings(session, 1, [3.0, 3.0])
+    session.commit()
+    model = Recommender()
+    model.train(session)
+    assert not model.needs_training(session)
+
+    # Upsert oceny: to samo id i ta sama liczba ocen, inna wartość
+    aggregates.upsert_rating(session, 1, 1, 4.5)
+    session.commit()
+    assert model.needs_training(session)
+
+    # Zamiana wartości między użytkownikami nie zmienia sum w tabeli statystyk
+    model.train(session)
+    session.query(Rating).filter(Rating.userId == 1).update({"rating": 3.0})
+    session.query(Rating).filter(Rating.userId == 2).update({"rating": 4.5})
+    session.commit()
+    assert model.needs_training(session)
+
+
+def test_failed_background_training_is_logged(caplog):
+    from concurrent.futures import Future
+
+    future = Future()
+    future.set_exception(MemoryError("za mało pamięci"))
+    model = Recommender()
+    model._on_trained(future)
+    assert not model.ready
+    assert "Trening modelu rekomendacji nie powiódł się" in caplog.text
+    assert "za mało pamięci" in caplog.text
@@ -0,0 +1,73 @@
+from app import response_cache as response_cache_module
+from app.response_cache import ResponseCache, response_cache
+
+
+def test_etag_and_not_modified(client):
+    movie_id = client.post("/movies", json={"title": "Cached", "genres": "Drama"}).json()["movieId"]
+    first = client.get(f"/movies/{movie_id}")
+    etag = first.headers["ETag"]
+    assert first.json()["title"] == "Cached"
+
+    second = client.get(f"/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_write_invalidates_cached_responses(client):
+    movie_id = client.post("/movies", json={"title": "Old", "genres": "Drama"}).json()["movieId"]
+    etag = client.get(f"/movies/{movie_id}").headers["ETag"]
+    client.get("/movies")
+
+    client.put(f"/movies/{movie_id}", json={"title": "New"})
+    fresh = client.get(f"/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["title"] == "New"
+    assert [m["title"] for m in client.get("/movies").json()] == ["New"]
+
+
+def test_cursor_header_served_from_cache(client):
+    movie_ids = [client.post("/movies", json={"title": f"M{i}", "genres": "G"}).json()["movieId"] for i in range(3)]
+    client.post("/ratings/batch", json=[{"movieId": movie_id, "rating": 3.0} for movie_id in movie_ids])
+    first = client.get("/ratings", params={"limit": 2})
+    again = client.get("/ratings", params={"limit": 2})
+    assert again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert again.json() == first.json()
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/links/1").status_code == 404
+    client.post("/movies", json={"title": "M", "genres": "G"})
+    client.post("/links", json={"movieId": 1, "imdbId": "tt42"})
+    assert client.get("/links/1").json()["imdbId"] == "tt42"
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.set("a", '"a"', b"12345", {})
+    cache.set("b", '"b"', b"12345", {})
+    cache.set("c", '"c"', b"123", {})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 8
+    cache.set("big", '"x"', b"x" * 11, {})
+    assert cache.get("big") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    # Zapis spoza procesu (import CLI, inny worker) nie podbija wersji tabel - wpis wygasa po TTL
+    now = [100.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_bytes=100, ttl=5)
+    cache.set("a", '"a"', b"12345", {})
+    now[0] += 4.9
+    assert cache.get("a") is not None
+    now[0] += 0.1
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_bytes=0)
+    cache.set("a", '"a"', b"1", {})
+    assert cache.get("a") is None
@@ -0,0 +1,95 @@
+import os
+import sys
+import numpy as np
+import pytest
+from app import similarity
+from app.models import Movie, Rating
+from app.similarity import SimilarMovies, build_index, load_index, save_index, similar_movies
+
+# Użytkownicy 1-4 oceniają filmy 1 i 2 tak samo, film 3 odwrotnie; film 4 ocenia tylko użytkownik 5
+RATINGS = [
+    (1, 1, 5.0), (1, 2, 5.0), (1, 3, 1.0),
+    (2, 1, 4.0), (2, 2, 4.5), (2, 3, 2.0),
+    (3, 1, 1.0), (3, 2, 1.5), (3, 3, 5.0),
+    (4, 1, 2.0), (4, 2, 2.0), (4, 3, 4.0),
+    (5, 4, 3.0),
+]
+
+
+def as_arrays(rows):
+    users, movies, values = zip(*rows)
+    return np.array(users), np.array(movies), np.array(values, dtype=np.float32)
+
+
+def test_build_index_ranks_neighbors():
+    index = build_index(*as_arrays(RATINGS), k=3, shrink=0, block=2)
+    assert list(index["movie_ids"]) == [1, 2, 3, 4]
+    first = index["neighbors"][0]
+    assert list(index["movie_ids"][first[:2]]) == [2, 3]
+    assert index["scores"][0][0] > 0.9 > 0 > index["scores"][0][1]
+    # Film 4 nie ma wspólnych oceniających - brak sąsiadów
+    assert list(index["neighbors"][3]) == [-1, -1, -1]
+
+
+def test_memory_mapped_index_roundtrip(session, tmp_path):
+    for user_id, movie_id, value in RATINGS:
+        session.add(Rating(userId=user_id, movieId=movie_id, rating=value))
+    session.commit()
+
+    built = SimilarMovies(k=2, path=str(tmp_path / "sim"))
+    report = built.build(session)
+    assert report["ratings"] == len(RATINGS) and report["memory_mapped"]
+    assert report["index_bytes"] > 0 and report["build_seconds"] >= 0
+
+    loaded = SimilarMovies(k=2, path=str(tmp_path / "sim"))
+    assert loaded.load()
+    assert isinstance(loaded._index["scores"], np.memmap)
+    assert loaded.similar(1, 2) == built.similar(1, 2)
+
+
+def test_save_index_switches_versions_atomically(tmp_path):
+    path = str(tmp_path / "sim")
+    first = build_index(*as_arrays(RATINGS), k=2)
+    save_index(first, path)
+    loaded = load_index(path)
+
+    second = {**first, "scores": first["scores"] * 0.5}
+    save_index(second, path)
+    save_index(second, path)
+    # Wskaźnik na najnowszą wersję; zostaje ona i jedna poprzednia
+    assert len([name for name in os.listdir(path) if name.startswith("v")]) == 1 + similarity.INDEX_KEEP_VERSIONS
+    assert np.array_equal(load_index(path)["scores"], second["scores"])
+    # Wcześniej zmapowana wersja jest nadal spójna i czytelna
+    assert np.array_equal(loaded["scores"], first["scores"])
+
+
+def test_similar_endpoint(client, session):
+    # Bez indeksu pierwsze zapytanie zleca jego budowę w tle
+    response = client.get("/movies/1/similar")
+    assert response.status_code == 503 and response.headers["Retry-After"]
+    similar_movies.wait(timeout=5)
+    assert similar_movies.ready
+
+    for movie_id in (1, 2, 3, 4, 5):
+        session.add(Movie(movieId=movie_id, title=f"Movie {movie_id}", genres="Drama"))
+    for user_id, movie_id, value in RATINGS:
+        session.add(Rating(userId=user_id, movieId=movie_id, rating=value))
+    session.commit()
+    similar_movies.build(session)
+
+    response = client.get("/movies/1/similar", params={"k": 1})
+    assert response.status_code == 200
+    assert [(m["movieId"], m["title"]) for m in response.json()] == [(2, "Movie 2")]
+    assert client.get("/movies/5/similar").json() == []
+    assert client.get("/movies/99/similar").status_code == 404
+
+
+def test_peak_rss_without_resource_module(monkeypatch):
+    # Windows nie ma modułu resource - raport bez pomiaru pamięci zamiast błędu importu
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert similarity.peak_rss_mb() is None
+
+
+def test_cli_requires_output_directory():
+    with pytest.raises(SystemExit):
+        similarity.main(["--out", ""])
@@ -0,0 +1,103 @@
+import threading
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import write_queue
+from app.models import Base, Movie, MovieRatingStats, Rating, Tag
+from app.write_queue import GroupCommitWriter
+
+
+@pytest.fixture()
+def file_sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wb.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Sessions() as db:
+        db.add(Movie(movieId=1, title="Toy Story (1995)", genres="Animation"))
+        db.commit()
+    yield Sessions
+    engine.dispose()
+
+
+def test_group_commit_batches_concurrent_inserts(file_sessions):
+    writer = GroupCommitWriter(file_sessions, window_ms=50, max_batch=100)
+    results = []
+
+    def submit(i):
+        kind, values = ("rating", {"rating": 1.0 + i % 5}) if i % 2 else ("tag", {"tag": f"t{i}"})
+        results.append(writer.submit(kind, {"userId": i, "movieId": 1, "timestamp": i, **values}).result(timeout=5))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.stop()
+
+    assert len(results) == 20
+    assert len({(("rating" if "rating" in r else "tag"), r["id"]) for r in results}) == 20
+    assert writer.rows == 20
+    assert writer.batches < 20
+
+    with file_sessions() as db:
+        assert db.query(Rating).count() == 10
+        assert db.query(Tag).count() == 10
+        stats = db.get(MovieRatingStats, 1)
+        assert stats.rating_count == 10
+        assert stats.rating_sum == sum(1.0 + i % 5 for i in range(1, 20, 2))
+
+
+def test_failed_row_does_not_fail_the_batch(file_sessions):
+    writer = GroupCommitWriter(file_sessions, window_ms=50)
+    good = writer.submit("tag", {"userId": 1, "movieId": 1, "tag": "ok", "timestamp": 1})
+    bad = writer.submit("tag", {"userId": 1, "movieId": 1, "tag": "x", "timestamp": 1, "nope": 1})
+    assert good.result(timeout=5)["tag"] == "ok"
+    with pytest.raises(TypeError):
+        bad.result(timeout=5)
+    writer.stop()
+
+
+def test_create_rating_through_writer(client, monkeypatch, session):
+    writer = GroupCommitWriter(sessionmaker(bind=session.get_bind()), window_ms=1)
+    monkeypatch.setattr(write_queue, "write_behind", writer)
+    client.post("/movies", json={"title": "Heat (1995)", "genres": "Crime"})
+
+    response = client.post("/ratings", json={"movieId": 1, "rating": 4.5, "timestamp": 1})
+    writer.stop()
+    assert response.status_code == 201
+    assert response.json()["userId"] == 1
+    assert response.json()["id"] is not None
+    assert client.get("/movies/1/stats").json()["count"] == 1
+
+
+def test_cancelled_item_is_not_written(file_sessions):
+    # Długie okno - wpisy czekają w paczce, a drugi zostaje anulowany (jak po przekroczeniu limitu czasu)
+    writer = GroupCommitWriter(file_sessions, window_ms=300)
+    kept = writer.submit("tag", {"userId": 1, "movieId": 1, "tag": "kept", "timestamp": 1})
+    dropped = writer.submit("tag", {"userId": 1, "movieId": 1, "tag": "dropped", "timestamp": 2})
+    assert dropped.cancel()
+    assert kept.result(timeout=5)["tag"] == "kept"
+    writer.stop()
+
+    assert writer.cancelled == 1
+    with file_sessions() as db:
+        assert [t.tag for t in db.query(Tag)] == ["kept"]
+
+
+def test_timed_out_write_is_cancelled(client, monkeypatch, session):
+    writer = GroupCommitWriter(sessionmaker(bind=session.get_bind()), window_ms=500)
+    monkeypatch.setattr(write_queue, "write_behind", writer)
+    monkeypatch.setattr(write_queue, "WRITE_BEHIND_TIMEOUT", 0.05)
+    client.post("/movies", json={"title": "Heat (1995)", "genres": "Crime"})
+
+    response = client.post("/ratings", json={"movieId": 1, "rating": 4.5, "timestamp": 1})
+    writer.stop()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    # Anulowany zapis nie trafił do bazy - ponowienie nie da 409
+    assert client.get("/movies/1/stats").json()["count"] == 0
+    monkeypatch.setattr(write_queue, "WRITE_BEHIND_TIMEOUT", 5)
+    writer = GroupCommitWriter(sessionmaker(bind=session.get_bind()), window_ms=1)
+    monkeypatch.setattr(write_queue, "write_behind", writer)
+    assert client.post("/ratings", json={"movieId": 1, "rating": 4.5, "timestamp": 1}).status_code == 201
+    writer.stop()